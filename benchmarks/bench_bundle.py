@@ -0,0 +1,77 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+import xml.etree.ElementTree as ET
+
+from bench_import import counts_for
+
+from gaphor_mdimport_plugin.bundle import bundle_members
+from gaphor_mdimport_plugin.mdzip import MODEL_MEMBER
+from gaphor_mdimport_plugin.synthetic import SyntheticModel
+
+def write_bundle(path, parts, classes):
+    # A project archive with the main model and parts - 1 packed used projects of the same size
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for part in range(parts):
+            out = io.StringIO()
+            SyntheticModel(**counts_for(classes)).write(out)
+            member = MODEL_MEMBER if part == 0 else "module%d.mdxml" % part
+            archive.writestr(member, out.getvalue())
+
+def serial_seconds(path) -> float:
+    # Every part parsed completely, one after the other, in this process
+    start = time.perf_counter()
+    with zipfile.ZipFile(path) as archive:
+        for member in bundle_members(archive):
+            with archive.open(member) as stream:
+                ET.parse(stream).getroot()
+    return time.perf_counter() - start
+
+def streaming_seconds(path) -> float:
+    # Every part streamed, one after the other, releasing each element once it has been read
+    start = time.perf_counter()
+    with zipfile.ZipFile(path) as archive:
+        for member in bundle_members(archive):
+            with archive.open(member) as stream:
+                for event, element in ET.iterparse(stream, events=("end",)):
+                    element.clear()
+    return time.perf_counter() - start
+
+def peak_mb(measure, *arguments) -> float:
+    tracemalloc.start()
+    measure(*arguments)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Compare parsing the parts of a project archive completely "
+        "with streaming them, one after the other.")
+    parser.add_argument("--parts", type=int, default=4, help="model parts in the archive (default: %(default)s)")
+    parser.add_argument("--classes", default="1000,10000,50000",
+        help="comma separated numbers of classes per part (default: %(default)s)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    directory = tempfile.mkdtemp(prefix="mdimport-bench-")
+    print ("%10s %10s %14s %14s %14s %14s" % ("classes", "MB", "serial", "streamed", "serial peak", "streamed peak"))
+    for classes in (int(classes) for classes in arguments.classes.split(",")):
+        path = os.path.join(directory, "bundle-%d.mdzip" % classes)
+        write_bundle(path, arguments.parts, classes)
+        with zipfile.ZipFile(path) as archive:
+            size = sum(info.file_size for info in archive.infolist()) / 2 ** 20
+        print ("%10d %10.1f %12.2f s %12.2f s %11.1f MB %11.1f MB" % (classes, size,
+            serial_seconds(path), streaming_seconds(path), peak_mb(serial_seconds, path), peak_mb(streaming_seconds, path)))
+        os.remove(path)
+    os.rmdir(directory)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from gaphor.transaction import Transaction
+
+from gaphor_mdimport_plugin.cli import create_session
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+from gaphor_mdimport_plugin.synthetic import SyntheticModel
+from gaphor_mdimport_plugin.xmlbackend import BACKEND_AUTO, BACKENDS
+
+FINISHING = "Finishing"
+# Time per element growing by more than this factor from the smallest scale is reported
+SUPERLINEAR_FACTOR = 1.5
+
+def counts_for(classes):
+    # The other element kinds grow in proportion to the number of classes
+    return dict(
+        packages=max(1, classes // 100),
+        classes=classes,
+        attributes=3,
+        associations=classes // 2,
+        generalizations=classes // 2,
+        stereotype_applications=classes // 5,
+        diagrams=max(1, classes // 50),
+        shapes_per_diagram=20,
+    )
+
+def run_import(path, streaming, trace_memory, bulk_load, xml_backend=None):
+    # Returns {phase: [seconds, peak bytes]}; the work done before a step is yielded is
+    # counted for the phase of that step
+    event_manager, element_factory, modeling_language = create_session()
+    importer = MDImporter(None, element_factory, event_manager, streaming=streaming, bulk_load=bulk_load, \
+        xml_backend=xml_backend)
+    phases = {}
+    if trace_memory:
+        tracemalloc.start()
+    last_time = time.perf_counter()
+    with Transaction(event_manager), importer.suspended_events():
+        for phase, done, total in importer.file_steps(path):
+            last_time = record(phases, phase, last_time, trace_memory)
+        record(phases, FINISHING, last_time, trace_memory)
+    if trace_memory:
+        tracemalloc.stop()
+    element_factory.shutdown()
+    return phases
+
+def record(phases, phase, last_time, trace_memory):
+    now = time.perf_counter()
+    measurement = phases.setdefault(phase, [0.0, 0])
+    measurement[0] += now - last_time
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        measurement[1] = max(measurement[1], peak)
+        tracemalloc.reset_peak()
+    # Measuring is not counted for the next step
+    return time.perf_counter()
+
+def report(scale, elements, phases, baseline):
+    total = sum(seconds for seconds, peak in phases.values())
+    per_element = total / elements * 1e6
+    line = "%10d classes %10d elements %9.2f s %8.1f us/element" % (scale, elements, total, per_element)
+    if baseline != None and per_element > baseline * SUPERLINEAR_FACTOR:
+        line += "  superlinear (x%.1f)" % (per_element / baseline)
+    print (line)
+    for phase, (seconds, peak) in phases.items():
+        print ("    %-20s %9.2f s %9.1f MB peak" % (phase, seconds, peak / 2 ** 20))
+    return per_element
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Import synthetic MagicDraw models of growing size.")
+    parser.add_argument("--scales", default="1000,10000,100000",
+        help="comma separated numbers of classes (default: %(default)s)")
+    parser.add_argument("--tree", action="store_true", help="use the non-streaming import")
+    parser.add_argument("--no-memory", action="store_true", help="do not trace memory, which slows the import down")
+    parser.add_argument("--bulk", action="store_true", help="import with model events suspended")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_AUTO, help="XML parser (default: %(default)s)")
+    parser.add_argument("--keep", metavar="DIR", help="write the generated models to DIR and keep them")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    directory = arguments.keep or tempfile.mkdtemp(prefix="mdimport-bench-")
+    os.makedirs(directory, exist_ok=True)
+    baseline = None
+    for scale in (int(scale) for scale in arguments.scales.split(",")):
+        path = os.path.join(directory, "synthetic-%d.xmi" % scale)
+        model = SyntheticModel(**counts_for(scale))
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as out:
+                model.write(out)
+        elements = model.element_count()
+        phases = run_import(path, not arguments.tree, not arguments.no_memory, arguments.bulk, arguments.backend)
+        per_element = report(scale, elements, phases, baseline)
+        if baseline == None:
+            baseline = per_element
+        if arguments.keep == None:
+            os.remove(path)
+    if arguments.keep == None:
+        os.rmdir(directory)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from bench_import import counts_for, run_import
+
+from gaphor_mdimport_plugin.synthetic import SyntheticModel
+from gaphor_mdimport_plugin.xmlbackend import BACKEND_LXML, BACKEND_STDLIB, get_backend
+
+def available_backends() -> list:
+    backends = [BACKEND_STDLIB]
+    try:
+        get_backend(BACKEND_LXML)
+        backends.append(BACKEND_LXML)
+    except ImportError:
+        print ("lxml is not installed, only the stdlib backend is measured")
+    return backends
+
+def parse_seconds(path, backend_name) -> float:
+    # Builds the whole tree, as the tree import does
+    backend = get_backend(backend_name)
+    start = time.perf_counter()
+    with open(path, "rb") as source:
+        for event, element in backend.iterparse(source, ("end",)):
+            pass
+    return time.perf_counter() - start
+
+def import_seconds(path, backend_name, streaming) -> float:
+    phases = run_import(path, streaming, False, True, backend_name)
+    return sum(seconds for seconds, peak in phases.values())
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Compare the XML parser backends on synthetic MagicDraw models.")
+    parser.add_argument("--scales", default="1000,10000,100000",
+        help="comma separated numbers of classes (default: %(default)s)")
+    parser.add_argument("--parse-only", action="store_true", help="only measure parsing, not the import")
+    parser.add_argument("--keep", metavar="DIR", help="write the generated models to DIR and keep them")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    backends = available_backends()
+    directory = arguments.keep or tempfile.mkdtemp(prefix="mdimport-bench-")
+    os.makedirs(directory, exist_ok=True)
+    columns = ["parse"]
+    if not arguments.parse_only:
+        columns += ["tree import", "streaming import"]
+    print ("%10s %10s %8s " % ("classes", "MB", "backend") + " ".join("%16s" % column for column in columns))
+    for scale in (int(scale) for scale in arguments.scales.split(",")):
+        path = os.path.join(directory, "synthetic-%d.xmi" % scale)
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as out:
+                SyntheticModel(**counts_for(scale)).write(out)
+        size = os.path.getsize(path) / 2 ** 20
+        results = {}
+        for backend in backends:
+            seconds = [parse_seconds(path, backend)]
+            if not arguments.parse_only:
+                seconds.append(import_seconds(path, backend, False))
+                seconds.append(import_seconds(path, backend, True))
+            results[backend] = seconds
+            print ("%10d %10.1f %8s " % (scale, size, backend) + " ".join("%14.2f s" % value for value in seconds))
+        if len(results) > 1:
+            speedups = [stdlib / lxml for stdlib, lxml in zip(results[BACKEND_STDLIB], results[BACKEND_LXML])]
+            print ("%10s %10s %8s " % ("", "", "speedup") + " ".join("%15.2fx" % speedup for speedup in speedups))
+        if arguments.keep == None:
+            os.remove(path)
+    if arguments.keep == None:
+        os.rmdir(directory)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
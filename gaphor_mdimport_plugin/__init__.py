@@ -4,7 +4,15 @@ import gi
 
 from gaphor.abc import ActionProvider, Service
 from gaphor.action import action
+from gaphor.core import event_handler
+from gaphor.core.modeling import ModelFlushed, ModelReady
+from gaphor.diagram.event import DiagramOpened
+from gaphor.event import ModelSaved
 from gaphor.i18n import gettext
+from gaphor.transaction import Transaction
+
+from gaphor_mdimport_plugin.importoptions import ImportOptions
+from gaphor_mdimport_plugin.lazydiagrams import DiagramStore, records_path
 
 
 from gi.repository import Adw, Gtk
@@ -14,15 +22,57 @@ log = logging.getLogger(__name__)
 
 class MDImportPlugin(Service, ActionProvider):
 
-    def __init__(self, main_window, tools_menu, element_factory, event_manager):
+    def __init__(self, main_window, tools_menu, element_factory, event_manager, file_manager, modeling_language, properties=None, \
+            undo_manager=None):
         self.main_window = main_window
+        self.file_manager = file_manager
+        self.modeling_language = modeling_language
+        # The import options are kept as properties of the model, see importoptions.OPTIONS
+        self.properties = properties
+        # An import from the menu can not be undone; it clears the undo history
+        self.undo_manager = undo_manager
         tools_menu.add_actions(self)
         self.element_factory = element_factory
         self.event_manager = event_manager
+        self.diagram_store = DiagramStore()
+        event_manager.subscribe(self.on_diagram_opened)
+        event_manager.subscribe(self.on_model_saved)
+        # Before the diagrams service opens the diagrams of a loaded model
+        event_manager.priority_subscribe(self.on_model_ready)
+        event_manager.subscribe(self.on_model_flushed)
 
     def shutdown(self):
-        pass
+        self.event_manager.unsubscribe(self.on_diagram_opened)
+        self.event_manager.unsubscribe(self.on_model_saved)
+        self.event_manager.unsubscribe(self.on_model_ready)
+        self.event_manager.unsubscribe(self.on_model_flushed)
+        self.diagram_store.clear()
+
+    @event_handler(DiagramOpened)
+    def on_diagram_opened(self, event:DiagramOpened):
+        diagram = event.diagram
+        record = self.diagram_store.pop(diagram.id)
+        if record == None or diagram.ownedPresentation:
+            return
+        with Transaction(self.event_manager):
+            record.materialize(diagram, self.element_factory)
+
+    @event_handler(ModelSaved)
+    def on_model_saved(self, event:ModelSaved):
+        # The saved model holds the diagrams that were never opened as empty diagrams; their
+        # records are saved next to it, to be read back when the model is loaded
+        if event.filename != None:
+            self.diagram_store.save(records_path(event.filename))
 
+    @event_handler(ModelReady)
+    def on_model_ready(self, event:ModelReady):
+        if self.diagram_store.records or self.file_manager == None or self.file_manager.filename == None:
+            return
+        self.diagram_store.load(records_path(self.file_manager.filename))
+
+    @event_handler(ModelFlushed)
+    def on_model_flushed(self, event:ModelFlushed):
+        self.diagram_store.clear()
 
     @action(
         name="mdimport",
@@ -33,8 +83,68 @@ class MDImportPlugin(Service, ActionProvider):
         global window
         window = self.main_window.window
 
-        from gaphor_mdimport_plugin.mdimporter import MDImporter
-        mdimporter = MDImporter(self.main_window.window, self.element_factory, self.event_manager)
+        mdimporter = self.create_importer()
         mdimporter.import_md_model()
         # open_file_dialog(window)
 
+    @action(
+        name="mdimport-selective",
+        label=gettext("Import MD Model Selectively…"),
+        tooltip=gettext("Import chosen packages and element kinds of a MagicDraw model"),
+    )
+    def selective_import_action(self):
+        mdimporter = self.create_importer()
+        mdimporter.import_md_model_selectively()
+
+    def create_importer(self):
+        from gaphor_mdimport_plugin.mdimporter import MDImporter
+        from gaphor_mdimport_plugin.modules import ModuleResolver
+        from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary
+        options = ImportOptions.load(self.properties)
+        diagram_store = None
+        if options.lazy_diagrams:
+            diagram_store = self.diagram_store
+        profile_library = None
+        if options.use_profile_library:
+            profile_library = ProfileLibrary(self.modeling_language)
+        module_resolver = None
+        if options.module_directories:
+            module_resolver = ModuleResolver(options.module_directories)
+        mdimporter = MDImporter(self.main_window.window, self.element_factory, self.event_manager, streaming=True, diagram_store=diagram_store, \
+            incremental=options.incremental, model_filename=self.file_manager.filename, \
+            instrument=options.instrument, profile=options.profile, all_parts=options.import_all_parts, \
+            profile_library=profile_library, module_resolver=module_resolver, undo_manager=self.undo_manager)
+        return mdimporter
+
+    @action(
+        name="mdimport-options",
+        label=gettext("MD Import Options…"),
+        tooltip=gettext("Choose how MagicDraw models are imported into this model"),
+    )
+    def options_action(self):
+        from gaphor_mdimport_plugin.optionsdialog import OptionsDialog
+        OptionsDialog(self.main_window.window, ImportOptions.load(self.properties), self.save_options)
+
+    def save_options(self, options:ImportOptions):
+        options.save(self.properties)
+
+    @action(
+        name="mdimport-add-profile",
+        label=gettext("Add Profile to MD Import Library"),
+        tooltip=gettext("Import a MagicDraw profile once, for use by every model that references it"),
+    )
+    def add_profile_action(self):
+        from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary
+        dialog = Gtk.FileDialog.new()
+        dialog.set_title("Select MagicDraw profile")
+
+        def response(dialog, result):
+            if result.had_error():
+                # File dialog was cancelled
+                return
+            path = dialog.open_finish(result).get_path()
+            uris = ProfileLibrary(self.modeling_language).add(path)
+            log.info("Added %s to the MD import profile library", ", ".join(uris))
+
+        dialog.open(parent=self.main_window.window, cancellable=None, callback=response)
+
@@ -0,0 +1,5 @@
+import sys
+
+from gaphor_mdimport_plugin.cli import main
+
+sys.exit(main())
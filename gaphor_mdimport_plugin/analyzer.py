@@ -0,0 +1,319 @@
+import json
+import time
+
+from gaphor_mdimport_plugin.dispatch import DEFERRED, IGNORED, IMPORTED, REJECTED, HandlerTable, outcome
+from gaphor_mdimport_plugin.mdimporter import ASSOCIATION_CHILD_HANDLERS, CLASS_CHILD_HANDLERS, \
+    ENUMERATION_CHILD_HANDLERS, INSTANCE_SPECIFICATION_CHILD_HANDLERS, INTERFACE_CHILD_HANDLERS, \
+    MODEL_CHILD_HANDLERS, NESTED_CLASSIFIER_HANDLERS, OPERATION_CHILD_HANDLERS, PACKAGE_CHILD_HANDLERS, \
+    PACKAGED_ELEMENT_HANDLERS, USE_CASE_CHILD_HANDLERS, MDImporter
+from gaphor_mdimport_plugin.mdzip import open_document
+from gaphor_mdimport_plugin.modules import is_standard_library
+from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary, profile_uri
+from gaphor_mdimport_plugin.selection import HREF, REFERENCE_ATTRIBUTES
+from gaphor_mdimport_plugin.xmi import UML_MODEL, UML_PROFILE, XMI_ID, XMI_IDREF, XMI_TYPE
+from gaphor_mdimport_plugin.xmlbackend import get_backend
+
+# Handlers that dispatch the node once more, on its xmi:type
+DISPATCHING_HANDLERS = {
+    MDImporter.import_PackagedElement: PACKAGED_ELEMENT_HANDLERS,
+    MDImporter.import_NestedClassifier: NESTED_CLASSIFIER_HANDLERS,
+}
+# The table the children of a node are dispatched on, by the handler that imports the node. The
+# children of nodes imported by any other handler are read by that handler itself.
+CHILD_HANDLERS = {
+    MDImporter.import_Association: ASSOCIATION_CHILD_HANDLERS,
+    MDImporter.import_Class: CLASS_CHILD_HANDLERS,
+    MDImporter.import_Enumeration: ENUMERATION_CHILD_HANDLERS,
+    MDImporter.import_InstanceSpecification: INSTANCE_SPECIFICATION_CHILD_HANDLERS,
+    MDImporter.import_Interface: INTERFACE_CHILD_HANDLERS,
+    MDImporter.import_OwnedOperation: OPERATION_CHILD_HANDLERS,
+    MDImporter.import_Package: PACKAGE_CHILD_HANDLERS,
+    MDImporter.import_UseCase: USE_CASE_CHILD_HANDLERS,
+}
+# Children of the document root other than the model and profiles (stereotype applications,
+# documentation) are not imported
+ROOT_TABLE = "XMI"
+# Table of the children of a node that is not imported
+LEFT_OUT = "left out"
+# Rough memory figures for the estimate: a node of a tree parsed by ElementTree (measured on
+# synthetic models, about seven times the size of the document), and a Gaphor element or diagram
+# item with its properties and bookkeeping
+TREE_NODE_BYTES = 660
+ELEMENT_BYTES = 3000
+ITEM_BYTES = 6000
+REFERENCES = frozenset(REFERENCE_ATTRIBUTES)
+# Number of unresolved ids listed in the report
+UNRESOLVED_SAMPLES = 20
+
+class ModelAnalysis():
+    # A dry run over a MagicDraw document: what an import would create, leave out or fail on,
+    # found by classifying every node with the importer's own handler tables. Reads the document
+    # in one streaming pass, without an element factory, and keeps only counts and ids.
+    def __init__(self, profile_library:ProfileLibrary | None = None):
+        self.profile_library = profile_library
+        self.path = None
+        self.size = 0
+        self.seconds = 0.0
+        self.nodes = 0
+        self.attributes = 0
+        self.tags = {}
+        self.types = {}
+        # (table, tag, xmi:type, outcome) of the nodes that are not imported
+        self.not_imported = {}
+        self.elements = 0
+        self.diagrams = 0
+        self.diagram_items = 0
+        self.ids = set()
+        self.referenced_ids = set()
+        # External documents referred to by href, with the number of references; the documents
+        # of the UML specification are not counted
+        self.external = {}
+        self.external_ids = {}
+        # Profiles defined in the document and stereotypes referred to, by profile URI
+        self.document_profiles = {}
+        self.stereotypes = {}
+
+    def read_path(self, path, xml_backend=None):
+        self.path = str(path)
+        start = time.perf_counter()
+        with open_document(path) as (source, size):
+            self.size = size
+            self.read(get_backend(xml_backend).iterparse(source, ("start", "end")))
+        self.seconds = time.perf_counter() - start
+        return self
+
+    def read(self, events):
+        # Table the children of each open node are dispatched on (see classify)
+        tables = []
+        open_elements = []
+        tags = self.tags
+        types = self.types
+        ids = self.ids
+        referenced_ids = self.referenced_ids
+        for event, element in events:
+            if event == "end":
+                tables.pop()
+                open_elements.pop()
+                # Emptied and detached, so that only the open branch stays in memory
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+                continue
+            open_elements.append(element)
+            self.nodes += 1
+            attributes = element.attrib
+            self.attributes += len(attributes)
+            tag = element.tag
+            xmi_type = attributes.get(XMI_TYPE)
+            tags[tag] = tags.get(tag, 0) + 1
+            if xmi_type != None:
+                types[xmi_type] = types.get(xmi_type, 0) + 1
+            id = attributes.get(XMI_ID)
+            if id != None:
+                ids.add(id)
+            if xmi_type != None:
+                # Nodes have fewer attributes than there are reference attributes
+                for name in REFERENCES.intersection(attributes):
+                    referenced_ids.update(attributes[name].split())
+            else:
+                # Outside UML elements (in diagram contents, say) only idrefs are references
+                value = attributes.get(XMI_IDREF)
+                if value != None:
+                    referenced_ids.add(value)
+            href = attributes.get(HREF)
+            if href != None:
+                self.add_href(href)
+            if not tables:
+                tables.append(ROOT_TABLE)
+                continue
+            tables.append(self.classify(tables[-1], element, tag, xmi_type))
+        return self
+
+    def classify(self, table, element, tag, xmi_type) -> HandlerTable | str | None:
+        # Counts what the import does with the node, and returns the table of its children: None
+        # when the handler of the node reads them, LEFT_OUT when the node is not imported
+        if table == ROOT_TABLE:
+            if tag == UML_MODEL:
+                self.elements += 1
+                return MODEL_CHILD_HANDLERS
+            if tag == UML_PROFILE:
+                # Only its stereotypes are imported, by import_Profile
+                self.add_document_profile(element)
+                return LEFT_OUT
+            self.add_not_imported(ROOT_TABLE, tag, xmi_type, IGNORED)
+            return LEFT_OUT
+        if table == LEFT_OUT:
+            # Stereotype references are read from the whole document
+            if tag == "stereotype":
+                self.add_stereotype(element.get("stereotypeHREF"))
+            return LEFT_OUT
+        if table == None:
+            # Read by the handler of an ancestor
+            if tag == "ownedDiagram":
+                self.diagrams += 1
+                self.elements += 1
+            elif tag == "usedObjects":
+                self.diagram_items += 1
+            elif tag == "stereotype":
+                self.add_stereotype(element.get("stereotypeHREF"))
+            return None
+        handler = table.lookup(tag, xmi_type)
+        dispatching_table = DISPATCHING_HANDLERS.get(handler)
+        if dispatching_table != None:
+            table = dispatching_table
+            handler = table.lookup(tag, xmi_type)
+        handled = outcome(handler)
+        if handled == DEFERRED:
+            # Deferred nodes are imported, or reported, by their pending handler after the first pass
+            handled = outcome(handler.pending_handler)
+            if handled == IMPORTED:
+                if element.get(XMI_ID) != None:
+                    self.elements += 1
+                return None
+        if handled != IMPORTED:
+            self.add_not_imported(table.name, tag, xmi_type, handled)
+            return LEFT_OUT
+        if element.get(XMI_ID) != None:
+            self.elements += 1
+        return CHILD_HANDLERS.get(handler)
+
+    def add_not_imported(self, table, tag, xmi_type, handled):
+        key = (table, tag, xmi_type, handled)
+        self.not_imported[key] = self.not_imported.get(key, 0) + 1
+
+    def add_href(self, href):
+        document, separator, fragment = href.partition("#")
+        if not separator:
+            fragment = href
+            document = ""
+        if not document:
+            self.referenced_ids.add(fragment)
+            return
+        if is_standard_library(document):
+            # Primitive types and metaclasses, which the importer maps onto Gaphor's own
+            return
+        # The importer resolves an href by its fragment alone; those that do not resolve within
+        # the document are known by the document they point to
+        uri = profile_uri(document)
+        self.external[uri] = self.external.get(uri, 0) + 1
+        self.external_ids.setdefault(uri, set()).add(fragment)
+
+    def add_document_profile(self, profile_element):
+        uri = profile_element.get("URI")
+        if uri != None:
+            self.document_profiles[profile_uri(uri)] = profile_element.get("name")
+
+    def add_stereotype(self, href):
+        if href == None:
+            return
+        uri = profile_uri(href)
+        self.stereotypes[uri] = self.stereotypes.get(uri, 0) + 1
+
+    def unresolved(self) -> list:
+        return sorted(self.referenced_ids - self.ids)
+
+    def unresolved_external(self) -> dict:
+        counts = {}
+        for uri, fragments in self.external_ids.items():
+            missing = len(fragments - self.ids)
+            if missing:
+                counts[uri] = missing
+        return counts
+
+    def rejected(self) -> int:
+        return sum(count for (table, tag, xmi_type, handled), count in self.not_imported.items() if handled == REJECTED)
+
+    def profile_sources(self) -> dict:
+        # Where the import takes each referenced profile from: the document, the profile library,
+        # or stubs of the referenced stereotypes that extend Element
+        library = {}
+        if self.profile_library != None:
+            library = self.profile_library.entries()
+        sources = {}
+        for uri in self.stereotypes:
+            if uri in self.document_profiles:
+                sources[uri] = "document"
+            elif uri in library:
+                sources[uri] = "library"
+            else:
+                sources[uri] = "stubbed"
+        return sources
+
+    def estimated_bytes(self) -> dict:
+        model = self.elements * ELEMENT_BYTES + self.diagram_items * ITEM_BYTES
+        return {
+            "model": model,
+            "tree_import": model + self.nodes * TREE_NODE_BYTES,
+        }
+
+    def report(self) -> dict:
+        not_imported = []
+        for (table, tag, xmi_type, handled), count in self.not_imported.items():
+            not_imported.append({
+                "table": table,
+                "tag": tag,
+                "xmi:type": xmi_type,
+                "outcome": handled,
+                "count": count,
+            })
+        not_imported.sort(key=lambda entry: entry["count"], reverse=True)
+        unresolved = self.unresolved()
+        profile_sources = self.profile_sources()
+        return {
+            "source": self.path,
+            "bytes": self.size,
+            "seconds": self.seconds,
+            "nodes": self.nodes,
+            "tags": dict(sorted(self.tags.items(), key=lambda item: item[1], reverse=True)),
+            "xmi:types": dict(sorted(self.types.items(), key=lambda item: item[1], reverse=True)),
+            "not_imported": not_imported,
+            "rejected": self.rejected(),
+            "unresolved": {
+                "count": len(unresolved),
+                "ids": unresolved[:UNRESOLVED_SAMPLES],
+                "external": self.unresolved_external(),
+            },
+            "external_references": self.external,
+            "profiles": {
+                uri: {"stereotypes": count, "source": profile_sources[uri]} for uri, count in self.stereotypes.items()
+            },
+            "document_profiles": self.document_profiles,
+            "estimated_elements": self.elements,
+            "estimated_diagrams": self.diagrams,
+            "estimated_diagram_items": self.diagram_items,
+            "estimated_bytes": self.estimated_bytes(),
+        }
+
+    def summary(self) -> list:
+        lines = []
+        lines.append("%d nodes, %.1f MB, analyzed in %.2f s" % (self.nodes, self.size / 2 ** 20, self.seconds))
+        estimated_bytes = self.estimated_bytes()
+        lines.append("estimated %d elements, %d diagrams with %d items, %.0f MB (%.0f MB for a tree import)" % (
+            self.elements, self.diagrams, self.diagram_items,
+            estimated_bytes["model"] / 2 ** 20, estimated_bytes["tree_import"] / 2 ** 20))
+        for (table, tag, xmi_type, handled), count in sorted(self.not_imported.items(), key=lambda item: item[1], reverse=True):
+            lines.append("%s: %d %s in %s" % (handled, count, " ".join(filter(None, (tag, xmi_type))), table))
+        unresolved = self.unresolved()
+        if unresolved:
+            lines.append("unresolved: %d ids, e.g. %s" % (len(unresolved), ", ".join(unresolved[:5])))
+        for uri, count in self.unresolved_external().items():
+            lines.append("external: %d ids in %s" % (count, uri))
+        for uri, source in self.profile_sources().items():
+            lines.append("profile %s: %d stereotype references, %s" % (uri, self.stereotypes[uri], source))
+        return lines
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+    def passes(self, strict=False) -> bool:
+        # Whether the import would succeed, and with strict, leave out nothing and resolve every
+        # reference within the document
+        if self.rejected():
+            return False
+        if not strict:
+            return True
+        return not self.unresolved() and all(handled == IGNORED for (table, tag, xmi_type, handled) in self.not_imported)
+
+def analysis_path_for(source_path) -> str:
+    return str(source_path) + ".analysis.json"
@@ -0,0 +1,48 @@
+import zipfile
+
+from gaphor_mdimport_plugin.mdzip import MODEL_MEMBER, SHARED_MODEL_MEMBER
+from gaphor_mdimport_plugin.xmi import UML_MODEL, UML_PROFILE
+
+# Members of a project archive that hold model parts besides the main model and the shared model:
+# used projects that were packed into the archive
+MODULE_SUFFIXES = (".mdxml", ".xmi")
+
+# Parts are imported in this order, so that everything a part refers to has been imported before it
+PART_PROFILE = "profile"
+PART_MODULE = "module"
+PART_MODEL = "model"
+PART_ORDER = {PART_PROFILE: 0, PART_MODULE: 1, PART_MODEL: 2}
+
+def bundle_members(archive:zipfile.ZipFile) -> list:
+    members = []
+    for name in archive.namelist():
+        if name in (MODEL_MEMBER, SHARED_MODEL_MEMBER) or name.lower().endswith(MODULE_SUFFIXES):
+            members.append(name)
+    return members
+
+def part_kind(member, events) -> str:
+    # The first top level model element of a part tells a profile from a model, so only the start
+    # of the part is read
+    depth = 0
+    for event, element in events:
+        if event == "end":
+            depth -= 1
+            continue
+        depth += 1
+        if depth == 2:
+            if element.tag == UML_PROFILE:
+                return PART_PROFILE
+            if element.tag == UML_MODEL:
+                break
+    if member == MODEL_MEMBER:
+        return PART_MODEL
+    return PART_MODULE
+
+def order_members(archive:zipfile.ZipFile, members, xml) -> list:
+    # The members in import order; parts of the same kind keep their order in the archive
+    kinds = {}
+    for member in members:
+        with archive.open(member) as stream:
+            kinds[member] = part_kind(member, xml.iterparse(stream, ("start", "end")))
+    positions = {member: position for position, member in enumerate(members)}
+    return sorted(members, key=lambda member: (PART_ORDER[kinds[member]], positions[member]))
@@ -0,0 +1,221 @@
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gaphor_mdimport_plugin.modules import DEFAULT_MAX_IDS, ModuleResolver
+from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary
+from gaphor_mdimport_plugin.xmlbackend import BACKEND_AUTO, BACKENDS
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+def create_session():
+    # The services the importer needs, without a main window or any other GTK service
+    from gaphor.core.eventmanager import EventManager
+    from gaphor.core.modeling import ElementFactory
+    from gaphor.core.modeling.elementdispatcher import ElementDispatcher
+    from gaphor.services.modelinglanguage import ModelingLanguageService
+
+    event_manager = EventManager()
+    modeling_language = ModelingLanguageService()
+    element_factory = ElementFactory(event_manager, ElementDispatcher(event_manager, modeling_language))
+    return event_manager, element_factory, modeling_language
+
+def output_path_for(path, output_dir) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if output_dir == None:
+        output_dir = os.path.dirname(os.path.abspath(path))
+    return os.path.join(output_dir, stem + ".gaphor")
+
+def convert(path, output_path, streaming=True, incremental=False, instrument=False, profile=False, all_parts=False, \
+        xml_backend=None, use_profile_library=False, profile_library_dir=None, packages=None, kinds=None, \
+        diagnostics=False, module_dirs=None, module_cache=DEFAULT_MAX_IDS) -> str:
+    from gaphor.storage import storage
+    from gaphor_mdimport_plugin.diagnostics import diagnostics_path_for
+    from gaphor_mdimport_plugin.instrumentation import report_path_for
+    from gaphor_mdimport_plugin.mdimporter import MDImporter
+    from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary
+    from gaphor_mdimport_plugin.selection import ImportSelection
+
+    event_manager, element_factory, modeling_language = create_session()
+    profile_library = None
+    if use_profile_library:
+        profile_library = ProfileLibrary(modeling_language, profile_library_dir)
+    module_resolver = None
+    if module_dirs:
+        module_resolver = ModuleResolver(module_dirs, module_cache, xml_backend)
+    if incremental and os.path.exists(output_path):
+        # Re-import into the model written by the previous run
+        with open(output_path, encoding="utf-8") as model_file:
+            storage.load(model_file, element_factory, modeling_language)
+    # Nothing listens to model events here, so they are not sent at all
+    importer = MDImporter(None, element_factory, event_manager, streaming=streaming, \
+        incremental=incremental, model_filename=output_path, instrument=instrument, profile=profile, \
+        report_path=report_path_for(output_path), bulk_load=True, \
+        all_parts=all_parts, xml_backend=xml_backend, profile_library=profile_library, \
+        module_resolver=module_resolver)
+    if diagnostics:
+        importer.diagnostics_path = diagnostics_path_for(output_path)
+        importer.write_diagnostics = True
+    if packages:
+        scan = importer.scan_path(path)
+        package_ids = []
+        for name in packages:
+            package_id = scan.find_package(name)
+            if package_id == None:
+                raise ValueError("No package " + name + " in " + str(path))
+            package_ids.append(package_id)
+        importer.selection = ImportSelection(scan, package_ids, kinds)
+    importer.process_path(path)
+    temporary_path = output_path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as out:
+        storage.save(out, element_factory)
+    os.replace(temporary_path, output_path)
+    element_factory.shutdown()
+    return output_path
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m gaphor_mdimport_plugin",
+        description="Convert MagicDraw models (.xmi, .xml, .mdzip) to Gaphor models.",
+    )
+    parser.add_argument("inputs", nargs="*", metavar="INPUT", help="MagicDraw model file")
+    parser.add_argument("-o", "--output-dir", help="directory for the .gaphor files (default: next to each input)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of files converted in parallel")
+    parser.add_argument("--tree", action="store_true", help="parse each document completely before importing it")
+    parser.add_argument("--incremental", action="store_true", help="update an existing .gaphor file with what changed")
+    parser.add_argument("--report", action="store_true", help="write a JSON timing report next to each .gaphor file")
+    parser.add_argument("--profile", action="store_true", help="also write cProfile statistics (implies --report)")
+    parser.add_argument("--diagnostics", action="store_true", help="write the problems found by each import as JSON next to "
+        "each .gaphor file")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="WARNING",
+        help="DEBUG logs every problem as it is found, the others a summary per import (default: %(default)s)")
+    parser.add_argument("--all-parts", action="store_true",
+        help="import all model parts of a .mdzip (profiles, shared model, packed modules)")
+    parser.add_argument("--xml-backend", choices=BACKENDS, default=BACKEND_AUTO,
+        help="XML parser; auto uses lxml when it is installed (default: %(default)s)")
+    parser.add_argument("--add-profile", action="append", default=[], metavar="FILE",
+        help="add the profiles of a MagicDraw file to the profile library (repeatable)")
+    parser.add_argument("--profile-library", metavar="DIR", help="directory of the profile library (default: the Gaphor cache directory)")
+    parser.add_argument("--use-profile-library", action="store_true", help="take referenced profiles from the profile library")
+    parser.add_argument("--analyze", action="store_true", help="only analyze each input, without importing it, and write "
+        "a JSON report next to it (or to the output directory); fails when an import would fail")
+    parser.add_argument("--strict", action="store_true", help="with --analyze, also fail when elements would be left out "
+        "or references within the document do not resolve")
+    parser.add_argument("--list-packages", action="store_true", help="print the packages of each input and stop")
+    parser.add_argument("--packages", metavar="P1,P2", help="import only these packages (qualified names or ids), "
+        "and what they refer to")
+    parser.add_argument("--kinds", metavar="K1,K2", help="with --packages, import only these element kinds "
+        "(e.g. uml:Class,uml:Diagram), and what they refer to")
+    parser.add_argument("--module-dir", action="append", default=[], metavar="DIR",
+        help="library directory with the modules (used projects) that hrefs refer to; may be repeated")
+    parser.add_argument("--module-cache", type=int, default=DEFAULT_MAX_IDS, metavar="N",
+        help="ids of module indexes kept in memory at once (default: %(default)s)")
+    return parser.parse_args(argv)
+
+def configure_logging(level):
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s: %(message)s")
+
+def main(argv=None) -> int:
+    arguments = parse_arguments(argv)
+    configure_logging(arguments.log_level)
+    failures = 0
+    for path in arguments.add_profile:
+        try:
+            uris = ProfileLibrary(None, arguments.profile_library).add(path)
+            print (path + " -> profile library: " + ", ".join(uris))
+        except Exception as exception:
+            failures += 1
+            print (path + ": adding profile failed: " + describe(exception), file=sys.stderr)
+    if not arguments.inputs:
+        if failures:
+            return 1
+        return 0
+    if arguments.list_packages:
+        for path in arguments.inputs:
+            list_packages(path, arguments.xml_backend)
+        return 0
+    if arguments.output_dir != None:
+        os.makedirs(arguments.output_dir, exist_ok=True)
+    if arguments.analyze:
+        profile_library = None
+        if arguments.use_profile_library:
+            profile_library = ProfileLibrary(None, arguments.profile_library)
+        for path in arguments.inputs:
+            try:
+                if not analyze(path, arguments.output_dir, arguments.xml_backend, profile_library, arguments.strict):
+                    failures += 1
+            except Exception as exception:
+                failures += 1
+                print (path + ": analysis failed: " + describe(exception), file=sys.stderr)
+        if failures:
+            return 1
+        return 0
+    jobs = [(path, output_path_for(path, arguments.output_dir)) for path in arguments.inputs]
+    streaming = not arguments.tree
+    use_profile_library = arguments.use_profile_library
+    packages = None
+    kinds = None
+    if arguments.packages != None:
+        packages = arguments.packages.split(",")
+    if arguments.kinds != None:
+        kinds = arguments.kinds.split(",")
+    if arguments.jobs <= 1 or len(jobs) == 1:
+        for path, output_path in jobs:
+            try:
+                convert(path, output_path, streaming, arguments.incremental, arguments.report, arguments.profile, \
+                    arguments.all_parts, arguments.xml_backend, use_profile_library, arguments.profile_library, packages, kinds, \
+                    arguments.diagnostics, arguments.module_dir, arguments.module_cache)
+                print (path + " -> " + output_path)
+            except Exception as exception:
+                failures += 1
+                print (path + ": import failed: " + describe(exception), file=sys.stderr)
+    else:
+        # Every worker process builds its own element factory, so files are converted independently
+        with ProcessPoolExecutor(max_workers=arguments.jobs, initializer=configure_logging, initargs=(arguments.log_level,)) as executor:
+            futures = {
+                executor.submit(convert, path, output_path, streaming, arguments.incremental, arguments.report, \
+                    arguments.profile, arguments.all_parts, arguments.xml_backend, use_profile_library, \
+                    arguments.profile_library, packages, kinds, arguments.diagnostics, \
+                    arguments.module_dir, arguments.module_cache): path
+                for path, output_path in jobs
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    print (path + " -> " + future.result())
+                except Exception as exception:
+                    failures += 1
+                    print (path + ": import failed: " + describe(exception), file=sys.stderr)
+    if failures:
+        return 1
+    return 0
+
+def analyze(path, output_dir=None, xml_backend=None, profile_library=None, strict=False) -> bool:
+    # Returns whether the analysis passes
+    from gaphor_mdimport_plugin.analyzer import ModelAnalysis, analysis_path_for
+
+    analysis = ModelAnalysis(profile_library).read_path(path, xml_backend)
+    report_path = analysis_path_for(path)
+    if output_dir != None:
+        report_path = os.path.join(output_dir, os.path.basename(report_path))
+    analysis.write(report_path)
+    print (path + " -> " + report_path)
+    for line in analysis.summary():
+        print ("  " + line)
+    return analysis.passes(strict)
+
+def list_packages(path, xml_backend=None):
+    from gaphor_mdimport_plugin.mdimporter import MDImporter
+    from gaphor.core.modeling import ElementFactory
+
+    scan = MDImporter(None, ElementFactory(), None, xml_backend=xml_backend).scan_path(path)
+    print (path + ":")
+    for package_id in scan.packages:
+        print ("  " + scan.qualified_name(package_id) + " (" + package_id + ")")
+    print ("  kinds: " + ", ".join(scan.kinds()))
+
+def describe(exception) -> str:
+    # ImportException carries its text in message rather than in args
+    return getattr(exception, "message", None) or str(exception) or type(exception).__name__
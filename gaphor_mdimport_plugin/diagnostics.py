@@ -0,0 +1,73 @@
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+# Number of ids kept for each message
+DEFAULT_SAMPLES = 10
+
+class Diagnostic():
+    __slots__ = ("level", "count", "ids")
+
+    def __init__(self, level):
+        self.level = level
+        self.count = 0
+        self.ids = []
+
+class ImportDiagnostics():
+    # Problems found during an import, aggregated by message: how often each occurred, and the
+    # ids of the first few elements it occurred for. Every occurrence is logged at DEBUG level
+    # only; the summary is logged once, at the level of each message, when the import ends.
+    def __init__(self, samples=DEFAULT_SAMPLES):
+        self.samples = samples
+        self.messages = {}
+
+    def add(self, level, message, id=None, count=1):
+        diagnostic = self.messages.get(message)
+        if diagnostic == None:
+            diagnostic = Diagnostic(level)
+            self.messages[message] = diagnostic
+        diagnostic.count += count
+        if id != None and len(diagnostic.ids) < self.samples and id not in diagnostic.ids:
+            diagnostic.ids.append(id)
+        if id != None:
+            log.debug("%s (%s)", message, id)
+        else:
+            log.debug("%s", message)
+
+    def info(self, message, id=None):
+        self.add(logging.INFO, message, id)
+
+    def warning(self, message, id=None):
+        self.add(logging.WARNING, message, id)
+
+    def count(self) -> int:
+        return sum(diagnostic.count for diagnostic in self.messages.values())
+
+    def ordered(self) -> list:
+        return sorted(self.messages.items(), key=lambda item: (-item[1].level, -item[1].count))
+
+    def report(self) -> dict:
+        return {
+            "count": self.count(),
+            "messages": [{
+                "level": logging.getLevelName(diagnostic.level),
+                "message": message,
+                "count": diagnostic.count,
+                "ids": diagnostic.ids,
+            } for message, diagnostic in self.ordered()],
+        }
+
+    def log_summary(self):
+        for message, diagnostic in self.ordered():
+            if diagnostic.ids:
+                log.log(diagnostic.level, "%d x %s, e.g. %s", diagnostic.count, message, ", ".join(diagnostic.ids))
+            else:
+                log.log(diagnostic.level, "%d x %s", diagnostic.count, message)
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as diagnostics_file:
+            json.dump(self.report(), diagnostics_file, indent=2)
+
+def diagnostics_path_for(source_path) -> str:
+    return str(source_path) + ".diagnostics.json"
@@ -0,0 +1,66 @@
+from gaphas.segment import Segment
+from gaphor.core.modeling.diagram import Diagram
+from gaphor.diagram.drop import drop
+from gaphor.diagram.presentation import ElementPresentation, LinePresentation
+
+class DiagramBuilder():
+    # Populates a diagram in bulk: the used objects are collected first (each element once),
+    # then all shapes are dropped, then the relationships are dropped so that they can connect
+    # to shapes that are already on the diagram. Update requests made by the drops are collected
+    # and handed to the diagram once, when the diagram is complete.
+    def __init__(self, diagram:Diagram):
+        self.diagram = diagram
+        self.shapes = {}
+        self.links = {}
+        self.dirty_items = {}
+
+    def add_shape(self, element, bounds=None):
+        self.shapes.setdefault(element.id, (element, bounds))
+
+    def add_link(self, element, points=None):
+        self.links.setdefault(element.id, (element, points))
+
+    def request_update(self, item):
+        self.dirty_items[item] = None
+
+    def build(self):
+        diagram = self.diagram
+        # Shadow the diagram's request_update while the items are created
+        diagram.request_update = self.request_update
+        try:
+            items = []
+            for element, bounds in self.shapes.values():
+                items.append(self.place_shape(element, bounds))
+            for element, points in self.links.values():
+                items.append(self.place_link(element, points))
+        finally:
+            del diagram.request_update
+        for item in items:
+            if item != None:
+                self.dirty_items[item] = None
+        for item in self.dirty_items:
+            diagram.request_update(item)
+        return items
+
+    def place_shape(self, element, bounds):
+        if bounds == None:
+            return drop(element, self.diagram, x=0, y=0)
+        x, y, width, height = bounds
+        item = drop(element, self.diagram, x=x, y=y)
+        if isinstance(item, ElementPresentation):
+            # Sizes below the minimal size of the item are raised again by its constraints
+            item.width = width
+            item.height = height
+        return item
+
+    def place_link(self, element, points):
+        item = drop(element, self.diagram, x=0, y=0)
+        if not isinstance(item, LinePresentation) or not points or len(points) < 2:
+            return item
+        # The line is at the diagram origin, so its handle positions are diagram coordinates.
+        # Head and tail are moved to their connected ports again when the diagram is solved.
+        if len(points) > 2:
+            Segment(item, self.diagram).split_segment(0, len(points) - 1)
+        for handle, point in zip(item.handles(), points):
+            handle.pos = point
+        return item
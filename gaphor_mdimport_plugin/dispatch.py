@@ -0,0 +1,49 @@
+import sys
+
+# What the handler of a node does with it, for the dry run of the analyzer. Handlers that do not
+# import the node are marked with an outcome attribute; any other handler imports it.
+IMPORTED = "imported"
+DEFERRED = "deferred"
+SKIPPED = "skipped"
+IGNORED = "ignored"
+REJECTED = "rejected"
+
+def mark(handler, outcome):
+    handler.outcome = outcome
+    return handler
+
+def outcome(handler) -> str:
+    return getattr(handler, "outcome", IMPORTED)
+
+class HandlerTable():
+    # Maps (tag, xmi:type) of an XML node to the handler that imports it. A handler registered
+    # with xmi_type None applies to the tag whatever its type; nodes matching nothing go to the
+    # default handler. Handlers are called as handler(importer, element, owner).
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+        self.handlers = {}
+        # Resolution cache, so that every node is classified with a single dict lookup
+        self.resolved = {}
+
+    def register(self, tag, xmi_type, handler):
+        if xmi_type != None:
+            xmi_type = sys.intern(xmi_type)
+        self.handlers[(sys.intern(tag), xmi_type)] = handler
+        self.resolved.clear()
+
+    def unregister(self, tag, xmi_type):
+        self.handlers.pop((tag, xmi_type), None)
+        self.resolved.clear()
+
+    def lookup(self, tag, xmi_type):
+        key = (tag, xmi_type)
+        try:
+            return self.resolved[key]
+        except KeyError:
+            pass
+        handler = self.handlers.get(key)
+        if handler == None:
+            handler = self.handlers.get((tag, None), self.default)
+        self.resolved[key] = handler
+        return handler
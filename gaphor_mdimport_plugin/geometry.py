@@ -0,0 +1,60 @@
+import xml.etree.ElementTree as ET
+
+from gaphor_mdimport_plugin.idindex import IdIndex
+
+def parse_bounds(text) -> tuple | None:
+    # Shape geometry is stored as "x, y, width, height"
+    values = text.split(",")
+    if len(values) != 4:
+        return None
+    try:
+        return tuple(float(value) for value in values)
+    except ValueError:
+        return None
+
+def parse_points(text) -> list:
+    # Path geometry is stored as "x1, y1; x2, y2; ...", usually with a trailing separator
+    points = []
+    for point in text.split(";"):
+        values = point.split(",")
+        if len(values) != 2:
+            continue
+        try:
+            points.append((float(values[0]), float(values[1])))
+        except ValueError:
+            continue
+    return points
+
+class DiagramGeometry():
+    # Bounds of the shapes and points of the paths of one MagicDraw diagram, keyed by the xmi:id
+    # of the element they present. The first presentation of an element wins, as only one item
+    # per element is created in the Gaphor diagram.
+    def __init__(self, index:IdIndex):
+        self.index = index
+        self.bounds = {}
+        self.points = {}
+
+    def read(self, contents:ET.Element):
+        for md_element in contents.iter("mdElement"):
+            element_id_element = md_element.find("elementID")
+            geometry_element = md_element.find("geometry")
+            if element_id_element == None or geometry_element == None or geometry_element.text == None:
+                continue
+            href = element_id_element.get("href")
+            if href == None:
+                continue
+            id = self.index.href_id(href)
+            text = geometry_element.text
+            if ";" in text:
+                if id not in self.points:
+                    self.points[id] = parse_points(text)
+            elif id not in self.bounds:
+                bounds = parse_bounds(text)
+                if bounds != None:
+                    self.bounds[id] = bounds
+
+    def get_bounds(self, id) -> tuple | None:
+        return self.bounds.get(id)
+
+    def get_points(self, id) -> list | None:
+        return self.points.get(id)
@@ -0,0 +1,59 @@
+class IdIndex():
+    # Per-import index of xmi:id to the Gaphor element created for it, and of the ids of the XML
+    # nodes that were read. Elements that already existed in the model before the import are picked up from
+    # the element factory on first use and then served from the index as well.
+    def __init__(self, element_factory, record_nodes=True):
+        self.element_factory = element_factory
+        self.record_nodes = record_nodes
+        self.elements = {}
+        # Ids of the XML nodes seen, the nodes themselves are not kept
+        self.node_ids = set()
+        self.href_ids = {}
+        # Lookups by resolve() that found nothing: dangling ones for an id that is not in the
+        # source at all, unimported ones for a node for which no Gaphor element was created.
+        # Unresolved refer() references are reported by the importer one by one instead.
+        self.dangling = 0
+        self.unimported = 0
+
+    def add(self, id, element):
+        self.elements[id] = element
+
+    def add_node(self, id, node):
+        if self.record_nodes:
+            self.node_ids.add(id)
+
+    def lookup(self, id):
+        element = self.elements.get(id)
+        if element == None and id != None:
+            element = self.element_factory.lookup(id)
+            if element != None:
+                self.elements[id] = element
+        return element
+
+    def resolve(self, id):
+        # Like lookup, but for references that are expected to exist
+        element = self.lookup(id)
+        if element == None:
+            if id in self.node_ids:
+                self.unimported += 1
+            else:
+                self.dangling += 1
+        return element
+
+    def href_id(self, href):
+        # The element id of an href is its fragment ("doc.xmi#id" and "#id" both give "id")
+        id = self.href_ids.get(href)
+        if id == None:
+            document, separator, fragment = href.partition("#")
+            if separator:
+                id = fragment
+            else:
+                id = href
+            self.href_ids[href] = id
+        return id
+
+    def resolve_href(self, href):
+        return self.resolve(self.href_id(href))
+
+    def unresolved(self):
+        return self.dangling + self.unimported
@@ -0,0 +1,43 @@
+import os
+
+# Options of the imports from the Tools menu: (name, default, label). They are kept as Gaphor
+# properties of the model under "mdimport-<name>", so a model that is re-imported regularly keeps
+# its choices.
+OPTIONS = (
+    ("lazy_diagrams", False, "Populate diagrams when they are first opened"),
+    ("incremental", False, "Only apply what changed since the previous import"),
+    ("import_all_parts", False, "Import all model parts of a .mdzip project"),
+    ("use_profile_library", False, "Take referenced profiles from the profile library"),
+    ("instrument", False, "Write a timing report of every import"),
+    ("profile", False, "Add cProfile statistics to the timing report"),
+)
+MODULE_DIRECTORIES = "module_directories"
+PROPERTY_PREFIX = "mdimport-"
+
+class ImportOptions():
+    def __init__(self):
+        for name, default, label in OPTIONS:
+            setattr(self, name, default)
+        # Library directories with the modules (used projects) that hrefs of imported models refer to
+        self.module_directories = []
+
+    @classmethod
+    def load(cls, properties):
+        options = cls()
+        if properties == None:
+            return options
+        for name, default, label in OPTIONS:
+            setattr(options, name, bool(properties.get(PROPERTY_PREFIX + name, default)))
+        options.module_directories = list(properties.get(PROPERTY_PREFIX + MODULE_DIRECTORIES, []))
+        return options
+
+    def save(self, properties):
+        for name, default, label in OPTIONS:
+            properties.set(PROPERTY_PREFIX + name, getattr(self, name))
+        properties.set(PROPERTY_PREFIX + MODULE_DIRECTORIES, list(self.module_directories))
+
+    def module_directories_text(self) -> str:
+        return os.pathsep.join(self.module_directories)
+
+    def set_module_directories_text(self, text):
+        self.module_directories = [directory.strip() for directory in text.split(os.pathsep) if directory.strip()]
@@ -0,0 +1,95 @@
+from gaphor.core.modeling import ModelReady
+from gaphor.event import ActionEnabled
+from gaphor.transaction import Transaction
+
+class ImportTransaction():
+    # The transaction an import runs in. Without chunk_steps this is one Transaction, so the whole
+    # import is a single undoable step. With chunk_steps the transaction is committed after every
+    # chunk_steps import steps, so the undo manager never holds more than one chunk of actions.
+    # A sliced import runs in main loop slices and has no transaction open between them (see
+    # pause), so that nothing the user does meanwhile becomes part of the import.
+    # A chunked or sliced import, or one that is not recorded by the undo manager at all, is not
+    # undoable, like loading a file: the undo history is cleared after every commit (see
+    # clear_undo_history), and on rollback every element the import created is removed again.
+    def __init__(self, event_manager, element_factory, chunk_steps=None, undoable=True, sliced=False, \
+            undo_manager=None):
+        self.event_manager = event_manager
+        self.element_factory = element_factory
+        self.chunk_steps = chunk_steps
+        # An import that is not undoable from the start sends no model events; views are refreshed
+        # by a ModelReady event at the end
+        self.bulk = not undoable
+        self.undoable = undoable and chunk_steps == None and not sliced
+        self.undo_manager = undo_manager
+        self.steps_in_chunk = 0
+        self.existing_ids = None
+        if not self.undoable:
+            self.existing_ids = set(element.id for element in element_factory.select())
+        # A sliced import opens its transaction when its first slice runs
+        self.transaction = None
+        if not sliced:
+            self.transaction = Transaction(event_manager)
+
+    def resume(self):
+        if self.transaction == None:
+            self.transaction = Transaction(self.event_manager)
+
+    def pause(self):
+        # Commits what has been imported so far, as Gaphor's transactions are global: one that is
+        # left open while the main loop runs would take in the user's edits and undos as well
+        if self.transaction != None:
+            self.transaction.commit()
+            self.transaction = None
+            self.steps_in_chunk = 0
+            self.clear_undo_history()
+
+    def step(self):
+        if self.chunk_steps == None:
+            return
+        self.steps_in_chunk += 1
+        if self.steps_in_chunk >= self.chunk_steps:
+            self.transaction.commit()
+            self.clear_undo_history()
+            self.transaction = Transaction(self.event_manager)
+            self.steps_in_chunk = 0
+
+    def commit(self):
+        self.pause()
+        if self.bulk:
+            self.model_ready()
+
+    def rollback(self):
+        if self.transaction != None:
+            self.transaction.rollback()
+            self.transaction = None
+        if self.undoable:
+            return
+        # Earlier chunks and slices have been committed already
+        with Transaction(self.event_manager):
+            created = self.element_factory.lselect(lambda element: element.id not in self.existing_ids)
+            for element in created:
+                # Unlinking an element may already have removed the elements it owned
+                if self.element_factory.lookup(element.id) is element:
+                    element.unlink()
+        # Undoing the removal would bring back a part of the cancelled import
+        self.clear_undo_history()
+        if self.bulk:
+            self.model_ready()
+
+    def clear_undo_history(self):
+        # Gaphor's undo manager records every committed transaction and has no way to suspend it.
+        # The entries of an import that is not undoable are dropped right after each commit, so
+        # the undo manager never holds more than the current chunk or slice, and no step of the
+        # import can be undone. Earlier entries go as well, as they may refer to elements the
+        # import has changed since.
+        if self.undoable or self.undo_manager == None:
+            return
+        self.undo_manager.clear_undo_stack()
+        self.undo_manager.clear_redo_stack()
+        self.event_manager.handle(ActionEnabled("win.edit-undo", False))
+        self.event_manager.handle(ActionEnabled("win.edit-redo", False))
+
+    def model_ready(self):
+        # Views rebuild once after a bulk load, which sent no change events. An import that did send
+        # them does not need this: ModelReady also replays Gaphor's recovery log of unsaved changes.
+        self.event_manager.handle(ModelReady(self.element_factory, modified=True))
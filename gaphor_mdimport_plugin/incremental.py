@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+
+import xml.etree.ElementTree as ET
+
+from gaphor_mdimport_plugin.xmi import XMI_ID
+
+log = logging.getLogger(__name__)
+
+# Version 1 kept the state of a source under its file name
+STATE_VERSION = 2
+# Children that are compared on their own, so a change inside them does not mark the parent changed
+SEPARATELY_HASHED_TAGS = frozenset(("packagedElement", "ownedDiagram"))
+
+def sidecar_path(path) -> str:
+    return str(path) + ".mdimport.json"
+
+def subtree_hash(element:ET.Element) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    update_hash(digest, element)
+    return digest.hexdigest()
+
+def update_hash(digest, element:ET.Element):
+    digest.update(element.tag.encode())
+    for name, value in sorted(element.attrib.items()):
+        digest.update(b"\x01" + name.encode() + b"\x02" + value.encode())
+    if element.text != None:
+        text = element.text.strip()
+        if text:
+            digest.update(b"\x03" + text.encode())
+    for child in element:
+        if child.tag in SEPARATELY_HASHED_TAGS:
+            continue
+        digest.update(b"\x04")
+        update_hash(digest, child)
+    digest.update(b"\x05")
+
+class ImportState():
+    # Content hashes of the packaged elements and diagrams of MagicDraw sources, and the ids that
+    # were imported from them, as recorded by the previous import into the same Gaphor model.
+    # The state of every source imported into a model is kept in one sidecar file, keyed by the
+    # xmi:id of the source's top level uml:Model or uml:Profile, which stays the same when the
+    # source is exported again under another file name.
+    def __init__(self, path):
+        self.path = path
+        self.data = self.read()
+        self.hashes = {}
+        self.ids = set()
+        self.seen = set()
+        # New hashes and seen ids of each source in this import
+        self.sources = {}
+        self.new_hashes = {}
+        self.source_seen = set()
+
+    @classmethod
+    def load(cls, path):
+        return cls(path)
+
+    def read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            log.warning("Ignoring unreadable import state: %s", self.path)
+            return {}
+
+    def begin_source(self, source):
+        # Called when the top level element of a source starts, before anything in it is seen
+        if source not in self.sources:
+            self.sources[source] = ({}, set())
+            source_state = self.data.get(source)
+            if isinstance(source_state, dict) and source_state.get("version") == STATE_VERSION:
+                self.hashes.update(source_state.get("hashes", {}))
+                self.ids.update(source_state.get("ids", ()))
+        self.new_hashes, self.source_seen = self.sources[source]
+
+    def unchanged(self, element:ET.Element) -> bool:
+        id = element.get(XMI_ID)
+        digest = subtree_hash(element)
+        self.new_hashes[id] = digest
+        return self.hashes.get(id) == digest
+
+    def see(self, id):
+        self.seen.add(id)
+        self.source_seen.add(id)
+
+    def see_tree(self, root:ET.Element):
+        for element in root.iter():
+            id = element.get(XMI_ID)
+            if id != None:
+                self.see(id)
+
+    def removed_ids(self) -> set:
+        return self.ids - self.seen
+
+    def save(self, imported_ids):
+        imported_ids = set(imported_ids)
+        data = {source: source_state for source, source_state in self.data.items()
+            if isinstance(source_state, dict) and source_state.get("version") == STATE_VERSION}
+        for source, (new_hashes, source_seen) in self.sources.items():
+            data[source] = {
+                "version": STATE_VERSION,
+                "hashes": new_hashes,
+                "ids": sorted(source_seen & imported_ids),
+            }
+        temporary_path = str(self.path) + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as state_file:
+            json.dump(data, state_file)
+        os.replace(temporary_path, self.path)
+        self.data = data
@@ -0,0 +1,123 @@
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+
+class ImportInstrumentation():
+    # Collects where the time of an import goes: wall time per phase, number of calls and
+    # cumulative time per handler (inclusive, and exclusive of the handlers it dispatched to),
+    # named timers, and the high-water marks of the deferred queues.
+    def __init__(self, profile=False):
+        self.phases = {}
+        self.handlers = {}
+        self.timers = {}
+        self.queues = {}
+        self.wrapped = {}
+        # Time spent in nested handlers, one entry per handler that is running
+        self.child_times = [0.0]
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+
+    def steps(self, steps, queue_lengths):
+        # Wraps a step generator, timing each step for the phase it reports. With profiling,
+        # the profiler only runs while the import works, not while the main loop has control.
+        start = time.perf_counter()
+        try:
+            while True:
+                if self.profiler != None:
+                    self.profiler.enable()
+                try:
+                    progress = next(steps)
+                except StopIteration:
+                    break
+                finally:
+                    if self.profiler != None:
+                        self.profiler.disable()
+                phase = progress[0]
+                start = self.add_phase_time(phase, start)
+                for name, length in queue_lengths():
+                    self.queues[name] = max(self.queues.get(name, 0), length)
+                yield progress
+                # Time spent by the caller between steps is not part of the import
+                start = time.perf_counter()
+        finally:
+            steps.close()
+        self.add_phase_time("Finishing", start)
+
+    def add_phase_time(self, phase, start):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - start
+        return now
+
+    def lookup(self, table, tag, xmi_type):
+        key = (table.name, tag, xmi_type)
+        wrapper = self.wrapped.get(key)
+        if wrapper == None:
+            wrapper = self.wrap(key, table.lookup(tag, xmi_type))
+            self.wrapped[key] = wrapper
+        return wrapper
+
+    def wrap(self, key, handler):
+        statistics = self.handlers.setdefault(key, [0, 0.0, 0.0])
+        child_times = self.child_times
+
+        def timed_handler(importer, element, owner):
+            child_times.append(0.0)
+            start = time.perf_counter()
+            try:
+                return handler(importer, element, owner)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = child_times.pop()
+                child_times[-1] += elapsed
+                statistics[0] += 1
+                statistics[1] += elapsed
+                statistics[2] += elapsed - nested
+
+        return timed_handler
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            statistics = self.timers.setdefault(name, [0, 0.0])
+            statistics[0] += 1
+            statistics[1] += time.perf_counter() - start
+
+    def report(self) -> dict:
+        handlers = []
+        for (table, tag, xmi_type), (calls, inclusive, exclusive) in self.handlers.items():
+            handlers.append({
+                "table": table,
+                "tag": tag,
+                "xmi:type": xmi_type,
+                "calls": calls,
+                "seconds": inclusive,
+                "exclusive_seconds": exclusive,
+            })
+        handlers.sort(key=lambda entry: entry["exclusive_seconds"], reverse=True)
+        return {
+            "phases": self.phases,
+            "total_seconds": sum(self.phases.values()),
+            "handlers": handlers,
+            "timers": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.timers.items()},
+            "queue_high_water": self.queues,
+        }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+        if self.profiler != None:
+            self.profiler.dump_stats(profile_path(path))
+
+def report_path_for(source_path) -> str:
+    return str(source_path) + ".import-report.json"
+
+def profile_path(report_path) -> str:
+    path = str(report_path)
+    if path.endswith(".json"):
+        path = path[:-len(".json")]
+    return path + ".prof"
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+
+from gaphor.core.modeling.coremodel import Relationship
+from gaphor.core.modeling.diagram import Diagram
+from gaphor.UML import Property
+
+from gaphor_mdimport_plugin.diagrambuilder import DiagramBuilder
+from gaphor_mdimport_plugin.geometry import DiagramGeometry
+
+log = logging.getLogger(__name__)
+
+def records_path(path) -> str:
+    # The records of diagrams that were not populated yet are kept next to the saved Gaphor model
+    return str(path) + ".mdimport-diagrams.json"
+
+class DiagramRecord():
+    # What is needed to populate an imported diagram later: the ids of its used objects, in
+    # MagicDraw order, and their stored geometry. Elements are looked up again when the diagram
+    # is materialized, so the record holds no references into the model.
+    def __init__(self):
+        self.used_object_ids = {}
+        self.bounds = {}
+        self.points = {}
+
+    def add(self, used_object_id, geometry:DiagramGeometry):
+        if used_object_id in self.used_object_ids:
+            return
+        self.used_object_ids[used_object_id] = None
+        bounds = geometry.get_bounds(used_object_id)
+        if bounds != None:
+            self.bounds[used_object_id] = bounds
+        points = geometry.get_points(used_object_id)
+        if points != None:
+            self.points[used_object_id] = points
+
+    def to_json(self) -> dict:
+        return {
+            "used_object_ids": list(self.used_object_ids),
+            "bounds": self.bounds,
+            "points": self.points,
+        }
+
+    @classmethod
+    def from_json(cls, data:dict):
+        record = cls()
+        record.used_object_ids = dict.fromkeys(data.get("used_object_ids", ()))
+        record.bounds = {id: tuple(bounds) for id, bounds in data.get("bounds", {}).items()}
+        record.points = {id: [tuple(point) for point in points] for id, points in data.get("points", {}).items()}
+        return record
+
+    def materialize(self, diagram:Diagram, element_factory):
+        builder = DiagramBuilder(diagram)
+        for used_object_id in self.used_object_ids:
+            used_object = element_factory.lookup(used_object_id)
+            if used_object == None or used_object is diagram:
+                continue
+            if isinstance(used_object, Relationship):
+                builder.add_link(used_object, self.points.get(used_object_id))
+            elif isinstance(used_object, Property): # skip properties
+                pass
+            else:
+                builder.add_shape(used_object, self.bounds.get(used_object_id))
+        builder.build()
+
+class DiagramStore():
+    # Records of imported diagrams that have not been opened yet, keyed by diagram id
+    def __init__(self):
+        self.records = {}
+
+    def get_record(self, diagram_id) -> DiagramRecord:
+        record = self.records.get(diagram_id)
+        if record == None:
+            record = DiagramRecord()
+            self.records[diagram_id] = record
+        return record
+
+    def pop(self, diagram_id) -> DiagramRecord | None:
+        return self.records.pop(diagram_id, None)
+
+    def materialize_all(self, element_factory):
+        # Populates every diagram that has not been opened yet
+        records = self.records
+        self.records = {}
+        for diagram_id, record in records.items():
+            diagram = element_factory.lookup(diagram_id)
+            if isinstance(diagram, Diagram) and not diagram.ownedPresentation:
+                record.materialize(diagram, element_factory)
+
+    def clear(self):
+        self.records.clear()
+
+    def save(self, path):
+        # Written whenever the model is saved, so diagrams that were never opened are still
+        # populated when they are opened after the model has been loaded again
+        if not self.records:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        data = {diagram_id: record.to_json() for diagram_id, record in self.records.items()}
+        temporary_path = str(path) + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as records_file:
+            json.dump(data, records_file)
+        os.replace(temporary_path, path)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as records_file:
+                data = json.load(records_file)
+        except (OSError, ValueError):
+            log.warning("Ignoring unreadable diagram records: %s", path)
+            return
+        for diagram_id, record in data.items():
+            self.records[diagram_id] = DiagramRecord.from_json(record)
@@ -1,47 +1,225 @@
 import gi
 
-from gi.repository import Gtk
+from gi.repository import GLib
 from gaphor.core.modeling import ElementFactory
 from gaphor.core.modeling.coremodel import Relationship
 from gaphor.core.modeling.diagram import Diagram
 from gaphor.core.modeling.coremodel import Comment
-from gaphor.diagram.drop import drop 
+from gaphor.core.modeling.properties import association as association_property, attribute, enumeration
 from gaphor.UML import Abstraction, Actor, Association, Class, Classifier, DataType, Dependency, Enumeration, \
     EnumerationLiteral, Generalization, \
     Include, InstanceSpecification, \
     Interface, InterfaceRealization, Operation, \
     Package, Parameter, Profile, Property, Realization, Slot, Stereotype, UseCase 
-from gaphor.transaction import Transaction
 from gaphor.UML.recipes import create_extension
-# from gaphor.extensions.ipython import auto_layout
-
-from Lib.queue import Queue
 
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from itertools import chain
+import logging
+import os
+import time
 import xml.etree.ElementTree as ET
+import zipfile
+
+from gaphor_mdimport_plugin.bundle import bundle_members, order_members
+from gaphor_mdimport_plugin.diagnostics import ImportDiagnostics, diagnostics_path_for
+from gaphor_mdimport_plugin.diagrambuilder import DiagramBuilder
+from gaphor_mdimport_plugin.dispatch import DEFERRED, IGNORED, REJECTED, SKIPPED, HandlerTable, mark
+from gaphor_mdimport_plugin.geometry import DiagramGeometry
+from gaphor_mdimport_plugin.idindex import IdIndex
+from gaphor_mdimport_plugin.importtransaction import ImportTransaction
+from gaphor_mdimport_plugin.incremental import ImportState, sidecar_path
+from gaphor_mdimport_plugin.instrumentation import ImportInstrumentation, report_path_for
+from gaphor_mdimport_plugin.lazydiagrams import DiagramStore
+from gaphor_mdimport_plugin.mdzip import is_mdzip, select_model_member
+from gaphor_mdimport_plugin.modules import ModuleIndex, ModuleResolver
+from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary, profile_uri
+from gaphor_mdimport_plugin.records import PendingRecord, compact
+from gaphor_mdimport_plugin.resolver import ReferenceResolver
+from gaphor_mdimport_plugin.selection import ImportSelection, ModelScan
+from gaphor_mdimport_plugin.xmi import DIAGRAM_REPRESENTATION_OBJECT, PRIMITIVE_TYPES_HREF, UML_MODEL, UML_PROFILE, \
+    XMI_EXTENSION, XMI_ID, XMI_IDREF, XMI_TYPE
+from gaphor_mdimport_plugin.xmlbackend import get_backend
+
+PHASE_PARSE = "Parsing"
+PHASE_PACKAGED_ELEMENTS = "Packaged elements"
+PHASE_PENDING = "Pending references"
+PHASE_DIAGRAMS = "Diagrams"
+PHASE_DIAGRAM_REFERENCES = "Diagram references"
+PHASES = [PHASE_PARSE, PHASE_PACKAGED_ELEMENTS, PHASE_PENDING, PHASE_DIAGRAMS, PHASE_DIAGRAM_REFERENCES]
+
+# Seconds of import work done per main loop iteration by process_file_async
+STEP_SLICE = 0.05
+# Number of parsed elements between progress reports while parsing
+PARSE_STEP = 1000
+
+# Values that handlers set from the source. When a changed element is updated in place they are
+# reset first, so that a value the new export no longer has does not stay (see reset_imported_values)
+IMPORTED_VALUES = ("name", "visibility", "isAbstract", "isStatic", "isReadOnly", "direction", "lowerValue",
+    "upperValue", "body", "value", "type", "general", "contract", "addition", "classifier", "definingFeature",
+    "client", "supplier")
+
+# Owner of the contents of a package that is left out of a selective import while streaming
+EXCLUDED_PACKAGE = object()
+
+# Gaphor types of the elements of other modules that references are set to
+MODULE_ELEMENT_TYPES = {
+    "uml:Actor": Actor,
+    "uml:Association": Association,
+    "uml:Class": Class,
+    "uml:DataType": DataType,
+    "uml:Enumeration": Enumeration,
+    "uml:EnumerationLiteral": EnumerationLiteral,
+    "uml:Interface": Interface,
+    "uml:Model": Package,
+    "uml:Package": Package,
+    "uml:PrimitiveType": DataType,
+    "uml:Profile": Profile,
+    "uml:Property": Property,
+    "uml:Stereotype": Stereotype,
+    "uml:UseCase": UseCase,
+}
+
+PRIMITIVE_TYPE_NAMES = {
+    PRIMITIVE_TYPES_HREF + name: name for name in ["String", "Integer", "Boolean", "Real", "UnlimitedNatural"]
+}
 
 class PendingEntry():
-    def __init__(self, element:ET.Element, parent:ET.Element):
+    # An element that is imported by handler after the first pass, with the id of the Gaphor
+    # element of its XML parent. The element is a compact copy, not a node of the parsed tree.
+    __slots__ = ("element", "parent_id", "handler")
+
+    def __init__(self, element:PendingRecord, parent_id:str | None, handler):
         self.element = element
-        self.parent = parent
+        self.parent_id = parent_id
+        self.handler = handler
+
+class DiagramEntry():
+    # A diagram to populate after all elements exist: for every representation object of the
+    # diagram its type, the ids of its used objects in MagicDraw order, and its stored geometry
+    __slots__ = ("diagram_id", "views")
+
+    def __init__(self, diagram_id:str):
+        self.diagram_id = diagram_id
+        self.views = []
+
+class DiagramReferenceEntry():
+    # A diagram shown on another diagram, dropped after all diagrams have been populated
+    __slots__ = ("diagram_id", "used_object_id", "bounds")
+
+    def __init__(self, diagram_id:str, used_object_id:str, bounds):
+        self.diagram_id = diagram_id
+        self.used_object_id = used_object_id
+        # Stored shape bounds of the referenced diagram
+        self.bounds = bounds
 
 class ImportException(Exception):
     def __init__(self, message):
          self.message = message
 
 class MDImporter():
-    def __init__(self, window, element_factory:ElementFactory, event_manager):
+    def __init__(self, window, element_factory:ElementFactory, event_manager, streaming=False, diagram_store:DiagramStore | None = None, \
+            incremental=False, model_filename=None, instrument=False, profile=False, report_path=None, \
+            chunk_steps=None, bulk_load=False, all_parts=False, xml_backend=None, \
+            profile_library:ProfileLibrary | None = None, selection:ImportSelection | None = None, \
+            write_diagnostics=False, diagnostics_path=None, module_resolver:ModuleResolver | None = None, \
+            undo_manager=None):
         self.window = window
         self.element_factory = element_factory
         self.event_manager = event_manager
-        self.pending_queue = Queue()
-        self.diagram_queue = Queue()
-        self.link_queue = Queue()
-        self.diagram_reference_queue = Queue()
+        self.streaming = streaming
+        # With a diagram store, diagrams are imported as empty shells plus a record of their
+        # contents, and are populated when they are first opened
+        self.diagram_store = diagram_store
+        # An incremental import compares every packaged element and diagram with the hash recorded
+        # by the previous import of the same MagicDraw model, kept in a sidecar of the Gaphor model
+        # (or of the source when the model has not been saved yet)
+        self.incremental = incremental
+        self.model_filename = model_filename
+        self.state:ImportState | None = None
+        # Set while a changed element is imported, so that existing elements are updated
+        self.updating = False
+        # Optional timing report (and cProfile stats with profile), written next to the source
+        # unless a report path is given
+        self.instrumentation:ImportInstrumentation | None = None
+        self.report_path = report_path
+        self.lookup_handler = HandlerTable.lookup
+        # Commit every chunk_steps import steps instead of keeping the whole import in one
+        # undoable transaction
+        self.chunk_steps = chunk_steps
+        # Gaphor's undo manager, if any: an import that can not be undone clears its history
+        self.undo_manager = undo_manager
+        # In a bulk load the element factory sends no events while the import runs; subscribers
+        # (the model browser) are told once, by a ModelReady event at the end
+        self.bulk_load = bulk_load
+        # With all_parts, every model part of a project archive (profiles, the shared model and
+        # packed used projects, and the main model) is imported
+        self.all_parts = all_parts
+        # Parser backend by name (see xmlbackend), lxml when it is installed unless one is given
+        self.xml = get_backend(xml_backend)
+        # Referenced profiles found in the profile library are copied into the model completely
+        self.profile_library = profile_library
+        # Whether the profile of each referenced profile URI was taken from the library
+        self.library_profiles = {}
+        # Profiles imported from the source, by URI
+        self.profile_uris = {}
+        # With a selection, only the chosen packages and element kinds, and what they refer to,
+        # are imported (see scan_path)
+        self.selection = selection
+        # Problems found while importing, logged as a summary at the end of the import and, with
+        # write_diagnostics, written next to the source unless a path is given
+        self.diagnostics = ImportDiagnostics()
+        self.write_diagnostics = write_diagnostics or diagnostics_path != None
+        self.diagnostics_path = diagnostics_path
+        if instrument or profile:
+            self.instrumentation = ImportInstrumentation(profile)
+            self.lookup_handler = self.instrumentation.lookup
+        # Uncompressed size of the document being imported, used for progress reporting
+        self.source_size = None
+        # Archive the model was read from; diagram contents may be stored in members of their own
+        self.archive_path = None
+        self.archive = None
+        # Node ids are only recorded for tree imports
+        self.index = IdIndex(element_factory, record_nodes=not streaming)
+        # References to other elements, set once their targets exist; the pending queue holds
+        # elements that extension handlers deferred as a whole
+        self.resolver = ReferenceResolver(self.index, eager=not incremental)
+        # With a module resolver, elements that hrefs refer to in other modules (used projects,
+        # libraries) are taken from those modules when they are not in the model
+        self.module_resolver = module_resolver
+        if module_resolver != None:
+            self.resolver.find_external = self.module_element
+        self.pending_queue = deque()
+        self.diagram_queue = deque()
+        self.diagram_reference_queue = deque()
+        # Name keyed indexes for the profile path, filled from the model on first use
+        self.profiles_by_name = None
+        self.referent_types = {}
+        self.indexed_profiles = set()
+        self.stereotype_attributes = {}
+        self.indexed_stereotypes = set()
+        self.extensions = set()
 
     def import_md_model(self):
         self.open_file_dialog()
+
+    def import_md_model_selectively(self):
+        self.open_file_dialog(self.choose_selection)
+
+    def choose_selection(self, file):
+        from gaphor_mdimport_plugin.selectiondialog import SelectionDialog
+        scan = self.scan_path(file.get_path())
+
+        def on_import(selection):
+            self.selection = selection
+            self.process_file_async(file)
+
+        SelectionDialog(self.window, scan, on_import)
     
-    def open_file_dialog(self):
+    def open_file_dialog(self, on_file=None):
+        # Gtk is only needed for the interactive import, the command line import runs without it
+        from gi.repository import Gtk
         dialog = Gtk.FileDialog.new()
         dialog.set_title("Select MagicDraw file")
 
@@ -51,252 +229,539 @@ class MDImporter():
                 return
 
             file = dialog.open_finish(result)
-            self.process_file(file)
+            if on_file != None:
+                on_file(file)
+            else:
+                self.process_file_async(file)
 
         dialog.open(parent=self.window, cancellable=None, callback=response)
 
     def process_file(self, file):
-        result, textIter = file.load_bytes()
-        resultString = result.get_data().decode("utf-8")
-        root = ET.fromstring(resultString)
-        with Transaction(self.event_manager):
-            # First we import any referenced profiles
-            self.import_referenced_profiles(root)
-            for child in root:
-                if child.tag == "{http://www.omg.org/spec/UML/20131001}Profile":
-                    self.import_Profile(child)
-                elif child.tag == "{http://www.omg.org/spec/UML/20131001}Model":
-                    self.import_Model(child)
-            self.process_pending_queue()
-            self.process_diagram_queue()
-            self.process_diagram_reference_queue()
+        self.process_path(file.get_path())
+
+    def process_path(self, path):
+        self.complete_steps(self.file_steps(path))
+
+    def begin_transaction(self, sliced=False) -> ImportTransaction:
+        return ImportTransaction(self.event_manager, self.element_factory, self.chunk_steps, undoable=not self.bulk_load, \
+            sliced=sliced, undo_manager=self.undo_manager)
+
+    def suspended_events(self):
+        if not self.bulk_load:
+            return nullcontext()
+        return self.element_factory.block_events()
+
+    def complete_steps(self, steps):
+        transaction = self.begin_transaction()
+        try:
+            with self.suspended_events():
+                for progress in steps:
+                    transaction.step()
+        except BaseException:
+            transaction.rollback()
+            raise
+        transaction.commit()
+
+    def process_file_async(self, file):
+        # The import runs in time slices from the GLib main loop, so Gaphor stays responsive
+        from gaphor_mdimport_plugin.progress import ImportProgressDialog
+        dialog = ImportProgressDialog(self.window, PHASES)
+        steps = self.file_steps(file.get_path())
+        # Every slice is committed before control returns to the main loop
+        transaction = self.begin_transaction(sliced=True)
+
+        def run_steps():
+            deadline = time.monotonic() + STEP_SLICE
+            transaction.resume()
+            try:
+                with self.suspended_events():
+                    while not dialog.cancelled:
+                        progress = next(steps)
+                        transaction.step()
+                        if time.monotonic() > deadline:
+                            dialog.update(*progress)
+                            transaction.pause()
+                            return GLib.SOURCE_CONTINUE
+                    steps.close()
+                transaction.rollback()
+            except StopIteration:
+                transaction.commit()
+            except Exception:
+                transaction.rollback()
+                dialog.close()
+                raise
+            dialog.close()
+            return GLib.SOURCE_REMOVE
+
+        GLib.idle_add(run_steps)
+
+    @contextmanager
+    def open_source(self, path):
+        # A .mdzip is read in place: the model member is decompressed while it is being parsed
+        if not is_mdzip(path):
+            self.source_size = os.path.getsize(path)
+            with open(path, "rb") as source:
+                yield source
+            return
+        self.archive_path = path
+        with zipfile.ZipFile(path) as archive:
+            member = select_model_member(archive)
+            if member == None:
+                raise ImportException("No MagicDraw model found in " + str(path))
+            self.source_size = archive.getinfo(member).file_size
+            with archive.open(member) as source:
+                yield source
+
+    def file_steps(self, path):
+        # Every step yields a (phase, done, total) progress tuple; total is None when unknown
+        if self.instrumentation == None:
+            yield from self.source_steps(path)
+        else:
+            yield from self.instrumentation.steps(self.source_steps(path), self.queue_lengths)
+            self.instrumentation.write(self.report_path or report_path_for(path))
+        if self.write_diagnostics:
+            self.diagnostics.write(self.diagnostics_path or diagnostics_path_for(path))
+
+    def source_steps(self, path):
+        if self.incremental:
+            self.state = ImportState.load(sidecar_path(self.model_filename or path))
+        if self.all_parts and is_mdzip(path):
+            yield from self.bundle_steps(path)
+        else:
+            yield from self.document_steps(path)
+        yield from self.deferred_steps()
+        if self.state != None:
+            self.state.save(id for id in self.state.seen if self.element_factory.lookup(id) != None)
+
+    def document_steps(self, path):
+        with self.open_source(path) as source:
+            if self.streaming:
+                yield from self.stream_steps(source)
+            else:
+                root = yield from self.parse_steps(source)
+                yield from self.root_steps(root)
+                # The deferred queues hold compact copies, the parsed tree is not needed any more
+                root = None
+
+    def bundle_steps(self, path):
+        # The parts are imported one after the other, profiles first, then the other modules and
+        # then the main model, so that the references between them resolve. Each is streamed like
+        # a single document, so only one part is being read at a time.
+        self.archive_path = path
+        with zipfile.ZipFile(path) as archive:
+            members = order_members(archive, bundle_members(archive), self.xml)
+            if not members:
+                raise ImportException("No MagicDraw model found in " + str(path))
+            for member in members:
+                self.source_size = archive.getinfo(member).file_size
+                with archive.open(member) as source:
+                    if self.streaming:
+                        yield from self.stream_steps(source)
+                    else:
+                        root = yield from self.parse_steps(source)
+                        yield from self.root_steps(root)
+                        root = None
+
+    def scan_path(self, path) -> ModelScan:
+        # Reads the package tree and the references between elements for a selective import
+        with self.open_source(path) as source:
+            return ModelScan().read(self.xml.iterparse(source, ("start", "end")))
+
+    def queue_lengths(self):
+        return (
+            ("references", len(self.resolver)),
+            ("pending", len(self.pending_queue)),
+            ("diagrams", len(self.diagram_queue)),
+            ("diagram references", len(self.diagram_reference_queue)),
+        )
+
+    def timed(self, name):
+        if self.instrumentation == None:
+            return nullcontext()
+        return self.instrumentation.timer(name)
+
+    def import_root(self, root:ET.Element):
+        self.complete_steps(chain(self.root_steps(root), self.deferred_steps()))
+
+    def import_stream(self, source):
+        self.complete_steps(chain(self.stream_steps(source), self.deferred_steps()))
+
+    def parse_steps(self, source):
+        parser = self.xml.iterparse(source, ("end",))
+        for count, (event, element) in enumerate(parser):
+            if count % PARSE_STEP == 0:
+                yield (PHASE_PARSE, source.tell(), self.source_size)
+        return parser.root
+
+    def root_steps(self, root:ET.Element):
+        # First we import any referenced profiles
+        self.import_referenced_profiles(root)
+        for child in root:
+            if self.state != None and child.tag in (UML_PROFILE, UML_MODEL):
+                self.state.begin_source(child.get(XMI_ID))
+                self.state.see_tree(child)
+            if child.tag == UML_PROFILE:
+                self.import_Profile(child)
+            elif child.tag == UML_MODEL:
+                yield from self.model_steps(child)
+
+    def model_steps(self, model_element:ET.Element):
+        # Same as import_Model, reporting progress after each top level packaged element
+        model = self.get_package(model_element.get("name"), model_element.get(XMI_ID), None)
+        children = list(model_element)
+        for done, child in enumerate(children, 1):
+            self.dispatch(MODEL_CHILD_HANDLERS, child, model)
+            if child.tag == "packagedElement":
+                yield (PHASE_PACKAGED_ELEMENTS, done, len(children))
+
+    def deferred_steps(self):
+        # References are set first, ordered ones in document order, then the elements deferred by
+        # extension handlers are processed, which may create the targets of blocked references
+        total = len(self.resolver) + len(self.pending_queue)
+        done = 0
+        for step in self.resolver.steps():
+            done += 1
+            yield (PHASE_PENDING, done, total)
+        while self.pending_queue:
+            self.process_pending_entry(self.pending_queue.popleft())
+            done += 1
+            yield (PHASE_PENDING, done, total)
+        for step in self.resolver.retry_steps():
+            yield (PHASE_PENDING, done, total)
+        for reference in self.resolver.dangling():
+            if reference.document != None:
+                self.diagnostics.warning("Unresolved " + reference.kind + " reference into " + reference.document, reference.target_id)
+            else:
+                self.diagnostics.warning("Unresolved " + reference.kind + " reference", reference.target_id)
+        total = len(self.diagram_queue)
+        done = 0
+        try:
+            while self.diagram_queue:
+                self.process_diagram_entry(self.diagram_queue.popleft())
+                done += 1
+                yield (PHASE_DIAGRAMS, done, total)
+        finally:
+            self.close_archive()
+        total = len(self.diagram_reference_queue)
+        done = 0
+        while self.diagram_reference_queue:
+            self.process_diagram_reference_entry(self.diagram_reference_queue.popleft())
+            done += 1
+            yield (PHASE_DIAGRAM_REFERENCES, done, total)
+        if self.state != None:
+            self.remove_deleted_elements()
+        if self.index.dangling:
+            self.diagnostics.add(logging.WARNING, "Dangling references", count=self.index.dangling)
+        if self.index.unimported:
+            self.diagnostics.add(logging.WARNING, "References to elements that were not imported", count=self.index.unimported)
+        self.diagnostics.log_summary()
+
+    def stream_steps(self, source):
+        # Packaged elements of the Model and of uml:Package elements are imported as soon as their
+        # end tag is seen and are then detached from the tree, so only the currently open branch
+        # (plus whatever the deferred queues still reference) is kept in memory.
+        open_elements = []
+        # Gaphor package for each open element that is a Model or uml:Package container, else None
+        open_owners = []
+        for event, element in self.xml.iterparse(source, ("start", "end")):
+            if event == "start":
+                if self.state != None:
+                    id = element.get(XMI_ID)
+                    if len(open_elements) == 1 and element.tag in (UML_PROFILE, UML_MODEL):
+                        self.state.begin_source(id)
+                    if id != None:
+                        self.state.see(id)
+                owner = None
+                if len(open_elements) == 1 and element.tag == UML_MODEL:
+                    owner = self.get_package(element.get("name"), element.get(XMI_ID), None)
+                elif element.tag == "packagedElement" and open_owners and open_owners[-1] != None \
+                        and element.get(XMI_TYPE) == "uml:Package":
+                    if self.selection == None or self.selection.includes(element):
+                        owner = self.get_package(element.get("name"), element.get(XMI_ID), open_owners[-1])
+                    else:
+                        owner = EXCLUDED_PACKAGE
+                open_elements.append(element)
+                open_owners.append(owner)
+                continue
+            open_elements.pop()
+            owner = open_owners.pop()
+            if not open_elements:
+                break
+            parent = open_elements[-1]
+            if element.tag == "packagedElement" and open_owners[-1] != None:
+                if owner is EXCLUDED_PACKAGE:
+                    # Its packaged elements have been left out already
+                    pass
+                elif owner != None:
+                    # The nested packaged elements have already been imported and detached
+                    self.import_PackageContents(element, owner)
+                else:
+                    self.import_PackagedElement(element, open_owners[-1])
+                parent.remove(element)
+                yield (PHASE_PACKAGED_ELEMENTS, source.tell(), self.source_size)
+            elif element.tag == "stereotypesHREFS":
+                self.import_referenced_profiles(element)
+            elif len(open_elements) == 1:
+                if element.tag == UML_PROFILE:
+                    self.import_Profile(element)
+                elif element.tag == UML_MODEL:
+                    self.import_Model(element)
+                parent.remove(element)
+
+    def process_pending_queue(self):
+        for step in self.resolver.steps():
+            pass
+        while self.pending_queue:
+            self.process_pending_entry(self.pending_queue.popleft())
+        for step in self.resolver.retry_steps():
+            pass
 
     def process_diagram_queue(self):
-        while not self.diagram_queue.empty():
-            entry = self.diagram_queue.get()
-            element = entry.element
-            match element.tag:
-                case "ownedDiagram":
-                    self.deferred_process_Diagram(element)
-                case _:
-                    raise ImportException("Element not processed in process_diagram_queue: " + element.tag)
+        while self.diagram_queue:
+            self.process_diagram_entry(self.diagram_queue.popleft())
+
+    def process_diagram_entry(self, entry:DiagramEntry):
+        self.deferred_process_Diagram(entry)
 
     def process_diagram_reference_queue(self):
-        while not self.diagram_reference_queue.empty():
-            entry = self.diagram_reference_queue.get()
-            element = entry.element
-            diagram_element = entry.parent
-            parent_id = diagram_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-            diagram = self.element_factory.lookup(parent_id)
-            match element.tag:
-                case "usedObjects":
-                    used_object_id = element.get("href")[1:]
-                    used_object = self.element_factory.lookup(used_object_id)
-                    drop(used_object, diagram, x=0, y=0)
+        while self.diagram_reference_queue:
+            self.process_diagram_reference_entry(self.diagram_reference_queue.popleft())
 
-    def process_pending_queue(self):
-        while not self.pending_queue.empty():
-            entry = self.pending_queue.get()
-            element = entry.element
-            parent = entry.parent
-            parent_id = None
-            gaphor_parent = None
-            if parent != None:
-                parent_id = parent.get("{http://www.omg.org/spec/XMI/20131001}id")
-                if parent_id != None:
-                    gaphor_parent = self.element_factory.lookup(parent_id)
-            match element.tag:
-                case "client":
-                    self.deferred_process_Dependency(element, gaphor_parent)
-                case "classifier":
-                    self.deferred_process_InstanceSpecification(element, gaphor_parent)
-                case "generalization":
-                    self.deferred_process_Generalization(element)
-                case "include":
-                    gaphor_parent_package = None
-                    if gaphor_parent != None:
-                        gaphor_parent_package = gaphor_parent.package
-                    self.import_Include(element, gaphor_parent_package, gaphor_parent)
-                case "interfaceRealization":
-                    self.import_InterfaceRealization(element, gaphor_parent)
-                case "memberEnd":
-                    self.deferred_process_MemberEnd(element, gaphor_parent)
-                case "ownedAttribute":
-                    type = element.get("{http://www.omg.org/spec/XMI/20131001}type")
-                    match type:
-                        case "uml:Property":
-                            self.deferred_process_Property(element)
-                        case _:
-                            print ("In process_pending_queue, ownedEnd type not handled for type: " + type)
-                case "ownedEnd":
-                    type = element.get("{http://www.omg.org/spec/XMI/20131001}type")
-                    match type:
-                        case "uml:Property":
-                            self.deferred_process_Property(element)
-                        case _:
-                            print ("In process_pending_queue, ownedEnd type not handled for type: " + type)
-                case "ownedParameter":
-                    self.deferred_process_Parameter(element)
-                case "supplier":
-                    self.deferred_process_Dependency(element, gaphor_parent)
-                case _:
-                    print ("Element not processed in process_pending_queue: " + element.tag)
-                    # raise ImportException("Element not processed in process_pending_queue: " + element.tag) 
-
-    def deferred_process_Dependency(self, element:ET.Element, dependency:Dependency):
-        if element.tag == "client":
-            client_id = element.get("{http://www.omg.org/spec/XMI/20131001}idref")
-            client = self.element_factory.lookup(client_id)
-            dependency.client = client
-        elif element.tag == "supplier":
-            supplier_id = element.get("{http://www.omg.org/spec/XMI/20131001}idref")
-            supplier = self.element_factory.lookup(supplier_id)
-            dependency.supplier = supplier
-
-    def deferred_process_Diagram(self, diagram_element:ET.Element):
-        diagram_id = diagram_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        diagram = self.element_factory.lookup(diagram_id)
+    def process_diagram_reference_entry(self, entry:DiagramReferenceEntry):
+        diagram = self.index.resolve(entry.diagram_id)
+        used_object = self.index.resolve(entry.used_object_id)
+        DiagramBuilder(diagram).place_shape(used_object, entry.bounds)
+
+    def process_pending_entry(self, entry:PendingEntry):
+        element = entry.element
+        gaphor_parent = None
+        if entry.parent_id != None:
+            gaphor_parent = self.index.resolve(entry.parent_id)
+        entry.handler(self, element, gaphor_parent)
+
+    def refer(self, source, kind, target_id):
+        # Sets source.kind to the element imported for target_id, now or once it exists
+        self.resolver.refer(source, kind, target_id)
+
+    def refer_href(self, source, kind, href):
+        # An href within the document ("#id") or into another module ("Module.mdzip#id")
+        document = href.partition("#")[0]
+        if not document:
+            document = None
+        self.resolver.refer(source, kind, self.index.href_id(href), document)
+
+    def refer_child(self, source, kind, reference_element:ET.Element):
+        # A reference written as an element of its own, with an xmi:idref or an href
+        idref = reference_element.get(XMI_IDREF)
+        if idref != None:
+            self.refer(source, kind, idref)
+            return
+        href = reference_element.get("href")
+        if href != None:
+            self.refer_href(source, kind, href)
+
+    def module_element(self, document, id):
+        module = self.module_resolver.index_for(document)
+        if module == None or id not in module.entries:
+            return None
+        return self.import_module_element(module, id)
+
+    def import_module_element(self, module:ModuleIndex, id):
+        # An element of another module as far as its references need it: its kind and name,
+        # within its owners up to the model of the module, which becomes a top level package
+        element = self.index.lookup(id)
+        if element != None:
+            return element
+        xmi_type, name, owner_id = module.entries[id]
+        type = MODULE_ELEMENT_TYPES.get(xmi_type)
+        if type == None:
+            return None
+        owner = None
+        if owner_id != None:
+            owner = self.import_module_element(module, owner_id)
+        element = self.create_as(type, id)
+        if name != None:
+            element.name = name
+        if isinstance(element, Property):
+            if isinstance(owner, Class):
+                owner.ownedAttribute = element
+        elif isinstance(element, EnumerationLiteral):
+            if isinstance(owner, Enumeration):
+                element.enumeration = owner
+        elif isinstance(owner, Package) and not isinstance(element, Profile):
+            element.package = owner
+        return element
+
+    def defer(self, element:ET.Element, owner, handler):
+        # Queue an element that can only be handled once all elements exist, for handlers that
+        # need more of it than the references refer() sets. handler is called like any other
+        # handler, with the Gaphor element of the XML parent as owner.
+        parent_id = None
+        if owner != None:
+            parent_id = owner.id
+        self.pending_queue.append(PendingEntry(compact(element), parent_id, handler))
+
+    def dispatch(self, table:HandlerTable, element:ET.Element, owner):
+        id = element.get(XMI_ID)
+        if id != None:
+            self.index.add_node(id, element)
+        return self.lookup_handler(table, element.tag, element.get(XMI_TYPE))(self, element, owner)
+
+    def dispatch_children(self, table:HandlerTable, element:ET.Element, owner):
+        lookup_handler = self.lookup_handler
+        add_node = self.index.add_node
+        for child in element:
+            id = child.get(XMI_ID)
+            if id != None:
+                add_node(id, child)
+            lookup_handler(table, child.tag, child.get(XMI_TYPE))(self, child, owner)
+
+    def create_as(self, type, id):
+        element = self.index.lookup(id)
+        if element != None and isinstance(element, type):
+            return element
+        if element != None:
+            # The element changed its type in the source
+            element.unlink()
+        element = self.element_factory.create_as(type, id)
+        self.index.add(id, element)
+        return element
+
+    def existing(self, id):
+        # While a changed element is imported, existing elements are handled as if they were new,
+        # so that their attributes and references are set again (create_as returns them as is)
+        if self.updating:
+            return None
+        return self.index.lookup(id)
+
+    def reset_imported_values(self, packaged_element:ET.Element):
+        # Nested elements that were removed in the source are unlinked by remove_deleted_elements
+        for node in packaged_element.iter():
+            id = node.get(XMI_ID)
+            if id == None:
+                continue
+            element = self.index.lookup(id)
+            if element == None:
+                continue
+            for name in IMPORTED_VALUES:
+                value_property = getattr(type(element), name, None)
+                if isinstance(value_property, (attribute, enumeration)) \
+                        or (isinstance(value_property, association_property) and value_property.upper == 1):
+                    delattr(element, name)
+                elif isinstance(value_property, association_property):
+                    values = getattr(element, name)
+                    for value in list(values):
+                        values.remove(value)
+
+    def remove_deleted_elements(self):
+        # Elements of the previous import whose id is no longer in the source were deleted there
+        for id in self.state.removed_ids():
+            element = self.element_factory.lookup(id)
+            if element != None:
+                element.unlink()
+
+    def deferred_process_Diagram(self, entry:DiagramEntry):
+        diagram_id = entry.diagram_id
+        diagram = self.index.resolve(diagram_id)
         if diagram == None:
             raise ImportException("Diagram not found in deferred_process_Diagram: " + diagram_id)
-        representation_objects = diagram_element.iter("{http://www.nomagic.com/ns/magicdraw/core/diagram/1.0}DiagramRepresentationObject")
-        for representation_object in representation_objects:
-            diagram_type = representation_object.get("type")
+        # A selective import may leave out elements a diagram shows, those are not unresolved
+        find = self.index.resolve
+        if self.selection != None:
+            find = self.index.lookup
+        for diagram_type, used_object_ids, geometry in entry.views:
             diagram.diagramType = diagram_type
-            for used_object_element in representation_object.iter("usedObjects"):
-                used_object_id = used_object_element.get("href")[1:]
-                used_object = self.element_factory.lookup(used_object_id)
-                if isinstance(used_object, Relationship):
-                    entry = PendingEntry(used_object_element, None)
-                    self.link_queue.put(entry)
+            builder = DiagramBuilder(diagram)
+            for used_object_id in used_object_ids:
+                used_object = find(used_object_id)
+                if used_object == None:
+                    pass
+                elif isinstance(used_object, Relationship):
+                    builder.add_link(used_object, geometry.get_points(used_object_id))
                 elif isinstance(used_object, Property): # skip properties
                     pass
                 elif isinstance(used_object, Diagram):
                     if used_object_id != diagram_id:
-                        entry = PendingEntry(used_object_element, diagram_element)
-                        self.diagram_reference_queue.put(entry)
+                        reference = DiagramReferenceEntry(diagram_id, used_object_id, geometry.get_bounds(used_object_id))
+                        self.diagram_reference_queue.append(reference)
                 else :
-                    drop(used_object, diagram, x=0, y=0)
-            while not self.link_queue.empty():
-                queue_entry = self.link_queue.get()
-                link_entry = queue_entry.element
-                link_id = link_entry.get("href")[1:]
-                link = self.element_factory.lookup(link_id)
-                drop(link, diagram, x=0, y=0)
-        # auto_layout(diagram)
-
-    def deferred_process_Generalization(self, generalization_element:ET.Element):    
-        generalization_id = generalization_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        generalization = self.element_factory.lookup(generalization_id)
-        abstraction_id = generalization_element.get("general")
-        abstraction = self.element_factory.lookup(abstraction_id)
-        generalization.general = abstraction
-
-    def deferred_process_InstanceSpecification(self, classifier_element:ET.Element, instance_specifiction:InstanceSpecification):
-        raw_id = classifier_element.get("href")
-        split_id = raw_id.split("#")
-        if len(split_id) > 1:
-            id = split_id[1]
-        else:
-            id = raw_id
-        stereotype = self.element_factory.lookup(id)
-        if stereotype == None:
-            print ("Stereotype not found in deferred_process_InstanceSpecification: " + id)
-        else:
-            instance_specifiction.classifier = stereotype
+                    builder.add_shape(used_object, geometry.get_bounds(used_object_id))
+            with self.timed("drop"):
+                builder.build()
 
-    def deferred_process_MemberEnd(self, member_end_element:ET.Element, owner:Association):
-        idref = member_end_element.get("{http://www.omg.org/spec/XMI/20131001}idref")
-        member_end = self.element_factory.lookup(idref)
-        if member_end == None:
-            print ("Member end not found in deferred_process_MemberEnd: " + idref)
-            return
-            # raise ImportException("Member end not found in deferred_process_MemberEnd: " + idref)
-        owner.memberEnd = member_end
+    def get_diagram_entry(self, diagram_element:ET.Element) -> DiagramEntry:
+        # Everything the diagram phase needs is read now, so the diagram's XML can be released
+        entry = DiagramEntry(diagram_element.get(XMI_ID))
+        for representation_object in diagram_element.iter(DIAGRAM_REPRESENTATION_OBJECT):
+            with self.timed("diagram geometry"):
+                geometry = self.read_diagram_geometry(representation_object)
+            used_object_ids = tuple(self.index.href_id(used_object_element.get("href"))
+                for used_object_element in representation_object.iter("usedObjects"))
+            entry.views.append((representation_object.get("type"), used_object_ids, geometry))
+        return entry
 
-    def deferred_process_Parameter(self, element:ET.Element):
-        parameter_id = element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        parameter = self.element_factory.lookup(parameter_id)
-        type_id = element.get("type")
-        if type_id != None:
-            type = self.element_factory.lookup(type_id)
-            parameter.type = type
-
-    def deferred_process_Property(self, element:ET.Element):
-        property_id = element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        property = self.element_factory.lookup(property_id)
-        tag = element.tag
-        match tag:
-            case "ownedEnd":
-                type_id = element.get("type")
-                if type_id != None:
-                    type = self.element_factory.lookup(type_id)
-                    property.type = type
-            case "ownedAttribute":
-                association_id = element.get("association")
-                if association_id != None:
-                    association = self.element_factory.lookup(association_id)
-                    if association == None:
-                        print ("Association not found in deferred_process_Property: " + association_id)
-                    else:
-                        property.association = association
-                type_id = element.get("type")
-                if type_id == None:
-                    for child in element:
-                        if child.tag == "type":
-                            type_reference = child.get("href")
-                            match type_reference:
-                                case 'http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#String':
-                                    property.typeValue = "String"
-                                case 'http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#Integer':
-                                    property.typeValue = "Integer"
-                                case 'http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#Boolean':
-                                    property.typeValue = "Boolean"
-                                case 'http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#Real':
-                                    property.typeValue = "Real"
-                                case 'http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#UnlimitedNatural':
-                                    property.typeValue = "UnlimitedNatural"
-                else:
-                    type = self.element_factory.lookup(type_id)
-                    property.type  = type
-                lower_value_iterator = element.iter("lowerValue") 
-                lower_value = next(lower_value_iterator, None)
-                if lower_value != None:
-                    value = lower_value.get("value")
-                    if value != None:
-                        property.lowerValue = value
-                    else:
-                        property.lowerValue = "0"
-                upper_value_iterator = element.iter("upperValue")
-                upper_value = next(upper_value_iterator, None)  
-                if upper_value != None:
-                    value = upper_value.get("value")
-                    if value != None:
-                        property.upperValue = value
+    def record_diagram(self, diagram:Diagram, diagram_element:ET.Element):
+        self.diagram_store.pop(diagram.id)
+        record = self.diagram_store.get_record(diagram.id)
+        for representation_object in diagram_element.iter(DIAGRAM_REPRESENTATION_OBJECT):
+            diagram.diagramType = representation_object.get("type")
+            geometry = self.read_diagram_geometry(representation_object)
+            for used_object_element in representation_object.iter("usedObjects"):
+                record.add(self.index.href_id(used_object_element.get("href")), geometry)
+
+    def read_diagram_geometry(self, representation_object:ET.Element) -> DiagramGeometry:
+        # Shapes are placed where they were in MagicDraw, so no layout has to be computed
+        geometry = DiagramGeometry(self.index)
+        geometry.read(representation_object)
+        for binary_object in representation_object.iter("binaryObject"):
+            # Diagram contents that were saved as a separate stream of the .mdzip
+            member = binary_object.get("streamContentID")
+            archive = self.get_archive()
+            if member == None or archive == None or member not in archive.namelist():
+                continue
+            with archive.open(member) as stream:
+                geometry.read(self.xml.parse(stream))
+        return geometry
+
+    def get_archive(self) -> zipfile.ZipFile | None:
+        if self.archive == None and self.archive_path != None:
+            self.archive = zipfile.ZipFile(self.archive_path)
+        return self.archive
+
+    def close_archive(self):
+        if self.archive != None:
+            self.archive.close()
+            self.archive = None
+
+    def refer_dependency_ends(self, element:ET.Element, dependency:Dependency):
+        for child in element:
+            if child.tag == "client" or child.tag == "supplier":
+                self.refer_child(dependency, child.tag, child)
+            else:
+                self.diagnostics.warning("Import of dependency child not processed for tag: " + child.tag, element.get(XMI_ID))
 
     def get_abstraction(self, id, owner:Package, element:ET.Element) -> Abstraction:
         assert id != None
-        abstraction = self.element_factory.lookup(id)
+        abstraction = self.existing(id)
         if abstraction == None:
-            abstraction = self.element_factory.create_as(Abstraction, id)
-            for child in element:
-                pending_queue_entry = PendingEntry(child, element)
-                self.pending_queue.put(pending_queue_entry)
+            abstraction = self.create_as(Abstraction, id)
+            self.refer_dependency_ends(element, abstraction)
         return abstraction
 
     def get_actor(self, name, id, owner:Package) -> Actor:
         assert id != None
-        actor = self.element_factory.lookup(id)
+        actor = self.existing(id)
         if actor == None:
-            actor = self.element_factory.create_as(id)
+            actor = self.create_as(Actor, id)
             actor.name = name
             actor.package = owner
         return actor
 
     def get_association(self, id, owner:Package | Class | None, element: ET.Element) -> Association:
         assert id != None
-        association = self.element_factory.lookup(id)
+        association = self.existing(id)
         if association == None:
-            association = self.element_factory.create_as(Association, id=id)
+            association = self.create_as(Association, id)
             if isinstance(owner, Package):
                 association.package = owner
             elif isinstance(owner, Class):
@@ -304,44 +769,23 @@ class MDImporter():
             name = element.get("name")
             if name != None:
                 association.name = name
-            for child in element:
-                tag = child.tag
-                match tag:
-                    case "memberEnd":
-                        self.pending_queue.put(PendingEntry(child, element))
-                    case "ownedEnd":
-                        self.import_OwnedEnd(child, association)
-                        # self.pending_queue.put(PendingEntry(child, packaged_element))
-                    case "navigableOwnedEnd":
-                        # TODO implement navigableOwnedEnd
-                        print ("Import of packaged element Association child not processed for tag: " + tag)
-                    case "ownedRule":
-                        # TODO implement ownedRule
-                        print ("Import of packaged element Association child not processed for tag: " + tag)
-                    case "ownedComment":
-                        self.import_OwnedComment(child, association)
-                    case _:
-                        raise ImportException("Import of packaged element Association child not processed for tag: " + tag)
+            self.dispatch_children(ASSOCIATION_CHILD_HANDLERS, element, association)
         return association
 
     def get_class(self, name, id, owner:Package | Class, xml_element:ET.Element) -> Class:
         assert id != None
         uml_class:Class | None = None
-        uml_class = self.element_factory.lookup(id)
+        uml_class = self.existing(id)
         if uml_class == None: 
-            uml_class = self.element_factory.create_as(Class, id=id)
+            uml_class = self.create_as(Class, id)
             if owner != None: 
                 if isinstance(owner, Package):
                     uml_class.package = owner
                 elif isinstance(owner, Class):
                     owner.nestedClassifier = uml_class
             uml_class.name = name
-            isAbstract = xml_element.get("isAbstract")
-            if isAbstract == "true":
-                uml_class.isAbstract = True
-            isLeaf = xml_element.get("isLeaf")
-            if isLeaf == "true":
-                uml_class.isLeaf = True
+            uml_class.isAbstract = xml_element.get("isAbstract") == "true"
+            uml_class.isLeaf = xml_element.get("isLeaf") == "true"
             # TODO implement isFinalSpecialization after gaphor model is updated
             # isFinalSpecialization = xml_element.get("isFinalSpecialization")
             # if isFinalSpecialization == "true":
@@ -349,51 +793,15 @@ class MDImporter():
             visibility = xml_element.get("visibility")
             if visibility != None:
                 uml_class.visibility = visibility
-            for child in xml_element:
-                tag = child.tag
-                match tag:
-                    case "{http://www.omg.org/spec/XMI/20131001}Extension":
-                        # TODO implement Extension
-                        print ("Import of packaged element Class child not processed for tag: " + tag)
-                    case "generalization":
-                        generalization_id = child.get("{http://www.omg.org/spec/XMI/20131001}id")
-                        generalization = self.get_generalization(generalization_id, uml_class)
-                        pending_queue_entry = PendingEntry(child, xml_element)  
-                        self.pending_queue.put(pending_queue_entry)
-                    case "interfaceRealization":
-                        pending_queue_entry = PendingEntry(child, xml_element)
-                        self.pending_queue.put(pending_queue_entry)
-                    case "nestedClassifier":
-                        self.import_NestedClassifier(child, uml_class)
-                    case "ownedAttribute":
-                        self.import_OwnedAttribute(child, uml_class)
-                    case "ownedComment":
-                        self.import_OwnedComment(child, uml_class)
-                    case "ownedConnector":
-                        # TODO implement ownedConnector
-                        print ("Import of packaged element Class child not processed for tag: " + tag)
-                    case "ownedOperation":
-                        self.import_OwnedOperation(child, uml_class)
-                    case "ownedRule":
-                        # TODO implement ownedRule
-                        print ("Import of packaged element Class child not processed for tag: " + tag)
-                    case "ownedTemplateSignature":
-                        # TODO implement ownedTemplateSignature
-                        print ("Import of packaged element Class child not processed for tag: " + tag)
-                    case "templateBinding":
-                        # TODO implement templateBinding
-                        print ("Import of packaged element Class child not processed for tag: " + tag)
-                    case _:
-                        print ("Import of packaged element Class child not processed for tag: " + tag)
-                        # raise ImportException("Import of packaged element Class child not processed for tag: " + tag)
+            self.dispatch_children(CLASS_CHILD_HANDLERS, xml_element, uml_class)
         return uml_class
 
     def get_datatype(self, name, id, owner:Package | None) -> DataType:
         assert id != None
         datatype:DataType | None = None
-        datatype = self.element_factory.lookup(id)
+        datatype = self.existing(id)
         if datatype == None: 
-            datatype = self.element_factory.create_as(DataType, id=id)
+            datatype = self.create_as(DataType, id)
             if owner != None:
                 datatype.package = owner
         datatype.name = name
@@ -401,85 +809,82 @@ class MDImporter():
 
     def get_dependency(self, id, element:ET.Element) -> Dependency:
         assert id != None
-        dependency = self.element_factory.lookup(id)
+        dependency = self.existing(id)
         if dependency == None:
-            dependency = self.element_factory.create_as(Dependency, id)
-            for child in element:
-                pending_queue_entry = PendingEntry(child, element)
-                self.pending_queue.put(pending_queue_entry)
+            dependency = self.create_as(Dependency, id)
+            self.refer_dependency_ends(element, dependency)
         return dependency
 
     def get_diagram(self, name, id, owner:Package | None , element:ET.Element) -> Diagram:
         assert id != None
-        diagram = self.element_factory.lookup(id)
+        diagram = self.index.lookup(id)
+        changed = self.state != None and not self.state.unchanged(element)
+        if diagram != None and not changed:
+            return diagram
         if diagram == None:
-            diagram = self.element_factory.create_as(Diagram, id=id)
-            diagram.name = name
-            if owner != None:
-                owner.ownedDiagram = diagram
-            pending_diagram_entry = PendingEntry(element, None)
-            self.diagram_queue.put(pending_diagram_entry)
+            diagram = self.create_as(Diagram, id)
+        else:
+            # The diagram changed since the previous import, it is populated again
+            for item in list(diagram.ownedPresentation):
+                item.unlink()
+        diagram.name = name
+        if owner != None:
+            owner.ownedDiagram = diagram
+        if self.diagram_store != None:
+            self.record_diagram(diagram, element)
+        else:
+            self.diagram_queue.append(self.get_diagram_entry(element))
         return diagram
 
     def get_enumeration(self, name, id, owner:Package) -> Enumeration:
         assert id != None
         enumeration:Enumeration | None = None
-        enumeration = self.element_factory.lookup(id)
+        enumeration = self.existing(id)
         if enumeration == None:
-            enumeration = self.element_factory.create_as(Enumeration, id)
+            enumeration = self.create_as(Enumeration, id)
             enumeration.package = owner
             enumeration.name = name
         return enumeration
 
     def get_enumerationLiteral(self, name, id, owner:Enumeration) -> EnumerationLiteral:
         assert id != None
-        enumerationLiteral = self.element_factory.lookup(id)
+        enumerationLiteral = self.existing(id)
         if enumerationLiteral == None:
-            enumerationLiteral = self.element_factory.create_as(EnumerationLiteral, id)
+            enumerationLiteral = self.create_as(EnumerationLiteral, id)
             enumerationLiteral.enumeration = owner
             enumerationLiteral.name = name
         return enumerationLiteral
 
     def get_generalization(self, id, owner:Class) -> Generalization:
         assert id != None
-        generalization = self.element_factory.lookup(id)
+        generalization = self.existing(id)
         if generalization == None:
-            generalization = self.element_factory.create_as(Generalization, id)
+            generalization = self.create_as(Generalization, id)
             owner.generalization = generalization
         return generalization
 
     def get_include(self, id, owner:Package) -> Include:
         assert id != None
-        include = self.element_factory.lookup(id)
+        include = self.existing(id)
         if include == None:
-            include = self.element_factory.create_as(Include, id)
+            include = self.create_as(Include, id)
         return include
 
     def get_instanceSpecification(self, id, owner:Package, element:ET.Element) -> InstanceSpecification:
         assert id != None
-        instanceSpecification = self.element_factory.lookup(id)
+        instanceSpecification = self.existing(id)
         if instanceSpecification == None:
-            instanceSpecification = self.element_factory.create_as(InstanceSpecification, id)
+            instanceSpecification = self.create_as(InstanceSpecification, id)
             owner.appliedStereotype = instanceSpecification
-            for child in element:
-                tag = child.tag
-                match tag:
-                    case "classifier":
-                        pending_queue_entry = PendingEntry(child, element)
-                        self.pending_queue.put(pending_queue_entry)
-                    case "slot":
-                        slot = self.get_slot(child, instanceSpecification)
-                    case _:
-                        print ("Import of packaged element InstanceSpecification child not processed for tag: " + tag)
-                        # raise ImportException("Import of packaged element InstanceSpecification child not processed for tag: " + tag)
+            self.dispatch_children(INSTANCE_SPECIFICATION_CHILD_HANDLERS, element, instanceSpecification)
         return instanceSpecification
 
     def get_interface(self, name, id, owner:Package | None) -> Interface:
         assert id != None
         interface:Interface | None = None
-        interface = self.element_factory.lookup(id)
+        interface = self.existing(id)
         if interface == None:
-            interface = self.element_factory.create_as(Interface, id=id)
+            interface = self.create_as(Interface, id)
             if owner != None:
                 interface.package = owner
             interface.name = name
@@ -487,29 +892,21 @@ class MDImporter():
 
     def get_interfaceRealization(self, id, owner:Class, element:ET.Element) -> InterfaceRealization:
         assert id != None
-        interfaceRealization = self.element_factory.lookup(id)
-        if interfaceRealization == None:
-            interface_realization = self.element_factory.create_as(InterfaceRealization, id)
+        interface_realization = self.existing(id)
+        if interface_realization == None:
+            interface_realization = self.create_as(InterfaceRealization, id)
             interface_realization.implementatingClassifier = owner
             # TODO fix the following after the spelling has been corrected in the gaphor model
             interface_realization.implementatingClassifier = owner
-            contract_id = element.get("contract")
-            contract = self.element_factory.lookup(contract_id)
-            interface_realization.contract = contract
+            self.refer(interface_realization, "contract", element.get("contract"))
             for child in element:
                 tag = child.tag
                 match tag:
-                    case "client":
-                        client_id = child.get("{http://www.omg.org/spec/XMI/20131001}idref")
-                        client = self.element_factory.lookup(client_id)
-                        interface_realization.client = client
-                    case "supplier":
-                        supplier_id = child.get("{http://www.omg.org/spec/XMI/20131001}idref")
-                        supplier = self.element_factory.lookup(supplier_id)
-                        interface_realization.supplier = supplier
+                    case "client" | "supplier":
+                        self.refer_child(interface_realization, tag, child)
                     case _:
-                        print ("Import of interface realization child not processed for tag: " + tag)
-        return interfaceRealization
+                        self.diagnostics.warning("Import of interface realization child not processed for tag: " + tag, id)
+        return interface_realization
 
     # def get_literalString(self, name, id, owner:Package | None) -> LiteralString: 
     #     literalString:LiteralString | None = None
@@ -524,33 +921,24 @@ class MDImporter():
 
     def get_operation(self, name, id, owner:Interface, element:ET.Element ) -> Operation:
         assert id != None
-        operation = self.element_factory.lookup(id)
+        operation = self.existing(id)
         if operation == None:
-            operation = self.element_factory.create_as(Operation, id=id)
+            operation = self.create_as(Operation, id)
             owner.ownedOperation = operation
             operation.name = name
             visibility = element.get("visibility")
             if visibility != None:
                 operation.visibility = visibility
-            isAbstract = element.get("isAbstract")
-            if isAbstract == "true":
-                operation.isAbstract = True
-            for child in element:
-                tag = child.tag
-                match tag:
-                    case "ownedParameter":
-                        self.import_OwnedParameter(child, operation)
-                    case "ownedComment":
-                        self.import_OwnedComment(child, operation)
-                    case _:
-                        print ("Import of owned operation child not processed for tag: " + tag)
+            operation.isAbstract = element.get("isAbstract") == "true"
+            self.dispatch_children(OPERATION_CHILD_HANDLERS, element, operation)
         return operation
 
     def get_package(self, name, id, owner:Package | None) -> Package:
         assert id != None
-        package = self.element_factory.lookup(id)
-        if package == None: 
-            package = self.element_factory.create_as(Package, id=id)
+        package = self.index.lookup(id)
+        # Packages are always walked by an incremental import, so their name and owner are set again
+        if package == None or self.state != None: 
+            package = self.create_as(Package, id)
             if owner != None:
                 package.package = owner
             package.name = name
@@ -558,9 +946,9 @@ class MDImporter():
 
     def get_parameter(self, name, id, owner:Operation, element:ET.Element) -> Parameter:
         assert id != None
-        parameter = self.element_factory.lookup(id)
+        parameter = self.existing(id)
         if parameter == None:
-            parameter = self.element_factory.create_as(Parameter, id)
+            parameter = self.create_as(Parameter, id)
             owner.ownedParameter = parameter
             parameter.name = name
             visibility = element.get("visibility")
@@ -569,8 +957,13 @@ class MDImporter():
             direction = element.get("direction")
             if direction != None:
                 parameter.direction = direction
-            pending_queue_entry = PendingEntry(element, None)
-            self.pending_queue.put(pending_queue_entry)
+            type_id = element.get("type")
+            if type_id != None:
+                self.refer(parameter, "type", type_id)
+            else:
+                type_element = element.find("type")
+                if type_element != None and type_element.get("href") not in PRIMITIVE_TYPE_NAMES:
+                    self.refer_child(parameter, "type", type_element)
 
         return parameter
 
@@ -578,70 +971,149 @@ class MDImporter():
     def get_profile(self, name, id) -> Profile:  
         profile:Profile | None = None
         if id:
-            profile = self.element_factory.lookup(id)
+            profile = self.index.lookup(id)
             if profile == None: 
-                profile = self.element_factory.create_as(Profile, id=id)
+                profile = self.create_as(Profile, id)
                 profile.name = name
+                self.profile_named(name)
+                self.profiles_by_name.setdefault(name, profile)
         else:
-            profiles = self.element_factory.lselect(Profile)
-            for profile in profiles:
-                if profile.name == name:
-                    return profile  
+            profile = self.profile_named(name)
+            if profile != None:
+                return profile
             profile = self.element_factory.create(Profile)
             profile.name = name
+            self.profiles_by_name[name] = profile
         return profile
 
+    def profile_named(self, name) -> Profile | None:
+        if self.profiles_by_name == None:
+            self.profiles_by_name = {}
+            for profile in self.element_factory.select(Profile):
+                self.profiles_by_name.setdefault(profile.name, profile)
+        return self.profiles_by_name.get(name)
+
     def get_property(self, name, owner:Class | Association, id, element:ET.Element) -> Property:
         assert id != None
-        property = self.element_factory.lookup(id)
+        property = self.existing(id)
         if property == None:
-            property = self.element_factory.create_as(Property, id)
+            property = self.create_as(Property, id)
             if name != None:
                 property.name = name
             visibility = element.get("visibility")
             if visibility != None:
                 property.visibility = visibility
-            isStatic = element.get("isStatic")
-            if isStatic == "true":
-                property.isStatic = True
-            isReadOnly = element.get("isReadOnly")
-            if isReadOnly == "true":
-                property.isReadOnly = True
+            property.isStatic = element.get("isStatic") == "true"
+            property.isReadOnly = element.get("isReadOnly") == "true"
             if isinstance(owner, Class):
                 owner.ownedAttribute = property
-            pending_queue_entry = PendingEntry(element, None)
-            self.pending_queue.put(pending_queue_entry)
+            self.import_PropertyValues(element, property)
         return property
 
+    def refer_general(self, generalization:Generalization, element:ET.Element):
+        general_id = element.get("general")
+        if general_id != None:
+            self.refer(generalization, "general", general_id)
+            return
+        general_element = element.find("general")
+        if general_element != None:
+            self.refer_child(generalization, "general", general_element)
+
+    def import_PropertyValues(self, element:ET.Element, property:Property):
+        type_id = element.get("type")
+        if element.tag == "ownedEnd":
+            self.refer(property, "type", type_id)
+            return
+        self.refer(property, "association", element.get("association"))
+        if type_id == None:
+            for child in element:
+                if child.tag == "type":
+                    type_name = PRIMITIVE_TYPE_NAMES.get(child.get("href"))
+                    if type_name != None:
+                        property.typeValue = type_name
+                    else:
+                        self.refer_child(property, "type", child)
+        else:
+            self.refer(property, "type", type_id)
+        lower_value = next(element.iter("lowerValue"), None)
+        if lower_value != None:
+            value = lower_value.get("value")
+            if value != None:
+                property.lowerValue = value
+            else:
+                property.lowerValue = "0"
+        upper_value = next(element.iter("upperValue"), None)
+        if upper_value != None:
+            value = upper_value.get("value")
+            if value != None:
+                property.upperValue = value
+
     def get_realization(self, id, owner:Package, element:ET.Element) -> Realization:
         assert id != None
-        realization = self.element_factory.lookup(id)
+        realization = self.existing(id)
         if realization == None:
-            realization = self.element_factory.create_as(Realization, id)
-            for child in element:
-                pending_queue_entry = PendingEntry(child, element)
-                self.pending_queue.put(pending_queue_entry)
+            realization = self.create_as(Realization, id)
+            self.refer_dependency_ends(element, realization)
         return realization
 
     def get_referent_type(self, referentTypeName, profile:Profile) -> Class:
-        for child in profile.ownedElement:
-            if child.name == referentTypeName and isinstance(child, Class):
-                return child
+        key = (profile, referentTypeName)
+        if profile not in self.indexed_profiles:
+            self.indexed_profiles.add(profile)
+            for child in profile.ownedElement:
+                if isinstance(child, Class):
+                    self.referent_types.setdefault((profile, child.name), child)
+        referent_type = self.referent_types.get(key)
+        if referent_type != None:
+            return referent_type
         new_metatype = self.element_factory.create(Class)
         new_metatype.name = referentTypeName
         new_metatype.package = profile
+        self.referent_types[key] = new_metatype
         return new_metatype
 
+    def get_extension(self, metaclass:Class, stereotype:Stereotype, profile:Profile):
+        # Only one extension is created per stereotype and metaclass, also across imports
+        self.stereotype_attribute(stereotype, "baseClass")
+        if (stereotype, metaclass) in self.extensions:
+            return
+        extension = create_extension(metaclass, stereotype)
+        extension.package = profile
+        self.extensions.add((stereotype, metaclass))
+        for member_end in extension.memberEnd:
+            if member_end.name == "baseClass":
+                self.stereotype_attributes.setdefault((stereotype, "baseClass"), member_end)
+
+    def stereotype_attribute(self, stereotype:Stereotype, name) -> Property | None:
+        if stereotype not in self.indexed_stereotypes:
+            self.indexed_stereotypes.add(stereotype)
+            for attribute in stereotype.ownedAttribute:
+                self.stereotype_attributes.setdefault((stereotype, attribute.name), attribute)
+                if attribute.name == "baseClass" and attribute.type != None:
+                    self.extensions.add((stereotype, attribute.type))
+        return self.stereotype_attributes.get((stereotype, name))
+
+    def get_stereotype_attribute(self, stereotype:Stereotype, name, id) -> Property:
+        attribute = self.stereotype_attribute(stereotype, name)
+        if attribute == None:
+            # The tag definition keeps its xmi:id so slots referring to it can be resolved
+            attribute = self.index.lookup(id)
+            if not isinstance(attribute, Property):
+                attribute = self.create_as(Property, id)
+            attribute.name = name
+            stereotype.ownedAttribute = attribute
+            self.stereotype_attributes[(stereotype, name)] = attribute
+        return attribute
+
     def get_slot(self, element:ET.Element, owner:InstanceSpecification) -> Slot:
-        id = element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        slot = self.element_factory.lookup(id)
+        id = element.get(XMI_ID)
+        slot = self.existing(id)
         if slot == None:
-            slot = self.element_factory.create_as(Slot, id)
+            slot = self.create_as(Slot, id)
+            # The tag definitions of referenced profiles are only known once the whole model is read
             defining_feature_element = element.find("definingFeature")
-            defining_feature_full_id = defining_feature_element.get("href")
-            defining_feature_id = defining_feature_full_id.split("#")[1]
-            defining_feature = self.element_factory.lookup(defining_feature_id)
-            slot.definingFeature = defining_feature
+            if defining_feature_element != None:
+                self.refer_child(slot, "definingFeature", defining_feature_element)
             owner.slot = slot
             value_element = element.find("value")
             if value_element != None:
@@ -653,232 +1125,204 @@ class MDImporter():
 
     def get_stereotype(self, name, id, owner:Package) -> Stereotype:  
         assert id != None
-        stereotype = self.element_factory.lookup(id)
+        stereotype = self.existing(id)
         if stereotype == None:
-            stereotype = self.element_factory.create_as(Stereotype, id)
+            stereotype = self.create_as(Stereotype, id)
             stereotype.name = name
             stereotype.package = owner
         return stereotype
     
     def get_use_case(self, name, id, owner:Package | None) -> UseCase | None:
         assert id != None
-        use_case = self.element_factory.lookup(id)
+        use_case = self.existing(id)
         if use_case == None: 
-            use_case = self.element_factory.create_as(UseCase, id=id)
+            use_case = self.create_as(UseCase, id)
             if owner != None:
                 use_case.package = owner
             use_case.name = name
         return use_case
 
     def import_Abstraction(self, abstraction_element:ET.Element, owner:Package):
-        id = abstraction_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        id = abstraction_element.get(XMI_ID)
         abstraction = self.get_abstraction(id, owner, abstraction_element)
 
     def import_Include(self, include_element:ET.Element, owner:Package | None, use_case:UseCase):
         included_use_case_id = include_element.get("addition")
-        included_use_case = self.element_factory.lookup(included_use_case_id)
         if included_use_case_id == None:
-            raise ImportException("Included use case not found in import_Include: " + included_use_case_id)
-        include_id = include_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+            raise ImportException("Included use case not found in import_Include: " + str(include_element.get(XMI_ID)))
+        include_id = include_element.get(XMI_ID)
         include = self.get_include(include_id, owner)
-        include.addition = included_use_case
+        self.refer(include, "addition", included_use_case_id)
         include.includingCase = use_case
 
+    def import_OwnedInclude(self, include_element:ET.Element, use_case:UseCase):
+        self.import_Include(include_element, use_case.package, use_case)
+
+    def import_Classifier(self, classifier_element:ET.Element, instance_specification:InstanceSpecification):
+        self.refer_child(instance_specification, "classifier", classifier_element)
+
+    def import_MemberEnd(self, member_end_element:ET.Element, association:Association):
+        self.refer_child(association, "memberEnd", member_end_element)
+
     def import_InterfaceRealization(self, interface_realization_element:ET.Element, owner:Class):
-        id = interface_realization_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        id = interface_realization_element.get(XMI_ID)
         interface_realization = self.get_interfaceRealization(id, owner, interface_realization_element)
 
     def import_Model(self, lib_element:ET.Element):
         model_name = lib_element.get("name")
-        model_id = lib_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        model_id = lib_element.get(XMI_ID)
         model = self.get_package(model_name, model_id, None)
-        for child in lib_element:
-            tag = child.tag
-            match tag:
-                case "ownedComment":
-                    self.import_OwnedComment(child, model)
-                case "packagedElement":
-                    self.import_PackagedElement(child, model)
-                case '{http://www.omg.org/spec/XMI/20131001}Extension':
-                    owned_diagram_elements = child.iter("ownedDiagram")
-                    for owned_diagram_element in owned_diagram_elements:
-                        diagram_id = owned_diagram_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-                        name = owned_diagram_element.get("name")
-                        diagram = self.get_diagram(name, diagram_id, None , owned_diagram_element)
+        self.dispatch_children(MODEL_CHILD_HANDLERS, lib_element, model)
+
+    def import_ModelDiagrams(self, extension_element:ET.Element, model:Package):
+        # Diagrams owned by the model itself are not attached to the model package
+        for owned_diagram_element in extension_element.iter("ownedDiagram"):
+            if self.selection != None and not self.selection.includes(owned_diagram_element):
+                continue
+            diagram_id = owned_diagram_element.get(XMI_ID)
+            name = owned_diagram_element.get("name")
+            diagram = self.get_diagram(name, diagram_id, None , owned_diagram_element)
 
     def import_NestedClassifier(self, nested_classifier_element:ET.Element, owner:Class):
-        name = nested_classifier_element.get("name")
-        id = nested_classifier_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        elementType = nested_classifier_element.get("{http://www.omg.org/spec/XMI/20131001}type")
-        match elementType:
-            case "uml:Association":
-                association = self.get_association(id, owner, nested_classifier_element)
-            case "uml:Class":
-                uml_class = self.get_class(name, id, owner, nested_classifier_element)
-            case _:
-                print ("Import of nested classifier not processed for element type: " + elementType)
-                # raise ImportException("Import of nested classifier not processed for element type: " + elementType)
-    
+        self.dispatch(NESTED_CLASSIFIER_HANDLERS, nested_classifier_element, owner)
+
+    def import_Actor(self, actor_element:ET.Element, owner:Package):
+        self.get_actor(actor_element.get("name"), actor_element.get(XMI_ID), owner)
+
+    def import_Association(self, association_element:ET.Element, owner:Package | Class | None):
+        association = self.get_association(association_element.get(XMI_ID), owner, association_element)
+
+    def import_Class(self, class_element:ET.Element, owner:Package | Class):
+        uml_class = self.get_class(class_element.get("name"), class_element.get(XMI_ID), owner, class_element)
+
+    def import_DataType(self, datatype_element:ET.Element, owner:Package | None):
+        self.get_datatype(datatype_element.get("name"), datatype_element.get(XMI_ID), owner)
+
+    def import_Dependency(self, dependency_element:ET.Element, owner:Package | None):
+        dependency = self.get_dependency(dependency_element.get(XMI_ID), dependency_element)
+
+    def import_Enumeration(self, enumeration_element:ET.Element, owner:Package):
+        enumeration = self.get_enumeration(enumeration_element.get("name"), enumeration_element.get(XMI_ID), owner)
+        self.dispatch_children(ENUMERATION_CHILD_HANDLERS, enumeration_element, enumeration)
+
+    def import_Generalization(self, generalization_element:ET.Element, owner:Class):
+        generalization = self.get_generalization(generalization_element.get(XMI_ID), owner)
+        self.refer_general(generalization, generalization_element)
+
+    def import_PackagedGeneralization(self, generalization_element:ET.Element, owner:Package):
+        generalization = self.get_generalization(generalization_element.get(XMI_ID), owner)
+        self.refer_general(generalization, generalization_element)
+
+    def import_InstanceSpecification(self, instance_specification_element:ET.Element, owner:Package):
+        id = instance_specification_element.get(XMI_ID)
+        instanceSpecification = self.get_instanceSpecification(id, owner, instance_specification_element)
+
+    def import_Interface(self, interface_element:ET.Element, owner:Package | None):
+        interface = self.get_interface(interface_element.get("name"), interface_element.get(XMI_ID), owner)
+        isAbstract = interface_element.get("isAbstract")
+        if isAbstract != None:
+            if isAbstract == "true":
+                interface.isAbstract = True
+            else:
+                interface.isAbstract = False
+        self.dispatch_children(INTERFACE_CHILD_HANDLERS, interface_element, interface)
+
+    def import_Package(self, package_element:ET.Element, owner:Package | None):
+        package = self.get_package(package_element.get("name"), package_element.get(XMI_ID), owner)
+        self.import_PackageContents(package_element, package)
+
+    def import_PackageDiagrams(self, extension_element:ET.Element, package:Package):
+        for owned_diagram_element in extension_element.iter("ownedDiagram"):
+            if self.selection != None and not self.selection.includes(owned_diagram_element):
+                continue
+            diagram_id = owned_diagram_element.get(XMI_ID)
+            name = owned_diagram_element.get("name")
+            diagram = self.get_diagram(name, diagram_id, package, owned_diagram_element)
+
+    def import_Realization(self, realization_element:ET.Element, owner:Package | None):
+        realization = self.get_realization(realization_element.get(XMI_ID), owner, realization_element)
+
+    def import_UseCase(self, use_case_element:ET.Element, owner:Package | None):
+        use_case = self.get_use_case(use_case_element.get("name"), use_case_element.get(XMI_ID), owner)
+        self.dispatch_children(USE_CASE_CHILD_HANDLERS, use_case_element, use_case)
+
     def import_OwnedAttribute(self, ownedAttribute_element:ET.Element, owner:Class):
-        id = ownedAttribute_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        id = ownedAttribute_element.get(XMI_ID)
         name = ownedAttribute_element.get("name")
-        attribute_type = ownedAttribute_element.get("{http://www.omg.org/spec/XMI/20131001}type")   
+        attribute_type = ownedAttribute_element.get(XMI_TYPE)   
         match attribute_type:
             case "uml:Property":
                 self.get_property(name, owner, id, ownedAttribute_element)
 
     def import_OwnedComment(self, ownedComment_element:ET.Element, owner:Package | Class | UseCase | Association | None):
+        if self.selection != None and not self.selection.includes(ownedComment_element):
+            return
         body = ownedComment_element.get("body")
-        comment = self.element_factory.create(Comment)
+        id = ownedComment_element.get(XMI_ID)
+        if id != None:
+            comment = self.create_as(Comment, id)
+        else:
+            comment = self.element_factory.create(Comment)
         comment.body = body
         comment.annotatedElement = owner
         owner.comment = comment
 
     def import_OwnedEnd(self, ownedEnd_element:ET.Element, owner:Association):
-        id = ownedEnd_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        owned_end_type = ownedEnd_element.get("{http://www.omg.org/spec/XMI/20131001}type")
+        id = ownedEnd_element.get(XMI_ID)
+        owned_end_type = ownedEnd_element.get(XMI_TYPE)
         match owned_end_type:
             case "uml:Property":
                 property = self.get_property(None, owner, id, ownedEnd_element) 
                 owner.ownedEnd = property   
 
     def import_OwnedLiteral(self, ownedLiteral_element:ET.Element, owner:Enumeration) -> EnumerationLiteral:
-        id = ownedLiteral_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        literalType = ownedLiteral_element.get("{http://www.omg.org/spec/XMI/20131001}type")
+        id = ownedLiteral_element.get(XMI_ID)
+        literalType = ownedLiteral_element.get(XMI_TYPE)
         name = ownedLiteral_element.get("name")
         match literalType:
             case "uml:EnumerationLiteral":
                 enumerationLiteral = self.get_enumerationLiteral(name, id, owner)
             case _:
-                print("import_OwnedLiteral called with unhandled type: " + literalType)
+                self.diagnostics.warning("import_OwnedLiteral called with unhandled type: " + str(literalType), id)
 
     def import_OwnedOperation(self, ownedOperation_element:ET.Element, owner:Interface):
-        id = ownedOperation_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        id = ownedOperation_element.get(XMI_ID)
         name = ownedOperation_element.get("name")
         operation = self.get_operation(name, id, owner, ownedOperation_element)
 
     def import_OwnedParameter(self, ownedParameter_element:ET.Element, owner:Operation):
-        id = ownedParameter_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        id = ownedParameter_element.get(XMI_ID)
         name = ownedParameter_element.get("name")
         parameter = self.get_parameter(name, id, owner, ownedParameter_element)
 
+    def import_PackageContents(self, package_element:ET.Element, package:Package):
+        self.dispatch_children(PACKAGE_CHILD_HANDLERS, package_element, package)
+
     def import_PackagedElement(self, packaged_element:ET.Element, owner:Package | None):
-        name = packaged_element.get("name")
-        id = packaged_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-        elementType = packaged_element.get("{http://www.omg.org/spec/XMI/20131001}type")
-        match elementType:
-            case "uml:Abstraction":
-                self.import_Abstraction(packaged_element, owner)
-            case "uml:Actor":
-                self.get_actor(name, id, owner)
-            case "uml:Association":
-                association = self.get_association(id, owner, packaged_element)
-            case "uml:Class":
-                uml_class = self.get_class(name, id, owner, packaged_element)
-            case "uml:Component":
-                # TODO implement uml:Component
-                print ("Import of packaged element Component not implemented")
-            case "uml:DataType":
-                self.get_datatype(name, id, owner)
-            case "uml:Dependency":
-                dependency = self.get_dependency(id, packaged_element)
-            case "uml:Enumeration":
-                enumeration = self.get_enumeration(name, id, owner)
-                for child in packaged_element:
-                    tag = child.tag
-                    match tag:
-                        case "ownedLiteral":
-                            self.import_OwnedLiteral(child, enumeration)
-            case "uml:Generalization":
-                generalization = self.get_generalization(id, owner)
-                pending_queue_entry = PendingEntry(packaged_element, None)
-                self.pending_queue.put(pending_queue_entry)
-            case "uml:InformationFlow":
-                # TODO implement uml:InformationFlow
-                print ("Import of packaged element InformationFlow not implemented")
-            case "uml:InstanceSpecification":
-                instanceSpecification = self.get_instanceSpecification(id, owner, packaged_element)
-            case "uml:Interface":
-                interface = self.get_interface(name, id, owner)
-                isAbstract = packaged_element.get("isAbstract")
-                if isAbstract != None:
-                    if isAbstract == "true":
-                        interface.isAbstract = True
-                    else:
-                        interface.isAbstract = False
-                for child in packaged_element:
-                    tag = child.tag
-                    match tag:
-                        case "ownedAttribute":
-                            self.import_OwnedAttribute(child, interface)
-                        case "ownedComment":
-                            self.import_OwnedComment(child, interface)
-                        case "ownedOperation":
-                            self.import_OwnedOperation(child, interface)
-                        case _:
-                            print ("Import of packaged element Interface child not processed for tag: " + tag)
-                            # raise ImportException("Import of packaged element Interface child not processed for tag: " + tag)
-            case "uml:LiteralString":
-                # TODO implement uml:LiteralString - intentionally ignored for now
-                # self.get_literalString(name, id, owner)
-                pass
-            case "uml:Package":  
-                package = self.get_package(name, id, owner)
-                for child in packaged_element:
-                    tag = child.tag
-                    match tag:
-                        case "ownedComment":
-                            self.import_OwnedComment(child, package)
-                        case "packagedElement":
-                            self.import_PackagedElement(child, package)
-                        case '{http://www.omg.org/spec/XMI/20131001}Extension':
-                            owned_diagram_elements = child.iter("ownedDiagram")
-                            for owned_diagram_element in owned_diagram_elements:
-                                diagram_id = owned_diagram_element.get("{http://www.omg.org/spec/XMI/20131001}id")
-                                name = owned_diagram_element.get("name")
-                                diagram = self.get_diagram(name, diagram_id, package, owned_diagram_element)
-                        case _:
-                            raise ImportException("Import of packaged element Package child not processed for tag: " + tag)
-            case "uml:Realization":
-                realization = self.get_realization(id, owner, packaged_element)
-            case "uml:TimeEvent":
-                # TODO implement uml:TimeEvent
-                print ("Import of packaged element TimeEvent not implemented")
-            case "uml:Usage":
-                # TODO implement uml:Usage
-                print ("Import of packaged element Usage not implemented")
-            case "uml:UseCase":
-                use_case = self.get_use_case(name, id, owner)
-                for child in packaged_element:
-                    tag = child.tag
-                    match tag:
-                        case "include":
-                            pending_queue_entry = PendingEntry(child, packaged_element)
-                            self.pending_queue.put(pending_queue_entry)
-                        case "ownedBehavior":
-                            # TODO implement ownedBehavior
-                            print ("Import of packaged element UseCase child not processed for tag: " + tag)
-                        case "ownedUseCase":
-                            # TODO implement ownedUseCase
-                            print ("Import of packaged element UseCase child not processed for tag: " + tag)
-                        case "ownedComment":
-                            self.import_OwnedComment(child, use_case)
-                        case "{http://www.omg.org/spec/XMI/20131001}Extension":
-                            # TODO implement Extension
-                            print ("Import of packaged element UseCase child not processed for tag: " + tag)
-                        case _:
-                            print ("Import of packaged element UseCase child not processed for tag: " + tag)
-                            # raise ImportException("Import of packaged element UseCase child not processed for tag: " + tag)
-            case _:
-                print ("Import of packaged element not processed for element type: " + elementType)
-#                raise ImportException("Import of packaged element not processed for element type: " + elementType)
-                   
+        if self.selection != None and not self.selection.includes(packaged_element):
+            return
+        if self.state == None or packaged_element.get(XMI_TYPE) == "uml:Package":
+            self.dispatch(PACKAGED_ELEMENT_HANDLERS, packaged_element, owner)
+            return
+        if self.state.unchanged(packaged_element) and self.index.lookup(packaged_element.get(XMI_ID)) != None:
+            return
+        self.reset_imported_values(packaged_element)
+        updating = self.updating
+        self.updating = True
+        try:
+            self.dispatch(PACKAGED_ELEMENT_HANDLERS, packaged_element, owner)
+        finally:
+            self.updating = updating
+
     def import_Profile(self, profile_element:ET.Element):
         name = profile_element.get("name")
-        id = profile_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        id = profile_element.get(XMI_ID)
         profile = self.get_profile(name, id)
+        uri = profile_element.get("URI")
+        if uri != None:
+            self.profile_uris[profile_uri(uri)] = profile
         for profile_child in profile_element.findall("packagedElement"):
-            if profile_child.get("{http://www.omg.org/spec/XMI/20131001}type") == "uml:Stereotype":
+            if profile_child.get(XMI_TYPE) == "uml:Stereotype":
                 self.import_stereotype(profile_child, profile)
 
     def import_referenced_profiles(self, lib_element:ET.Element):
@@ -891,15 +1335,16 @@ class MDImporter():
                 split_name = full_name.split(":")
                 profile_name = split_name[0]
                 stereotype_name = split_name[1]
-                profile = self.get_profile(profile_name, None)
                 stereotypeHREF = stereotype_element.get("stereotypeHREF")
+                from_library = self.library_profile(stereotypeHREF)
+                profile = self.get_profile(profile_name, None)
                 stereotype_id = stereotypeHREF.split("#")[1]
                 stereotype = self.get_stereotype(stereotype_name, stereotype_id, profile)
                 stereotype_dictionary[full_name] = stereotype
-                # Since we don't know the type to which the stereotype may be applied, we will create it as an extension of Element
-                gaphor_metatype = self.get_referent_type("Element", profile) 
-                extension = create_extension(gaphor_metatype, stereotype)
-                extension.package = profile
+                if not from_library:
+                    # Since we don't know the type to which the stereotype may be applied, we will create it as an extension of Element
+                    gaphor_metatype = self.get_referent_type("Element", profile) 
+                    self.get_extension(gaphor_metatype, stereotype, profile)
             tag_elements = stereotype_href.findall("tag")
             for tag_element in tag_elements:
                 tag_full_name = tag_element.get("name")
@@ -909,63 +1354,166 @@ class MDImporter():
                 tag_name = split_full_name[2]
                 stereotype = stereotype_dictionary[profile_name + ":" + stereotype_name]
                 tag_full_id = tag_element.get("tagURI")
-                tag_id = tag_full_id.split("#")[1]
-                found = False
-                for attribute in stereotype.ownedAttribute:
-                    if attribute.name == tag_name:
-                        found = True
-                if found == False:
-                    new_attribute = self.element_factory.create(Property)
-                    new_attribute.name = tag_name
-                    stereotype.ownedAttribute = new_attribute
+                tag_id = self.index.href_id(tag_full_id)
+                self.get_stereotype_attribute(stereotype, tag_name, tag_id)
         for child in lib_element:
             if child.tag == "referencedProfile":
-                profile_id = child.get("{http://www.omg.org/spec/XMI/20131001}idref")
-                profile = self.element_factory.lookup(profile_id)
+                profile_id = child.get(XMI_IDREF)
+                profile = self.index.lookup(profile_id)
                 if profile == None:
                     raise ImportException("Referenced profile not found in import_referenced_profiles: " + profile_id)
                 self.import_Profile(profile)
 
+    def library_profile(self, href) -> bool:
+        # Whether the profile of a stereotype reference is in the model completely, copied from the
+        # profile library by this or an earlier import
+        if self.profile_library == None:
+            return False
+        uri = profile_uri(href)
+        from_library = self.library_profiles.get(uri)
+        if from_library == None:
+            from_library = self.profile_library.instantiate(uri, self.element_factory)
+            self.library_profiles[uri] = from_library
+            if from_library:
+                # The profiles of the library model are found by name from now on
+                self.profiles_by_name = None
+        return from_library
+
     def import_stereotype(self, stereotype_element:ET.Element, profile:Profile):
         stereotype_name = stereotype_element.get("name")
-        stereotype_id = stereotype_element.get("{http://www.omg.org/spec/XMI/20131001}id")
+        stereotype_id = stereotype_element.get(XMI_ID)
         stereotype = self.get_stereotype(stereotype_name, stereotype_id, profile)
         for stereotype_child in stereotype_element.findall("ownedAttribute"):
-            if stereotype_child.get("{http://www.omg.org/spec/XMI/20131001}type") == "uml:Property":
+            if stereotype_child.get(XMI_TYPE) == "uml:Property":
                 propertyType = stereotype_child.find("type")
                 typeReferent = propertyType.get("href")
                 baseTypeName = typeReferent.split("#")[1]
                 if stereotype_child.get("association") != None: 
                     # This is the base type of the stereotype, create an extension
-                    found = False
-                    for attribute in stereotype.ownedAttribute:
-                        if attribute.name == "baseClass":
-                            found = True
-                    if found == False:
+                    if self.stereotype_attribute(stereotype, "baseClass") == None:
                         gaphor_metatype = self.get_referent_type(baseTypeName, profile)
-                        extension = create_extension(gaphor_metatype, stereotype)
-                        extension.package = profile
+                        self.get_extension(gaphor_metatype, stereotype, profile)
                 else:
                     # This is an attribute of the stereotype
-                    found = False
-                    for attribute in stereotype.ownedAttribute:
-                        if attribute.name == stereotype_child.get("name"):
-                            found = True
-                    if found == False:
-                        new_attribute = self.element_factory.create(Property)
-                        new_attribute.name = stereotype_child.get("name")
-                        stereotype.ownedAttribute = new_attribute
+                    attribute_name = stereotype_child.get("name")
+                    if self.stereotype_attribute(stereotype, attribute_name) == None:
+                        new_attribute = self.get_stereotype_attribute(stereotype, attribute_name, stereotype_child.get(XMI_ID))
                         new_attribute.typeValue = baseTypeName
 
-    def pending_import_use_case(self, entry:PendingEntry):
-        element = entry.element
-        parent = entry.parent
-        use_case_id = parent.get("{http://www.omg.org/spec/XMI/20131001}id")
-        use_case = self.element_factory.lookup(use_case_id)
-        if use_case == None:
-            raise ImportException("Use case not found in pending_import_use_case")
-            return
-        use_case_package = use_case.package
-        for child in element:
-            if child.tag == "include":
-                self.import_Include(child, element, use_case_package, use_case)
+
+def report_tag(message):
+    def handler(importer, element, owner):
+        importer.diagnostics.warning(message + element.tag, element.get(XMI_ID))
+    return mark(handler, SKIPPED)
+
+def report_type(message):
+    def handler(importer, element, owner):
+        importer.diagnostics.warning(message + str(element.get(XMI_TYPE)), element.get(XMI_ID))
+    return mark(handler, SKIPPED)
+
+def report(message):
+    def handler(importer, element, owner):
+        importer.diagnostics.warning(message, element.get(XMI_ID))
+    return mark(handler, SKIPPED)
+
+def reject_tag(message):
+    def handler(importer, element, owner):
+        raise ImportException(message + element.tag)
+    return mark(handler, REJECTED)
+
+def ignore(importer, element, owner):
+    pass
+
+def deferred(pending_handler):
+    # Queues the element, which pending_handler imports once the whole model has been read
+    def handler(importer, element, owner):
+        importer.defer(element, owner, pending_handler)
+    handler.pending_handler = pending_handler
+    return mark(handler, DEFERRED)
+
+mark(ignore, IGNORED)
+
+# Handler tables for each kind of XML container, keyed on (tag, xmi:type) of the child nodes.
+# Handlers for element kinds that are not imported yet can be added with register(), e.g.
+# PACKAGED_ELEMENT_HANDLERS.register("packagedElement", "uml:Component", import_component)
+
+PACKAGED_ELEMENT_HANDLERS = HandlerTable("packagedElement", report_type("Import of packaged element not processed for element type: "))
+for xmi_type, handler in [
+    ("uml:Abstraction", MDImporter.import_Abstraction),
+    ("uml:Actor", MDImporter.import_Actor),
+    ("uml:Association", MDImporter.import_Association),
+    ("uml:Class", MDImporter.import_Class),
+    # TODO implement uml:Component
+    ("uml:Component", report("Import of packaged element Component not implemented")),
+    ("uml:DataType", MDImporter.import_DataType),
+    ("uml:Dependency", MDImporter.import_Dependency),
+    ("uml:Enumeration", MDImporter.import_Enumeration),
+    ("uml:Generalization", MDImporter.import_PackagedGeneralization),
+    # TODO implement uml:InformationFlow
+    ("uml:InformationFlow", report("Import of packaged element InformationFlow not implemented")),
+    ("uml:InstanceSpecification", MDImporter.import_InstanceSpecification),
+    ("uml:Interface", MDImporter.import_Interface),
+    # TODO implement uml:LiteralString - intentionally ignored for now
+    ("uml:LiteralString", ignore),
+    ("uml:Package", MDImporter.import_Package),
+    ("uml:Realization", MDImporter.import_Realization),
+    # TODO implement uml:TimeEvent
+    ("uml:TimeEvent", report("Import of packaged element TimeEvent not implemented")),
+    # TODO implement uml:Usage
+    ("uml:Usage", report("Import of packaged element Usage not implemented")),
+    ("uml:UseCase", MDImporter.import_UseCase),
+]:
+    PACKAGED_ELEMENT_HANDLERS.register("packagedElement", xmi_type, handler)
+
+NESTED_CLASSIFIER_HANDLERS = HandlerTable("nestedClassifier", report_type("Import of nested classifier not processed for element type: "))
+NESTED_CLASSIFIER_HANDLERS.register("nestedClassifier", "uml:Association", MDImporter.import_Association)
+NESTED_CLASSIFIER_HANDLERS.register("nestedClassifier", "uml:Class", MDImporter.import_Class)
+
+MODEL_CHILD_HANDLERS = HandlerTable("Model", ignore)
+MODEL_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
+MODEL_CHILD_HANDLERS.register("packagedElement", None, MDImporter.import_PackagedElement)
+MODEL_CHILD_HANDLERS.register(XMI_EXTENSION, None, MDImporter.import_ModelDiagrams)
+
+PACKAGE_CHILD_HANDLERS = HandlerTable("Package", reject_tag("Import of packaged element Package child not processed for tag: "))
+PACKAGE_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
+PACKAGE_CHILD_HANDLERS.register("packagedElement", None, MDImporter.import_PackagedElement)
+PACKAGE_CHILD_HANDLERS.register(XMI_EXTENSION, None, MDImporter.import_PackageDiagrams)
+
+ASSOCIATION_CHILD_HANDLERS = HandlerTable("Association", reject_tag("Import of packaged element Association child not processed for tag: "))
+ASSOCIATION_CHILD_HANDLERS.register("memberEnd", None, MDImporter.import_MemberEnd)
+ASSOCIATION_CHILD_HANDLERS.register("ownedEnd", None, MDImporter.import_OwnedEnd)
+# TODO implement navigableOwnedEnd
+ASSOCIATION_CHILD_HANDLERS.register("navigableOwnedEnd", None, report_tag("Import of packaged element Association child not processed for tag: "))
+# TODO implement ownedRule
+ASSOCIATION_CHILD_HANDLERS.register("ownedRule", None, report_tag("Import of packaged element Association child not processed for tag: "))
+ASSOCIATION_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
+
+# TODO implement Extension, ownedConnector, ownedRule, ownedTemplateSignature and templateBinding
+CLASS_CHILD_HANDLERS = HandlerTable("Class", report_tag("Import of packaged element Class child not processed for tag: "))
+CLASS_CHILD_HANDLERS.register("generalization", None, MDImporter.import_Generalization)
+CLASS_CHILD_HANDLERS.register("interfaceRealization", None, MDImporter.import_InterfaceRealization)
+CLASS_CHILD_HANDLERS.register("nestedClassifier", None, MDImporter.import_NestedClassifier)
+CLASS_CHILD_HANDLERS.register("ownedAttribute", None, MDImporter.import_OwnedAttribute)
+CLASS_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
+CLASS_CHILD_HANDLERS.register("ownedOperation", None, MDImporter.import_OwnedOperation)
+
+ENUMERATION_CHILD_HANDLERS = HandlerTable("Enumeration", ignore)
+ENUMERATION_CHILD_HANDLERS.register("ownedLiteral", None, MDImporter.import_OwnedLiteral)
+
+INSTANCE_SPECIFICATION_CHILD_HANDLERS = HandlerTable("InstanceSpecification", report_tag("Import of packaged element InstanceSpecification child not processed for tag: "))
+INSTANCE_SPECIFICATION_CHILD_HANDLERS.register("classifier", None, MDImporter.import_Classifier)
+INSTANCE_SPECIFICATION_CHILD_HANDLERS.register("slot", None, lambda importer, element, owner: importer.get_slot(element, owner))
+
+INTERFACE_CHILD_HANDLERS = HandlerTable("Interface", report_tag("Import of packaged element Interface child not processed for tag: "))
+INTERFACE_CHILD_HANDLERS.register("ownedAttribute", None, MDImporter.import_OwnedAttribute)
+INTERFACE_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
+INTERFACE_CHILD_HANDLERS.register("ownedOperation", None, MDImporter.import_OwnedOperation)
+
+OPERATION_CHILD_HANDLERS = HandlerTable("Operation", report_tag("Import of owned operation child not processed for tag: "))
+OPERATION_CHILD_HANDLERS.register("ownedParameter", None, MDImporter.import_OwnedParameter)
+OPERATION_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
+
+# TODO implement ownedBehavior, ownedUseCase and Extension
+USE_CASE_CHILD_HANDLERS = HandlerTable("UseCase", report_tag("Import of packaged element UseCase child not processed for tag: "))
+USE_CASE_CHILD_HANDLERS.register("include", None, MDImporter.import_OwnedInclude)
+USE_CASE_CHILD_HANDLERS.register("ownedComment", None, MDImporter.import_OwnedComment)
@@ -0,0 +1,48 @@
+import os
+import zipfile
+from contextlib import contextmanager
+
+import xml.etree.ElementTree as ET
+
+MODEL_MEMBER = "com.nomagic.magicdraw.uml_model.model"
+SHARED_MODEL_MEMBER = "com.nomagic.magicdraw.uml_model.shared_model"
+
+def is_mdzip(path) -> bool:
+    return str(path).lower().endswith(".mdzip")
+
+def is_profile_member(archive:zipfile.ZipFile, member:str) -> bool:
+    # Only the start tags up to the first top level element of the document are read
+    with archive.open(member) as stream:
+        depth = 0
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            if event == "end":
+                depth -= 1
+                continue
+            depth += 1
+            if depth == 2:
+                return element.tag == "{http://www.omg.org/spec/UML/20131001}Profile"
+    return False
+
+def select_model_member(archive:zipfile.ZipFile) -> str | None:
+    names = set(archive.namelist())
+    if SHARED_MODEL_MEMBER in names:
+        if MODEL_MEMBER not in names or is_profile_member(archive, SHARED_MODEL_MEMBER):
+            return SHARED_MODEL_MEMBER
+    if MODEL_MEMBER in names:
+        return MODEL_MEMBER
+    return None
+
+@contextmanager
+def open_document(path):
+    # The model document of a MagicDraw file and its uncompressed size. A .mdzip is read in place:
+    # the model member is decompressed while it is being parsed.
+    if not is_mdzip(path):
+        with open(path, "rb") as source:
+            yield source, os.path.getsize(path)
+        return
+    with zipfile.ZipFile(path) as archive:
+        member = select_model_member(archive)
+        if member == None:
+            raise ValueError("No MagicDraw model found in " + str(path))
+        with archive.open(member) as source:
+            yield source, archive.getinfo(member).file_size
@@ -0,0 +1,108 @@
+import os
+import sys
+from collections import OrderedDict
+
+from gaphor_mdimport_plugin.mdzip import open_document
+from gaphor_mdimport_plugin.xmi import XMI_ID, XMI_TYPE
+from gaphor_mdimport_plugin.xmlbackend import get_backend
+
+MODULE_SUFFIXES = (".mdzip", ".xmi", ".xml", ".uml")
+# Ids held by all cached module indexes together, before the least recently used are dropped
+DEFAULT_MAX_IDS = 2000000
+# Documents of the UML specification itself (PrimitiveTypes.xmi, UML.xmi, StandardProfile.xmi).
+# The importer maps what it uses of them onto Gaphor's own types and metaclasses, so they are not
+# modules to be found in a library directory.
+STANDARD_LIBRARY_PREFIX = "http://www.omg.org/spec/UML/"
+
+def is_standard_library(document) -> bool:
+    return document.startswith(STANDARD_LIBRARY_PREFIX)
+
+def module_key(document) -> str:
+    # The file name of the document part of an href, without its suffix, so that a reference to
+    # "http://host/lib/Units.mdzip" or "Units.xmi" finds a local Units.mdzip as well
+    name = document.replace("\\", "/").rstrip("/").rpartition("/")[2].lower()
+    for suffix in MODULE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+class ModuleIndex():
+    # Kind, name and owner of every element of a module, by id. That is all an import needs to
+    # create an element of the module that is referred to, and much less than the parsed module.
+    def __init__(self, path):
+        self.path = path
+        # id: (xmi:type, name, owner id)
+        self.entries = {}
+
+    def read(self, events):
+        # Ids of the open elements; None for open nodes without one
+        owners = [None]
+        open_elements = []
+        entries = self.entries
+        for event, element in events:
+            if event == "end":
+                owners.pop()
+                open_elements.pop()
+                # Emptied and detached, so that only the open branch stays in memory
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+                continue
+            open_elements.append(element)
+            id = element.get(XMI_ID)
+            xmi_type = element.get(XMI_TYPE)
+            owner_id = owners[-1]
+            if id != None and xmi_type != None:
+                entries[id] = (sys.intern(xmi_type), element.get("name"), owner_id)
+                owner_id = id
+            owners.append(owner_id)
+        return self
+
+    def __len__(self):
+        return len(self.entries)
+
+class ModuleResolver():
+    # Finds the module an href points into among the MagicDraw files of the library directories,
+    # and keeps the indexes of the modules read most recently, up to max_ids ids in all, so that
+    # a large set of modules is never held in memory at once
+    def __init__(self, directories, max_ids=DEFAULT_MAX_IDS, xml_backend=None):
+        self.directories = list(directories)
+        self.max_ids = max_ids
+        self.xml_backend = xml_backend
+        self.paths = None
+        self.indexes = OrderedDict()
+        self.cached_ids = 0
+        self.loads = 0
+
+    def path_for(self, document) -> str | None:
+        if self.paths == None:
+            self.paths = {}
+            for directory in self.directories:
+                for folder, folders, files in os.walk(directory):
+                    for file_name in sorted(files):
+                        if file_name.lower().endswith(MODULE_SUFFIXES):
+                            self.paths.setdefault(module_key(file_name), os.path.join(folder, file_name))
+        return self.paths.get(module_key(document))
+
+    def index_for(self, document) -> ModuleIndex | None:
+        if is_standard_library(document):
+            return None
+        path = self.path_for(document)
+        if path == None:
+            return None
+        index = self.indexes.get(path)
+        if index != None:
+            self.indexes.move_to_end(path)
+            return index
+        index = self.load(path)
+        self.indexes[path] = index
+        self.cached_ids += len(index)
+        while self.cached_ids > self.max_ids and len(self.indexes) > 1:
+            evicted_path, evicted = self.indexes.popitem(last=False)
+            self.cached_ids -= len(evicted)
+        return index
+
+    def load(self, path) -> ModuleIndex:
+        self.loads += 1
+        with open_document(path) as (source, size):
+            return ModuleIndex(path).read(get_backend(self.xml_backend).iterparse(source, ("start", "end")))
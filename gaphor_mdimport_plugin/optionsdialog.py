@@ -0,0 +1,54 @@
+import os
+
+from gi.repository import Gtk
+
+from gaphor.i18n import gettext
+
+from gaphor_mdimport_plugin.importoptions import OPTIONS, ImportOptions
+
+class OptionsDialog():
+    # Lets the user change the options of the imports from the Tools menu. on_save is called
+    # with the changed ImportOptions when the user confirms.
+    def __init__(self, parent, options:ImportOptions, on_save):
+        self.options = options
+        self.on_save = on_save
+        self.window = Gtk.Window(
+            title=gettext("MD Import Options"),
+            transient_for=parent,
+            modal=True,
+            default_width=420,
+        )
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        box.set_margin_top(18)
+        box.set_margin_bottom(18)
+        box.set_margin_start(18)
+        box.set_margin_end(18)
+        self.option_buttons = {}
+        for name, default, label in OPTIONS:
+            button = Gtk.CheckButton(label=gettext(label), active=getattr(options, name))
+            box.append(button)
+            self.option_buttons[name] = button
+        box.append(Gtk.Label(label=gettext("Module directories, separated by ") + os.pathsep, xalign=0))
+        self.module_directories_entry = Gtk.Entry(text=options.module_directories_text())
+        box.append(self.module_directories_entry)
+        button_box = Gtk.Box(spacing=6, halign=Gtk.Align.END)
+        button_box.set_margin_top(12)
+        cancel_button = Gtk.Button(label=gettext("Cancel"))
+        cancel_button.connect("clicked", self.on_cancel)
+        save_button = Gtk.Button(label=gettext("Save"))
+        save_button.connect("clicked", self.on_save_clicked)
+        button_box.append(cancel_button)
+        button_box.append(save_button)
+        box.append(button_box)
+        self.window.set_child(box)
+        self.window.present()
+
+    def on_save_clicked(self, button):
+        for name, button in self.option_buttons.items():
+            setattr(self.options, name, button.get_active())
+        self.options.set_module_directories_text(self.module_directories_entry.get_text())
+        self.window.destroy()
+        self.on_save(self.options)
+
+    def on_cancel(self, button):
+        self.window.destroy()
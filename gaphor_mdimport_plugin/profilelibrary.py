@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+
+from gaphor.UML import Profile
+
+log = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+LIBRARY_VERSION = 1
+
+def profile_uri(href) -> str:
+    # The document part of an href, without a trailing .xmi, so that a stereotype reference like
+    # ".../SysML.xmi#SysML_Block" and the URI ".../SysML" of the profile itself give the same key
+    uri = href.partition("#")[0]
+    if uri.lower().endswith(".xmi"):
+        uri = uri[:-len(".xmi")]
+    return uri
+
+def default_library_dir() -> str:
+    from gaphor.settings import get_cache_dir
+    return os.path.join(get_cache_dir(), "mdimport", "profiles")
+
+class ProfileLibrary():
+    # Profiles that were imported completely once, kept as Gaphor models keyed by profile URI. When
+    # a model refers to a stereotype of a profile in the library, the whole profile is copied into
+    # the model, instead of the profile being imported from its MagicDraw file first or being
+    # stubbed from the stereotype references of the model.
+    def __init__(self, modeling_language, directory=None):
+        self.modeling_language = modeling_language
+        if directory == None:
+            directory = default_library_dir()
+        self.directory = directory
+        self.index = None
+
+    def entries(self) -> dict:
+        if self.index == None:
+            self.index = {}
+            path = os.path.join(self.directory, INDEX_FILE)
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding="utf-8") as index_file:
+                        index = json.load(index_file)
+                    if index.get("version") == LIBRARY_VERSION:
+                        self.index = index.get("profiles", {})
+                except (OSError, ValueError):
+                    log.warning("Ignoring unreadable profile library index: %s", path)
+        return self.index
+
+    def write_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, INDEX_FILE)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as index_file:
+            json.dump({"version": LIBRARY_VERSION, "profiles": self.entries()}, index_file, indent=2)
+        os.replace(temporary_path, path)
+
+    def add(self, path, uri=None) -> list:
+        # Imports the profiles of a MagicDraw file into an empty model and stores that model under
+        # the URI of each profile (or under uri, when given). Returns the URIs added.
+        from gaphor.storage import storage
+        from gaphor_mdimport_plugin.cli import create_session
+        from gaphor_mdimport_plugin.mdimporter import ImportException, MDImporter
+
+        event_manager, element_factory, modeling_language = create_session()
+        importer = MDImporter(None, element_factory, event_manager, bulk_load=True)
+        importer.process_path(path)
+        uris = list(importer.profile_uris)
+        if uri != None:
+            uris = [profile_uri(uri)]
+        if not uris:
+            element_factory.shutdown()
+            raise ImportException("No profile with a URI found in " + str(path))
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16] + ".gaphor"
+        temporary_path = os.path.join(self.directory, file_name + ".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as out:
+            storage.save(out, element_factory)
+        os.replace(temporary_path, os.path.join(self.directory, file_name))
+        entries = self.entries()
+        for added_uri in uris:
+            entries[added_uri] = {
+                "file": file_name,
+                "source": os.path.abspath(path),
+                "profiles": sorted(profile.name for profile in element_factory.select(Profile)),
+            }
+        self.write_index()
+        element_factory.shutdown()
+        return uris
+
+    def remove(self, uri) -> bool:
+        entries = self.entries()
+        entry = entries.pop(profile_uri(uri), None)
+        if entry == None:
+            return False
+        self.write_index()
+        if not any(other["file"] == entry["file"] for other in entries.values()):
+            self.remove_file(entry["file"])
+        return True
+
+    def clear(self) -> int:
+        entries = self.entries()
+        count = len(entries)
+        for entry in entries.values():
+            self.remove_file(entry["file"])
+        entries.clear()
+        self.write_index()
+        return count
+
+    def remove_file(self, file_name):
+        try:
+            os.remove(os.path.join(self.directory, file_name))
+        except FileNotFoundError:
+            pass
+
+    def instantiate(self, uri, element_factory) -> bool:
+        # Copies the library model of the profile into element_factory in one load. Returns whether
+        # the profile is now complete in the model: True as well when an earlier import already
+        # copied it, False when the library has no entry for the URI or when elements of the
+        # library model exist in the model already without being a copy of it.
+        from gaphor.storage.parser import GaphorLoader, parse_generator
+        from gaphor.storage.storage import load_elements
+
+        entry = self.entries().get(profile_uri(uri))
+        if entry == None:
+            return False
+        path = os.path.join(self.directory, entry["file"])
+        # The library model is read like a saved model, so that a library written by an older Gaphor
+        # is upgraded by load_elements according to the version it was saved with
+        loader = GaphorLoader()
+        try:
+            with open(path, encoding="utf-8") as library_file:
+                for percentage in parse_generator(library_file, loader):
+                    pass
+        except Exception as exception:
+            log.warning("Profile library entry for %s can not be read: %s", uri, exception)
+            return False
+        elements = loader.elements
+        existing = [id for id in elements if element_factory.lookup(id) != None]
+        if len(existing) == len(elements):
+            return True
+        if existing:
+            log.warning("Profile %s is partially in the model already, it is not taken from the profile library", uri)
+            return False
+        load_elements(elements, element_factory, self.modeling_language, loader.gaphor_version)
+        return True
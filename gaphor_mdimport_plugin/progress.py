@@ -0,0 +1,58 @@
+from gi.repository import Gtk
+
+from gaphor.i18n import gettext
+
+class ImportProgressDialog():
+    def __init__(self, parent, phases):
+        self.cancelled = False
+        self.phases = phases
+        self.current_phase = None
+        self.window = Gtk.Window(
+            title=gettext("Importing MagicDraw model"),
+            transient_for=parent,
+            modal=True,
+            deletable=False,
+            resizable=False,
+        )
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        box.set_margin_top(18)
+        box.set_margin_bottom(18)
+        box.set_margin_start(18)
+        box.set_margin_end(18)
+        self.progress_bars = {}
+        for phase in phases:
+            label = Gtk.Label(label=gettext(phase), xalign=0)
+            progress_bar = Gtk.ProgressBar(show_text=True)
+            progress_bar.set_size_request(360, -1)
+            box.append(label)
+            box.append(progress_bar)
+            self.progress_bars[phase] = progress_bar
+        self.cancel_button = Gtk.Button(label=gettext("Cancel"), halign=Gtk.Align.END)
+        self.cancel_button.set_margin_top(12)
+        self.cancel_button.connect("clicked", self.on_cancel)
+        box.append(self.cancel_button)
+        self.window.set_child(box)
+        self.window.present()
+
+    def update(self, phase, done, total):
+        if phase != self.current_phase:
+            # Phases run in order, so every earlier phase is complete (or did not apply)
+            for earlier_phase in self.phases[:self.phases.index(phase)]:
+                self.progress_bars[earlier_phase].set_fraction(1.0)
+                self.progress_bars[earlier_phase].set_text(None)
+            self.current_phase = phase
+        progress_bar = self.progress_bars[phase]
+        if total:
+            progress_bar.set_fraction(min(done / total, 1.0))
+            progress_bar.set_text(None)
+        else:
+            progress_bar.pulse()
+            progress_bar.set_text(str(done))
+
+    def on_cancel(self, button):
+        self.cancelled = True
+        self.cancel_button.set_sensitive(False)
+        self.cancel_button.set_label(gettext("Cancelling…"))
+
+    def close(self):
+        self.window.destroy()
@@ -0,0 +1,69 @@
+import sys
+
+import xml.etree.ElementTree as ET
+
+from gaphor_mdimport_plugin.xmi import XMI_ID, XMI_IDREF, XMI_TYPE
+
+# Attributes the deferred handlers read. Handlers registered for the pending phase that need
+# another attribute add its name here.
+KEPT_ATTRIBUTES = {XMI_ID, XMI_IDREF, XMI_TYPE, "addition", "association", "contract", "general", "href", "name", "type",
+    "value"}
+# Attribute values that come from a small vocabulary and are shared between records. Tags and
+# attribute names are always interned; element names are kept as they are.
+INTERNED_ATTRIBUTES = {XMI_TYPE}
+
+NO_ATTRIBUTES = ()
+NO_CHILDREN = ()
+
+class PendingRecord():
+    # Detached copy of an XML element that waits in a deferred queue. Only the attributes in
+    # KEPT_ATTRIBUTES are copied, so the parsed tree can be released after the first pass. It
+    # answers the part of the ElementTree interface the deferred handlers use: tag, get(),
+    # iteration over the children, find() and iter().
+    __slots__ = ("tag", "attributes", "children")
+
+    def __init__(self, tag, attributes=NO_ATTRIBUTES, children=NO_CHILDREN):
+        self.tag = tag
+        # (name, value) pairs; a record rarely holds more than a few
+        self.attributes = attributes
+        self.children = children
+
+    def get(self, name, default=None):
+        for attribute_name, value in self.attributes:
+            if attribute_name == name:
+                return value
+        return default
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __len__(self):
+        return len(self.children)
+
+    def find(self, tag):
+        for child in self.children:
+            if child.tag == tag:
+                return child
+        return None
+
+    def iter(self, tag=None):
+        if tag == None or self.tag == tag:
+            yield self
+        for child in self.children:
+            yield from child.iter(tag)
+
+def compact(element:ET.Element) -> PendingRecord:
+    attributes = NO_ATTRIBUTES
+    if element.attrib:
+        kept = []
+        for name, value in element.attrib.items():
+            if name in KEPT_ATTRIBUTES:
+                if name in INTERNED_ATTRIBUTES:
+                    value = sys.intern(value)
+                kept.append((sys.intern(name), value))
+        if kept:
+            attributes = tuple(kept)
+    children = NO_CHILDREN
+    if len(element):
+        children = tuple(compact(child) for child in element)
+    return PendingRecord(sys.intern(element.tag), attributes, children)
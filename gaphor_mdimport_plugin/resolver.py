@@ -0,0 +1,108 @@
+from gaphor_mdimport_plugin.idindex import IdIndex
+
+# References that fill an ordered collection are always kept until the end of the first pass and
+# are set before all others, in this order and in document order, so that the collection is in
+# source order. Setting a Property's association adds it to the association's memberEnd as well,
+# which then has it already.
+ORDERED_KINDS = ("memberEnd", "association")
+
+class Reference():
+    # A typed edge from an imported element to the element it refers to: source.kind is set to
+    # the element imported for target_id. The document of an href into another module is kept,
+    # so that the target can be taken from that module when it is not in the model.
+    __slots__ = ("source", "kind", "target_id", "document")
+
+    def __init__(self, source, kind, target_id, document=None):
+        self.source = source
+        self.kind = kind
+        self.target_id = target_id
+        self.document = document
+
+class ReferenceResolver():
+    # The forward references of an import. A reference to an element that has been imported
+    # already is set at once, unless eager is off (an incremental import may still replace the
+    # element); the others wait, by target id, until all elements exist. So only the references
+    # that could not be resolved when they were read are kept, plus the ordered ones.
+    def __init__(self, index:IdIndex, eager=True, find_external=None):
+        self.index = index
+        self.eager = eager
+        # Called as find_external(document, id) for a target that is not in the model
+        self.find_external = find_external
+        self.ordered = {kind: [] for kind in ORDERED_KINDS}
+        self.waiting = {}
+        self.waiting_count = 0
+        self.blocked = []
+
+    def refer(self, source, kind, target_id, document=None):
+        if target_id == None:
+            return
+        ordered = self.ordered.get(kind)
+        if ordered != None:
+            ordered.append(Reference(source, kind, target_id, document))
+            return
+        if self.eager:
+            target = self.index.lookup(target_id)
+            if target != None:
+                setattr(source, kind, target)
+                return
+        self.waiting.setdefault(target_id, []).append(Reference(source, kind, target_id, document))
+        self.waiting_count += 1
+
+    def __len__(self):
+        return sum(len(references) for references in self.ordered.values()) + self.waiting_count + len(self.blocked)
+
+    def steps(self):
+        # Sets every reference whose target exists now, yielding after each; the others are kept
+        # as blocked
+        for kind in ORDERED_KINDS:
+            references = self.ordered[kind]
+            self.ordered[kind] = []
+            for reference in references:
+                self.set(reference)
+                yield
+        while self.waiting:
+            target_id, references = self.waiting.popitem()
+            self.waiting_count -= len(references)
+            target = self.index.lookup(target_id)
+            for reference in references:
+                if target == None:
+                    self.blocked.append(reference)
+                else:
+                    setattr(reference.source, reference.kind, target)
+                yield
+
+    def set(self, reference:Reference):
+        target = self.index.lookup(reference.target_id)
+        if target == None:
+            self.blocked.append(reference)
+        else:
+            setattr(reference.source, reference.kind, target)
+
+    def retry_steps(self):
+        # Blocked references once more, for targets that were created after they were tried, and
+        # then those into other modules, one module after the other
+        blocked = self.blocked
+        self.blocked = []
+        external = []
+        for reference in blocked:
+            if reference.document != None and self.find_external != None:
+                external.append(reference)
+            else:
+                self.set(reference)
+            yield
+        external.sort(key=lambda reference: reference.document)
+        for reference in external:
+            target = self.index.lookup(reference.target_id)
+            if target == None:
+                target = self.find_external(reference.document, reference.target_id)
+            if target == None:
+                self.blocked.append(reference)
+            else:
+                setattr(reference.source, reference.kind, target)
+            yield
+
+    def dangling(self) -> list:
+        # The references that are still blocked; the importer reports each of them
+        blocked = self.blocked
+        self.blocked = []
+        return blocked
@@ -0,0 +1,175 @@
+from collections import deque
+
+import xml.etree.ElementTree as ET
+
+from gaphor_mdimport_plugin.xmi import UML_MODEL, XMI_ID, XMI_IDREF, XMI_TYPE
+
+# Attributes that refer to other elements, by xmi:id or (href) by URL with the id as fragment.
+# Values of the id attributes may list several ids.
+REFERENCE_ATTRIBUTES = ("addition", "association", "classifier", "contract", "general", "memberEnd", "type", XMI_IDREF)
+HREF = "href"
+# Kinds of the children of a package that are imported, or left out, as a whole
+UNIT_TAGS = {"packagedElement", "ownedComment", "ownedDiagram"}
+DIAGRAM_KIND = "uml:Diagram"
+
+class PackageNode():
+    def __init__(self, id, name, parent_id):
+        self.id = id
+        self.name = name
+        self.parent_id = parent_id
+        self.children = []
+
+class ModelScan():
+    # The package tree of a document and, for everything else directly in a package (a unit: a
+    # packaged element, comment or diagram, with everything nested in it), its kind, its package,
+    # and the ids it refers to. Read in one pass without building the tree.
+    def __init__(self):
+        self.packages = {}
+        self.roots = []
+        self.unit_kinds = {}
+        self.unit_packages = {}
+        self.references = {}
+        # Unit of every id nested in a unit
+        self.unit_of = {}
+        # Kinds of nested elements that can be left out as well (comments)
+        self.nested_kinds = set()
+
+    def read(self, events):
+        # (package id, unit id) for each open element
+        context = []
+        open_elements = []
+        for event, element in events:
+            if event == "end":
+                context.pop()
+                open_elements.pop()
+                # Nothing of the tree is needed after the element has been seen: it is emptied and
+                # detached, so that only the open branch stays in memory
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+                continue
+            id = element.get(XMI_ID)
+            package_id, unit_id = None, None
+            if context:
+                package_id, unit_id = context[-1]
+            if unit_id == None and package_id == None and element.tag == UML_MODEL:
+                self.add_package(id, element.get("name"), None)
+                package_id = id
+            elif unit_id == None and package_id != None and element.tag == "packagedElement" \
+                    and element.get(XMI_TYPE) == "uml:Package":
+                self.add_package(id, element.get("name"), package_id)
+                package_id = id
+            elif unit_id == None and package_id != None and element.tag in UNIT_TAGS and id != None:
+                unit_id = id
+                kind = element.get(XMI_TYPE)
+                if element.tag == "ownedDiagram":
+                    kind = DIAGRAM_KIND
+                self.unit_kinds[id] = kind
+                self.unit_packages[id] = package_id
+                self.references[id] = set()
+            if unit_id != None:
+                if element.tag == "ownedComment" and id != unit_id:
+                    self.nested_kinds.add(element.get(XMI_TYPE))
+                if id != None:
+                    self.unit_of[id] = unit_id
+                # What a diagram shows is not imported because of the diagram
+                if self.unit_kinds[unit_id] != DIAGRAM_KIND:
+                    self.add_references(unit_id, element)
+            context.append((package_id, unit_id))
+            open_elements.append(element)
+        return self
+
+    def add_package(self, id, name, parent_id):
+        package = PackageNode(id, name, parent_id)
+        self.packages[id] = package
+        if parent_id == None:
+            self.roots.append(id)
+        else:
+            self.packages[parent_id].children.append(id)
+
+    def add_references(self, unit_id, element:ET.Element):
+        references = self.references[unit_id]
+        for name in REFERENCE_ATTRIBUTES:
+            value = element.get(name)
+            if value != None:
+                references.update(value.split())
+        href = element.get(HREF)
+        if href != None:
+            references.add(href.partition("#")[2] or href)
+
+    def kinds(self) -> list:
+        kinds = set(self.unit_kinds.values()) | self.nested_kinds
+        kinds.discard(None)
+        return sorted(kinds)
+
+    def qualified_name(self, package_id) -> str:
+        return "::".join(str(self.packages[id].name) for id in reversed(self.package_path(package_id)))
+
+    def find_package(self, name) -> str | None:
+        # By xmi:id or by qualified name, with or without the name of the model
+        if name in self.packages:
+            return name
+        for package_id in self.packages:
+            qualified_name = self.qualified_name(package_id)
+            if qualified_name == name or qualified_name.partition("::")[2] == name:
+                return package_id
+        return None
+
+    def package_path(self, package_id) -> list:
+        # The package and its owners, innermost first
+        path = []
+        while package_id != None:
+            path.append(package_id)
+            package_id = self.packages[package_id].parent_id
+        return path
+
+    def subtree(self, package_id) -> list:
+        packages = [package_id]
+        for package in packages:
+            packages.extend(self.packages[package].children)
+        return packages
+
+class ImportSelection():
+    # What a selective import imports: the units in the chosen packages (and their sub packages)
+    # of the chosen kinds, everything those refer to, transitively, whatever its package or kind,
+    # and the packages that contain all of these. With kinds None, units of every kind are chosen.
+    def __init__(self, scan:ModelScan, package_ids, kinds=None):
+        self.scan = scan
+        self.kinds = None
+        if kinds != None:
+            self.kinds = set(kinds)
+        chosen_packages = set()
+        for package_id in package_ids:
+            chosen_packages.update(scan.subtree(package_id))
+        self.package_ids = set(chosen_packages)
+        self.unit_ids = set()
+        queue = deque(id for id, package_id in scan.unit_packages.items()
+            if package_id in chosen_packages and self.chosen_kind(scan.unit_kinds[id]))
+        while queue:
+            unit_id = queue.popleft()
+            if unit_id in self.unit_ids:
+                continue
+            self.unit_ids.add(unit_id)
+            self.package_ids.update(scan.package_path(scan.unit_packages[unit_id]))
+            for reference in scan.references[unit_id]:
+                target = scan.unit_of.get(reference)
+                if target != None:
+                    if target not in self.unit_ids:
+                        queue.append(target)
+                elif reference in scan.packages:
+                    self.package_ids.update(scan.package_path(reference))
+        for package_id in chosen_packages:
+            self.package_ids.update(scan.package_path(package_id))
+
+    def chosen_kind(self, kind) -> bool:
+        return self.kinds == None or kind in self.kinds
+
+    def includes(self, element:ET.Element) -> bool:
+        # Packages and units are included as selected; anything else, that is nested in an
+        # included unit, only when its kind was chosen
+        id = element.get(XMI_ID)
+        if id in self.scan.packages:
+            return id in self.package_ids
+        if id in self.scan.unit_kinds:
+            return id in self.unit_ids
+        return self.chosen_kind(element.get(XMI_TYPE))
@@ -0,0 +1,73 @@
+from gi.repository import Gtk
+
+from gaphor.i18n import gettext
+
+from gaphor_mdimport_plugin.selection import ImportSelection, ModelScan
+
+class SelectionDialog():
+    # Lets the user choose the packages and element kinds of a selective import. on_import is
+    # called with the ImportSelection when the user confirms.
+    def __init__(self, parent, scan:ModelScan, on_import):
+        self.scan = scan
+        self.on_import = on_import
+        self.window = Gtk.Window(
+            title=gettext("Select what to import"),
+            transient_for=parent,
+            modal=True,
+            default_width=420,
+            default_height=520,
+        )
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        box.set_margin_top(18)
+        box.set_margin_bottom(18)
+        box.set_margin_start(18)
+        box.set_margin_end(18)
+        box.append(Gtk.Label(label=gettext("Packages"), xalign=0))
+        package_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.package_buttons = {}
+        for root_id in scan.roots:
+            self.add_package(package_box, root_id, 0)
+        scrolled_window = Gtk.ScrolledWindow(vexpand=True)
+        scrolled_window.set_child(package_box)
+        box.append(scrolled_window)
+        box.append(Gtk.Label(label=gettext("Element kinds"), xalign=0))
+        kind_box = Gtk.FlowBox(selection_mode=Gtk.SelectionMode.NONE)
+        self.kind_buttons = {}
+        for kind in scan.kinds():
+            button = Gtk.CheckButton(label=kind.removeprefix("uml:"), active=True)
+            kind_box.append(button)
+            self.kind_buttons[kind] = button
+        box.append(kind_box)
+        button_box = Gtk.Box(spacing=6, halign=Gtk.Align.END)
+        button_box.set_margin_top(12)
+        cancel_button = Gtk.Button(label=gettext("Cancel"))
+        cancel_button.connect("clicked", self.on_cancel)
+        import_button = Gtk.Button(label=gettext("Import"))
+        import_button.connect("clicked", self.on_import_clicked)
+        button_box.append(cancel_button)
+        button_box.append(import_button)
+        box.append(button_box)
+        self.window.set_child(box)
+        self.window.present()
+
+    def add_package(self, package_box, package_id, depth):
+        package = self.scan.packages[package_id]
+        button = Gtk.CheckButton(label=package.name or package_id)
+        button.set_margin_start(18 * depth)
+        package_box.append(button)
+        self.package_buttons[package_id] = button
+        for child_id in package.children:
+            self.add_package(package_box, child_id, depth + 1)
+
+    def selection(self) -> ImportSelection:
+        package_ids = [id for id, button in self.package_buttons.items() if button.get_active()]
+        kinds = [kind for kind, button in self.kind_buttons.items() if button.get_active()]
+        return ImportSelection(self.scan, package_ids, kinds)
+
+    def on_import_clicked(self, button):
+        selection = self.selection()
+        self.window.destroy()
+        self.on_import(selection)
+
+    def on_cancel(self, button):
+        self.window.destroy()
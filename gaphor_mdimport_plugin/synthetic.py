@@ -0,0 +1,137 @@
+from itertools import islice
+
+from gaphor_mdimport_plugin.xmi import PRIMITIVE_TYPES_HREF
+
+STEREOTYPE_HREF = "http://www.omg.org/spec/SysML/20181001/SysML.xmi#SysML_Block"
+TAG_HREF = "http://www.omg.org/spec/SysML/20181001/SysML.xmi#SysML_Block_isEncapsulated"
+
+class SyntheticModel():
+    # Writes a MagicDraw style XMI document of a given size. Elements are spread round robin
+    # over the packages and written one at a time, so documents with millions of elements can be
+    # generated without holding them in memory. All counts are totals for the whole model.
+    def __init__(self, packages=10, classes=100, attributes=3, associations=50, generalizations=50,
+            stereotype_applications=20, diagrams=5, shapes_per_diagram=20):
+        self.packages = max(packages, 1)
+        self.classes = classes
+        self.attributes = attributes
+        self.associations = associations
+        self.generalizations = min(generalizations, max(classes - 1, 0))
+        self.stereotype_applications = stereotype_applications
+        self.diagrams = diagrams
+        self.shapes_per_diagram = shapes_per_diagram
+
+    def element_count(self) -> int:
+        # Number of elements that get an xmi:id, as a measure of the size of the document
+        return self.packages + self.classes * (1 + self.attributes) + self.associations * 3 \
+            + self.generalizations + self.stereotype_applications * 3 + self.diagrams + 1
+
+    def write(self, out):
+        out.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+        out.write("<xmi:XMI xmlns:uml='http://www.omg.org/spec/UML/20131001'"
+            " xmlns:xmi='http://www.omg.org/spec/XMI/20131001'"
+            " xmlns:diagram='http://www.nomagic.com/ns/magicdraw/core/diagram/1.0'>\n")
+        out.write("  <uml:Model xmi:type='uml:Model' xmi:id='model' name='Synthetic'>\n")
+        for package in range(self.packages):
+            self.write_package(out, package)
+        out.write("    <xmi:Extension extender='MagicDraw UML 2021x'>\n"
+            "      <modelExtension>\n"
+            "        <stereotypesHREFS>\n"
+            "          <stereotype name='SysML:Block' stereotypeHREF='" + STEREOTYPE_HREF + "'/>\n"
+            "          <tag name='SysML:Block:isEncapsulated' tagURI='" + TAG_HREF + "'/>\n"
+            "        </stereotypesHREFS>\n"
+            "      </modelExtension>\n"
+            "    </xmi:Extension>\n")
+        out.write("  </uml:Model>\n")
+        out.write("</xmi:XMI>\n")
+
+    def write_package(self, out, package):
+        out.write("    <packagedElement xmi:type='uml:Package' xmi:id='P%d' name='Package%d'>\n" % (package, package))
+        for uml_class in range(package, self.classes, self.packages):
+            self.write_class(out, uml_class)
+        for association in range(package, self.associations, self.packages):
+            self.write_association(out, association)
+        for application in range(package, self.stereotype_applications, self.packages):
+            self.write_stereotype_application(out, application)
+        diagrams = range(package, self.diagrams, self.packages)
+        if diagrams:
+            out.write("      <xmi:Extension extender='MagicDraw UML 2021x'>\n")
+            for diagram in diagrams:
+                self.write_diagram(out, diagram, package)
+            out.write("      </xmi:Extension>\n")
+        out.write("    </packagedElement>\n")
+
+    def write_class(self, out, uml_class):
+        out.write("      <packagedElement xmi:type='uml:Class' xmi:id='C%d' name='Class%d'>\n" % (uml_class, uml_class))
+        if 0 < uml_class <= self.generalizations:
+            # The generalizations form a binary tree over the first classes
+            out.write("        <generalization xmi:type='uml:Generalization' xmi:id='G%d' general='C%d'/>\n"
+                % (uml_class, (uml_class - 1) // 2))
+        for attribute in range(self.attributes):
+            if attribute % 2 == 0 or self.classes < 2:
+                out.write("        <ownedAttribute xmi:type='uml:Property' xmi:id='C%d_a%d' name='attribute%d'>\n"
+                    "          <type href='%sString'/>\n"
+                    "        </ownedAttribute>\n" % (uml_class, attribute, attribute, PRIMITIVE_TYPES_HREF))
+            else:
+                out.write("        <ownedAttribute xmi:type='uml:Property' xmi:id='C%d_a%d' name='attribute%d' type='C%d'/>\n"
+                    % (uml_class, attribute, attribute, (uml_class + attribute) % self.classes))
+        out.write("      </packagedElement>\n")
+
+    def association_ends(self, association):
+        source = association % self.classes
+        target = (association * 7 + 1) % self.classes
+        return source, target
+
+    def write_association(self, out, association):
+        if self.classes == 0:
+            return
+        source, target = self.association_ends(association)
+        out.write("      <packagedElement xmi:type='uml:Association' xmi:id='A%d'>\n"
+            "        <memberEnd xmi:idref='A%d_source'/>\n"
+            "        <memberEnd xmi:idref='A%d_target'/>\n"
+            "        <ownedEnd xmi:type='uml:Property' xmi:id='A%d_source' type='C%d' association='A%d'/>\n"
+            "        <ownedEnd xmi:type='uml:Property' xmi:id='A%d_target' type='C%d' association='A%d'/>\n"
+            "      </packagedElement>\n"
+            % (association, association, association, association, source, association, association, target, association))
+
+    def write_stereotype_application(self, out, application):
+        out.write("      <packagedElement xmi:type='uml:InstanceSpecification' xmi:id='S%d'>\n"
+            "        <classifier href='%s'/>\n"
+            "        <slot xmi:type='uml:Slot' xmi:id='S%d_slot'>\n"
+            "          <definingFeature href='%s'/>\n"
+            "          <value xmi:type='uml:LiteralBoolean' xmi:id='S%d_value' value='true'/>\n"
+            "        </slot>\n"
+            "      </packagedElement>\n" % (application, STEREOTYPE_HREF, application, TAG_HREF, application))
+
+    def write_diagram(self, out, diagram, package):
+        # The diagram shows classes of its own package on a grid, plus the associations between them
+        classes = list(islice(range(package, self.classes, self.packages), self.shapes_per_diagram))
+        shown = set(classes)
+        # Only a bounded number of candidate associations is inspected, whatever the model size
+        candidates = islice(range(package, self.associations, self.packages), self.shapes_per_diagram * 4)
+        associations = [association for association in candidates
+            if self.classes and set(self.association_ends(association)) <= shown]
+        out.write("        <ownedDiagram xmi:type='uml:Diagram' xmi:id='D%d' name='Diagram%d'>\n"
+            "          <xmi:Extension extender='MagicDraw UML 2021x'>\n"
+            "            <diagramRepresentation>\n"
+            "              <diagram:DiagramRepresentationObject ID='D%d_representation' type='Class Diagram'>\n"
+            "                <diagramContents>\n" % (diagram, diagram, diagram))
+        for uml_class in classes:
+            out.write("                  <usedObjects href='#C%d'/>\n" % uml_class)
+        for association in associations:
+            out.write("                  <usedObjects href='#A%d'/>\n" % association)
+        for position, uml_class in enumerate(classes):
+            x = 20 + (position % 10) * 160
+            y = 20 + (position // 10) * 120
+            out.write("                  <mdElement elementClass='Class'><elementID href='#C%d'/>"
+                "<geometry>%d, %d, 120, 80</geometry></mdElement>\n" % (uml_class, x, y))
+        out.write("                </diagramContents>\n"
+            "              </diagram:DiagramRepresentationObject>\n"
+            "            </diagramRepresentation>\n"
+            "          </xmi:Extension>\n"
+            "        </ownedDiagram>\n")
+
+def generate(path, **counts) -> SyntheticModel:
+    model = SyntheticModel(**counts)
+    with open(path, "w", encoding="utf-8") as out:
+        model.write(out)
+    return model
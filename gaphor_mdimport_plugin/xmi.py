@@ -0,0 +1,18 @@
+import sys
+
+# Qualified XMI names, interned once so that attribute and tag lookups hash precomputed strings
+XMI_NS = "{http://www.omg.org/spec/XMI/20131001}"
+UML_NS = "{http://www.omg.org/spec/UML/20131001}"
+MD_DIAGRAM_NS = "{http://www.nomagic.com/ns/magicdraw/core/diagram/1.0}"
+
+XMI_ID = sys.intern(XMI_NS + "id")
+XMI_IDREF = sys.intern(XMI_NS + "idref")
+XMI_TYPE = sys.intern(XMI_NS + "type")
+XMI_EXTENSION = sys.intern(XMI_NS + "Extension")
+
+UML_MODEL = sys.intern(UML_NS + "Model")
+UML_PROFILE = sys.intern(UML_NS + "Profile")
+
+DIAGRAM_REPRESENTATION_OBJECT = sys.intern(MD_DIAGRAM_NS + "DiagramRepresentationObject")
+
+PRIMITIVE_TYPES_HREF = "http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#"
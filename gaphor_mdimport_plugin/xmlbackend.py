@@ -0,0 +1,48 @@
+import xml.etree.ElementTree as ET
+
+# Parser backends. The importer only uses the part of the ElementTree node interface that lxml
+# shares: tag, attrib, get(), len(), iteration over the children, find(), findall(), iter() and
+# remove(), so the nodes of either backend can be imported.
+BACKEND_AUTO = "auto"
+BACKEND_LXML = "lxml"
+BACKEND_STDLIB = "stdlib"
+BACKENDS = [BACKEND_AUTO, BACKEND_LXML, BACKEND_STDLIB]
+
+class StdlibBackend():
+    # xml.etree.ElementTree, always available
+    name = BACKEND_STDLIB
+
+    def iterparse(self, source, events):
+        return ET.iterparse(source, events=events)
+
+    def parse(self, source):
+        return ET.parse(source).getroot()
+
+class LxmlBackend():
+    # lxml.etree, used when it is installed. Comments and processing instructions are dropped while
+    # parsing, so that every child of a node is an element, as with ElementTree.
+    name = BACKEND_LXML
+
+    def __init__(self):
+        from lxml import etree
+        self.etree = etree
+        self.parser = etree.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+
+    def iterparse(self, source, events):
+        return self.etree.iterparse(source, events=events, remove_comments=True, remove_pis=True, huge_tree=True)
+
+    def parse(self, source):
+        return self.etree.parse(source, self.parser).getroot()
+
+def get_backend(name=None):
+    # With no name or "auto", lxml if it is installed and ElementTree otherwise
+    if name == None or name == BACKEND_AUTO:
+        try:
+            return LxmlBackend()
+        except ImportError:
+            return StdlibBackend()
+    if name == BACKEND_LXML:
+        return LxmlBackend()
+    if name == BACKEND_STDLIB:
+        return StdlibBackend()
+    raise ValueError("Unknown XML backend: " + str(name))
@@ -0,0 +1,148 @@
+import pytest
+
+from gaphor.core.modeling import Presentation
+
+from gaphor_mdimport_plugin.cli import create_session
+
+# A small MagicDraw export, written by hand: two packages with classes, attributes, a
+# generalization, an association, an enumeration, a dependency, a comment and a class diagram
+SMALL_MODEL = """<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001"
+    xmlns:diagram="http://www.nomagic.com/ns/magicdraw/core/diagram/1.0">
+  <uml:Model xmi:type="uml:Model" xmi:id="model" name="Fleet">
+    <packagedElement xmi:type="uml:Package" xmi:id="vehicles" name="Vehicles">
+      <packagedElement xmi:type="uml:Class" xmi:id="vehicle" name="Vehicle">
+        <ownedComment xmi:type="uml:Comment" xmi:id="vehicle_comment" body="Anything that moves">
+          <annotatedElement xmi:idref="vehicle"/>
+        </ownedComment>
+        <ownedAttribute xmi:type="uml:Property" xmi:id="vehicle_name" name="name">
+          <type href="http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#String"/>
+        </ownedAttribute>
+        <ownedAttribute xmi:type="uml:Property" xmi:id="vehicle_fuel" name="fuel" type="fuel"/>
+      </packagedElement>
+      <packagedElement xmi:type="uml:Class" xmi:id="car" name="Car">
+        <generalization xmi:type="uml:Generalization" xmi:id="car_vehicle" general="vehicle"/>
+        <ownedAttribute xmi:type="uml:Property" xmi:id="car_doors" name="doors">
+          <type href="http://www.omg.org/spec/UML/20131001/PrimitiveTypes.xmi#Integer"/>
+        </ownedAttribute>
+      </packagedElement>
+      <packagedElement xmi:type="uml:Enumeration" xmi:id="fuel" name="Fuel">
+        <ownedLiteral xmi:type="uml:EnumerationLiteral" xmi:id="fuel_petrol" name="Petrol"/>
+        <ownedLiteral xmi:type="uml:EnumerationLiteral" xmi:id="fuel_electric" name="Electric"/>
+      </packagedElement>
+      <packagedElement xmi:type="uml:Association" xmi:id="car_wheels">
+        <memberEnd xmi:idref="car_wheels_car"/>
+        <memberEnd xmi:idref="car_wheels_wheel"/>
+        <ownedEnd xmi:type="uml:Property" xmi:id="car_wheels_car" type="car" association="car_wheels"/>
+        <ownedEnd xmi:type="uml:Property" xmi:id="car_wheels_wheel" name="wheels" type="wheel" association="car_wheels"/>
+      </packagedElement>
+      <xmi:Extension extender="MagicDraw UML 2021x">
+        <ownedDiagram xmi:type="uml:Diagram" xmi:id="vehicles_diagram" name="Vehicles">
+          <xmi:Extension extender="MagicDraw UML 2021x">
+            <diagramRepresentation>
+              <diagram:DiagramRepresentationObject ID="vehicles_representation" type="Class Diagram">
+                <diagramContents>
+                  <usedObjects href="#vehicle"/>
+                  <usedObjects href="#car"/>
+                  <mdElement elementClass="Class"><elementID href="#vehicle"/><geometry>20, 20, 120, 80</geometry></mdElement>
+                  <mdElement elementClass="Class"><elementID href="#car"/><geometry>20, 160, 120, 80</geometry></mdElement>
+                </diagramContents>
+              </diagram:DiagramRepresentationObject>
+            </diagramRepresentation>
+          </xmi:Extension>
+        </ownedDiagram>
+      </xmi:Extension>
+    </packagedElement>
+    <packagedElement xmi:type="uml:Package" xmi:id="parts" name="Parts">
+      <packagedElement xmi:type="uml:Class" xmi:id="wheel" name="Wheel"/>
+      <packagedElement xmi:type="uml:Dependency" xmi:id="wheel_vehicle">
+        <client xmi:idref="wheel"/>
+        <supplier xmi:idref="vehicle"/>
+      </packagedElement>
+    </packagedElement>
+  </uml:Model>
+</xmi:XMI>
+"""
+
+@pytest.fixture
+def session():
+    event_manager, element_factory, modeling_language = create_session()
+    yield event_manager, element_factory, modeling_language
+    element_factory.shutdown()
+
+@pytest.fixture
+def small_model():
+    return SMALL_MODEL
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "Fleet.xmi"
+    path.write_text(SMALL_MODEL, encoding="utf-8")
+    return path
+
+def snapshot(element_factory) -> dict:
+    # The model elements by id, with every attribute and reference they save. Presentation
+    # items get new ids on every import, so only the diagrams they are on and their subjects count.
+    elements = {}
+    presentations = []
+    for element in element_factory.select():
+        if isinstance(element, Presentation):
+            subject = element.subject
+            presentations.append((element.diagram.id, type(element).__name__, subject and subject.id))
+            continue
+        properties = {}
+
+        def save(name, value):
+            if isinstance(value, (list, tuple)) or hasattr(value, "items"):
+                properties[name] = [item.id for item in value if not isinstance(item, Presentation)]
+            elif hasattr(value, "id"):
+                if not isinstance(value, Presentation):
+                    properties[name] = value.id
+            else:
+                properties[name] = value
+
+        element.save(save)
+        elements[element.id] = (type(element).__name__, properties)
+    return {"elements": elements, "presentations": sorted(presentations, key=str)}
+
+@pytest.fixture
+def model_snapshot():
+    return snapshot
+
+WIDE_MODEL_CLASSES = 5000
+
+@pytest.fixture
+def wide_model_path(tmp_path):
+    # A synthetic model with many classes in one package, for checking that a streaming reader
+    # does not keep what it has read
+    classes = "".join('<packagedElement xmi:type="uml:Class" xmi:id="class_%d" name="Class%d">'
+        '<ownedAttribute xmi:type="uml:Property" xmi:id="class_%d_size" name="size" type="class_0"/>'
+        '</packagedElement>' % (number, number, number) for number in range(WIDE_MODEL_CLASSES))
+    path = tmp_path / "Wide.xmi"
+    path.write_text('<?xml version="1.0" encoding="UTF-8"?>'
+        '<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001">'
+        '<uml:Model xmi:type="uml:Model" xmi:id="model" name="Wide">'
+        '<packagedElement xmi:type="uml:Package" xmi:id="package" name="Package">' + classes +
+        '</packagedElement></uml:Model></xmi:XMI>', encoding="utf-8")
+    return path
+
+class TreeWatch():
+    # Passes parse events on and records the largest number of nodes the parsed tree held,
+    # counted after the reader has handled an event. The parser builds the nodes of the buffer it
+    # has read ahead, so a reader that detaches what it has seen still holds a few hundred.
+    def __init__(self, events):
+        self.events = events
+        self.largest = 0
+
+    def __iter__(self):
+        root = None
+        for count, (event, element) in enumerate(self.events):
+            if root == None:
+                root = element
+            yield event, element
+            if count % 50 == 0:
+                self.largest = max(self.largest, sum(1 for node in root.iter()))
+
+@pytest.fixture
+def tree_watch():
+    return TreeWatch
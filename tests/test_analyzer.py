@@ -0,0 +1,40 @@
+from gaphor_mdimport_plugin.analyzer import ModelAnalysis
+from gaphor_mdimport_plugin.modules import ModuleIndex, ModuleResolver
+from gaphor_mdimport_plugin.xmi import PRIMITIVE_TYPES_HREF
+from gaphor_mdimport_plugin.xmlbackend import get_backend
+
+def test_standard_library_is_not_an_external_reference(small_model, tmp_path):
+    path = tmp_path / "Fleet.xmi"
+    path.write_text(small_model.replace('<packagedElement xmi:type="uml:Class" xmi:id="wheel" name="Wheel"/>',
+        '<packagedElement xmi:type="uml:Class" xmi:id="wheel" name="Wheel">'
+        '<ownedAttribute xmi:type="uml:Property" xmi:id="wheel_weight" name="weight">'
+        '<type href="Units.mdzip#kilogram"/></ownedAttribute></packagedElement>'), encoding="utf-8")
+    analysis = ModelAnalysis().read_path(path)
+
+    assert analysis.external == {"Units.mdzip": 1}
+    assert analysis.unresolved_external() == {"Units.mdzip": 1}
+    assert analysis.unresolved() == []
+    assert analysis.passes(strict=True)
+
+def test_module_resolver_does_not_look_up_the_standard_library(tmp_path):
+    (tmp_path / "PrimitiveTypes.xmi").write_text("<xmi:XMI/>", encoding="utf-8")
+    resolver = ModuleResolver([str(tmp_path)])
+
+    assert resolver.index_for(PRIMITIVE_TYPES_HREF.rstrip("#")) == None
+    assert resolver.loads == 0
+
+def test_analysis_keeps_only_the_open_branch(wide_model_path, tree_watch):
+    with open(wide_model_path, "rb") as source:
+        events = tree_watch(get_backend().iterparse(source, ("start", "end")))
+        analysis = ModelAnalysis().read(events)
+
+    assert analysis.types["uml:Class"] == 5000
+    assert events.largest < 1000
+
+def test_module_index_keeps_only_the_open_branch(wide_model_path, tree_watch):
+    with open(wide_model_path, "rb") as source:
+        events = tree_watch(get_backend().iterparse(source, ("start", "end")))
+        index = ModuleIndex(str(wide_model_path)).read(events)
+
+    assert index.entries["class_7_size"] == ("uml:Property", "size", "class_7")
+    assert events.largest < 1000
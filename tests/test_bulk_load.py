@@ -0,0 +1,36 @@
+from gaphor.core import event_handler
+from gaphor.core.modeling import ElementCreated, ModelReady
+from gaphor.UML import Class
+
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+
+def record_events(event_manager, *event_types) -> list:
+    events = []
+
+    @event_handler(*event_types)
+    def on_event(event):
+        events.append(event)
+
+    event_manager.subscribe(on_event)
+    return events
+
+def test_bulk_load_completes_with_one_model_ready_event(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    created = record_events(event_manager, ElementCreated)
+    ready = record_events(event_manager, ModelReady)
+    MDImporter(None, element_factory, event_manager, streaming=True, bulk_load=True).process_path(str(model_path))
+
+    assert sorted(uml_class.name for uml_class in element_factory.select(Class)) == ["Car", "Vehicle", "Wheel"]
+    assert element_factory.lookup("car").package is element_factory.lookup("vehicles")
+    assert created == []
+    assert len(ready) == 1
+    assert ready[0].service is element_factory
+
+def test_import_without_bulk_load_sends_element_events(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    created = record_events(event_manager, ElementCreated)
+    ready = record_events(event_manager, ModelReady)
+    MDImporter(None, element_factory, event_manager, streaming=True).process_path(str(model_path))
+
+    assert element_factory.lookup("vehicles") in [event.element for event in created]
+    assert ready == []
@@ -0,0 +1,69 @@
+import zipfile
+
+from gaphor.UML import Class, Generalization, Package, Profile
+
+from gaphor_mdimport_plugin.bundle import PART_MODEL, PART_MODULE, PART_PROFILE, bundle_members, order_members, part_kind
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+from gaphor_mdimport_plugin.mdzip import MODEL_MEMBER
+from gaphor_mdimport_plugin.xmlbackend import get_backend
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001">
+"""
+
+PROFILE_PART = HEADER + """  <uml:Profile xmi:type="uml:Profile" xmi:id="fleet_profile" name="FleetProfile"/>
+</xmi:XMI>
+"""
+
+MODULE_PART = HEADER + """  <uml:Model xmi:type="uml:Model" xmi:id="base" name="Base">
+    <packagedElement xmi:type="uml:Class" xmi:id="entity" name="Entity"/>
+  </uml:Model>
+</xmi:XMI>
+"""
+
+MODEL_PART = HEADER + """  <uml:Model xmi:type="uml:Model" xmi:id="model" name="Fleet">
+    <packagedElement xmi:type="uml:Class" xmi:id="vehicle" name="Vehicle">
+      <generalization xmi:type="uml:Generalization" xmi:id="vehicle_entity" general="entity"/>
+    </packagedElement>
+  </uml:Model>
+</xmi:XMI>
+"""
+
+def write_bundle(path):
+    # The main model comes first in the archive, the parts it depends on after it
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(MODEL_MEMBER, MODEL_PART)
+        archive.writestr("base.mdxml", MODULE_PART)
+        archive.writestr("profile.mdxml", PROFILE_PART)
+
+def test_parts_are_ordered_profiles_first_and_main_model_last(tmp_path):
+    path = tmp_path / "Fleet.mdzip"
+    write_bundle(path)
+    xml = get_backend()
+    with zipfile.ZipFile(path) as archive:
+        members = bundle_members(archive)
+        kinds = [part_kind(member, xml.iterparse(archive.open(member), ("start", "end"))) for member in members]
+        ordered = order_members(archive, members, xml)
+
+    assert kinds == [PART_MODEL, PART_MODULE, PART_PROFILE]
+    assert ordered == ["profile.mdxml", "base.mdxml", MODEL_MEMBER]
+
+def test_all_parts_are_imported(session, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    path = tmp_path / "Fleet.mdzip"
+    write_bundle(path)
+    MDImporter(None, element_factory, event_manager, streaming=True, all_parts=True).process_path(str(path))
+
+    assert [profile.name for profile in element_factory.select(Profile)] == ["FleetProfile"]
+    assert sorted(package.name for package in element_factory.select(Package) if not isinstance(package, Profile)) == ["Base", "Fleet"]
+    assert sorted(uml_class.name for uml_class in element_factory.select(Class)) == ["Entity", "Vehicle"]
+    assert element_factory.lookup("vehicle_entity").general is element_factory.lookup("entity")
+
+def test_only_the_main_model_without_all_parts(session, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    path = tmp_path / "Fleet.mdzip"
+    write_bundle(path)
+    MDImporter(None, element_factory, event_manager, streaming=True).process_path(str(path))
+
+    assert sorted(uml_class.name for uml_class in element_factory.select(Class)) == ["Vehicle"]
+    assert element_factory.lselect(Generalization)[0].general == None
@@ -0,0 +1,43 @@
+import os
+
+from gaphor.storage import storage
+
+from gaphor_mdimport_plugin.cli import create_session, main
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+
+def load_snapshot(path, model_snapshot) -> dict:
+    event_manager, element_factory, modeling_language = create_session()
+    with open(path, encoding="utf-8") as model_file:
+        storage.load(model_file, element_factory, modeling_language)
+    snapshot = model_snapshot(element_factory)
+    element_factory.shutdown()
+    # Loading a model adds a style sheet when it has none
+    snapshot["elements"] = {id: element for id, element in snapshot["elements"].items() if element[0] != "StyleSheet"}
+    return snapshot
+
+def test_convert_writes_the_imported_model(session, model_path, model_snapshot, tmp_path, capsys):
+    event_manager, element_factory, modeling_language = session
+    output_dir = tmp_path / "out"
+
+    assert main([str(model_path), "--output-dir", str(output_dir)]) == 0
+
+    output_path = output_dir / "Fleet.gaphor"
+    assert capsys.readouterr().out == str(model_path) + " -> " + str(output_path) + "\n"
+    MDImporter(None, element_factory, event_manager, streaming=True).process_path(str(model_path))
+    assert load_snapshot(output_path, model_snapshot) == model_snapshot(element_factory)
+    assert not os.path.exists(str(output_path) + ".tmp")
+
+def test_convert_selected_packages(model_path, model_snapshot, tmp_path):
+    assert main([str(model_path), "--output-dir", str(tmp_path), "--tree", "--packages", "Parts", "--kinds",
+        "uml:Class"]) == 0
+
+    elements = load_snapshot(tmp_path / "Fleet.gaphor", model_snapshot)["elements"]
+    assert sorted(id for id, (type, properties) in elements.items() if type == "Class") == ["wheel"]
+
+def test_failed_conversion_sets_the_exit_status(model_path, tmp_path, capsys):
+    missing_path = tmp_path / "Missing.xmi"
+
+    assert main([str(missing_path), str(model_path), "--output-dir", str(tmp_path)]) == 1
+
+    assert capsys.readouterr().err.startswith(str(missing_path) + ": import failed: ")
+    assert os.path.exists(tmp_path / "Fleet.gaphor")
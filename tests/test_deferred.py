@@ -0,0 +1,44 @@
+from gaphor.UML import Component
+
+from gaphor_mdimport_plugin.analyzer import ModelAnalysis
+from gaphor_mdimport_plugin.mdimporter import PACKAGED_ELEMENT_HANDLERS, MDImporter, deferred
+from gaphor_mdimport_plugin.xmi import XMI_ID
+
+COMPONENT = """      <packagedElement xmi:type="uml:Component" xmi:id="engine" name="Engine"/>
+      <packagedElement xmi:type="uml:Class" xmi:id="wheel" name="Wheel"/>"""
+
+def import_component(importer, element, owner):
+    component = importer.element_factory.create_as(Component, element.get(XMI_ID))
+    component.name = element.get("name")
+    component.package = owner
+
+def write_model(path, model):
+    path.write_text(model, encoding="utf-8")
+    return path
+
+def test_deferred_handler_imports_after_the_first_pass(session, small_model, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    path = write_model(tmp_path / "Fleet.xmi", small_model.replace('      <packagedElement xmi:type="uml:Class" xmi:id="wheel" name="Wheel"/>', COMPONENT))
+    PACKAGED_ELEMENT_HANDLERS.register("packagedElement", "uml:Component", deferred(import_component))
+    try:
+        analysis = ModelAnalysis().read_path(path)
+        importer = MDImporter(None, element_factory, event_manager, streaming=True)
+        importer.process_path(str(path))
+    finally:
+        PACKAGED_ELEMENT_HANDLERS.unregister("packagedElement", "uml:Component")
+
+    engine = element_factory.lookup("engine")
+    assert engine.name == "Engine"
+    assert engine.package is element_factory.lookup("parts")
+    assert importer.diagnostics.count() == 0
+    assert analysis.not_imported == {}
+
+def test_unresolved_reference_is_reported_once(session, small_model, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    path = write_model(tmp_path / "Fleet.xmi", small_model.replace('general="vehicle"', 'general="bicycle"'))
+    importer = MDImporter(None, element_factory, event_manager, streaming=True)
+    importer.process_path(str(path))
+
+    assert importer.diagnostics.count() == 1
+    assert [(message, diagnostic.ids) for message, diagnostic in importer.diagnostics.messages.items()] \
+        == [("Unresolved general reference", ["bicycle"])]
@@ -0,0 +1,54 @@
+from gaphor.services.properties import Properties
+
+from gaphor_mdimport_plugin import MDImportPlugin
+from gaphor_mdimport_plugin.importoptions import ImportOptions
+
+class ToolsMenu():
+    def add_actions(self, provider):
+        pass
+
+class MainWindow():
+    window = None
+
+class FileManager():
+    filename = None
+
+def test_default_options_without_properties():
+    options = ImportOptions.load(None)
+
+    assert (options.lazy_diagrams, options.incremental, options.import_all_parts, options.use_profile_library) \
+        == (False, False, False, False)
+    assert (options.instrument, options.profile) == (False, False)
+    assert options.module_directories == []
+
+def test_options_are_kept_as_model_properties(session, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    properties = Properties(event_manager)
+    options = ImportOptions.load(properties)
+    options.incremental = True
+    options.set_module_directories_text(" " + str(tmp_path) + " ")
+    options.save(properties)
+
+    assert properties.get("mdimport-incremental") == True
+    loaded = ImportOptions.load(properties)
+    assert loaded.incremental and not loaded.lazy_diagrams
+    assert loaded.module_directories == [str(tmp_path)]
+
+def test_importer_is_created_with_the_saved_options(session, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    properties = Properties(event_manager)
+    plugin = MDImportPlugin(MainWindow(), ToolsMenu(), element_factory, event_manager, FileManager(), modeling_language, properties)
+    options = ImportOptions.load(properties)
+    options.lazy_diagrams = True
+    options.import_all_parts = True
+    options.instrument = True
+    options.module_directories = [str(tmp_path)]
+    plugin.save_options(options)
+    importer = plugin.create_importer()
+    plugin.shutdown()
+
+    assert importer.diagram_store is plugin.diagram_store
+    assert importer.all_parts and not importer.incremental
+    assert importer.module_resolver.directories == [str(tmp_path)]
+    assert importer.profile_library == None
+    assert importer.instrumentation != None
@@ -0,0 +1,79 @@
+import json
+import re
+
+import pytest
+
+from gaphor_mdimport_plugin.incremental import sidecar_path
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+
+def import_incrementally(session, path, model_filename, streaming):
+    event_manager, element_factory, modeling_language = session
+    MDImporter(None, element_factory, event_manager, streaming=streaming, incremental=True,
+        model_filename=str(model_filename)).process_path(str(path))
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_reimport_of_a_renamed_export_updates_the_model(session, small_model, model_path, tmp_path, streaming):
+    event_manager, element_factory, modeling_language = session
+    model_filename = tmp_path / "Fleet.gaphor"
+    import_incrementally(session, model_path, model_filename, streaming)
+    vehicle = element_factory.lookup("vehicle")
+    wheel = element_factory.lookup("wheel")
+
+    changed = small_model.replace('name="Car"', 'name="Automobile"')
+    start = changed.index('      <packagedElement xmi:type="uml:Dependency"')
+    end = changed.index("</packagedElement>", start) + len("</packagedElement>\n")
+    changed = changed[:start] + changed[end:]
+    changed_path = tmp_path / "Fleet 2026-10-18.xmi"
+    changed_path.write_text(changed, encoding="utf-8")
+    import_incrementally(session, changed_path, model_filename, streaming)
+
+    assert element_factory.lookup("car").name == "Automobile"
+    assert element_factory.lookup("wheel_vehicle") == None
+    assert element_factory.lookup("vehicle") is vehicle
+    assert element_factory.lookup("wheel") is wheel
+    with open(sidecar_path(model_filename), encoding="utf-8") as state_file:
+        assert list(json.load(state_file)) == ["model"]
+
+def test_sources_with_the_same_file_name_are_kept_apart(session, small_model, model_path, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    model_filename = tmp_path / "Fleet.gaphor"
+    import_incrementally(session, model_path, model_filename, True)
+
+    other_path = tmp_path / "other" / "Fleet.xmi"
+    other_path.parent.mkdir()
+    # The same export under other ids, as another project would have them
+    other_model = re.sub(r'( xmi:id| xmi:idref| general| type| association|href)="#?(?!http)', r'\g<0>other_', small_model)
+    other_path.write_text(other_model, encoding="utf-8")
+    import_incrementally(session, other_path, model_filename, True)
+
+    assert element_factory.lookup("vehicle") != None
+    assert element_factory.lookup("other_vehicle") != None
+    with open(sidecar_path(model_filename), encoding="utf-8") as state_file:
+        assert sorted(json.load(state_file)) == ["model", "other_model"]
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_values_removed_from_a_changed_element_are_reset(session, small_model, tmp_path, streaming):
+    event_manager, element_factory, modeling_language = session
+    model_filename = tmp_path / "Fleet.gaphor"
+    first = small_model.replace('xmi:id="vehicle" name="Vehicle"', 'xmi:id="vehicle" name="Vehicle" visibility="private"')
+    first = first.replace('name="fuel" type="fuel"', 'name="fuel" type="fuel" isStatic="true"')
+    first_path = tmp_path / "Fleet.xmi"
+    first_path.write_text(first, encoding="utf-8")
+    import_incrementally(session, first_path, model_filename, streaming)
+    vehicle = element_factory.lookup("vehicle")
+    fuel = element_factory.lookup("vehicle_fuel")
+    car = element_factory.lookup("car")
+    assert (vehicle.visibility, fuel.type.id, fuel.isStatic) == ("private", "fuel", True)
+    assert [generalization.general.id for generalization in car.generalization] == ["vehicle"]
+
+    changed = small_model.replace('name="fuel" type="fuel"', 'name="fuel"')
+    changed = changed.replace('<generalization xmi:type="uml:Generalization" xmi:id="car_vehicle" general="vehicle"/>', "")
+    changed_path = tmp_path / "Fleet 2026-10-18.xmi"
+    changed_path.write_text(changed, encoding="utf-8")
+    import_incrementally(session, changed_path, model_filename, streaming)
+
+    assert element_factory.lookup("vehicle") is vehicle
+    assert element_factory.lookup("vehicle_fuel") is fuel
+    assert (vehicle.visibility, fuel.type, fuel.isStatic) == ("public", None, False)
+    assert list(car.generalization) == []
+    assert element_factory.lookup("car_vehicle") == None
@@ -0,0 +1,82 @@
+import os
+
+from gaphor.core import event_handler
+from gaphor.core.modeling import ModelReady
+from gaphor.diagram.event import DiagramOpened
+from gaphor.event import ModelSaved
+from gaphor.storage import storage
+
+from gaphor_mdimport_plugin import MDImportPlugin
+from gaphor_mdimport_plugin.cli import create_session
+from gaphor_mdimport_plugin.lazydiagrams import DiagramStore, records_path
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+
+class ToolsMenu():
+    def add_actions(self, provider):
+        pass
+
+class FileManager():
+    filename = None
+
+def count_model_saved(event_manager) -> list:
+    events = []
+
+    @event_handler(ModelSaved)
+    def on_model_saved(event):
+        events.append(event)
+
+    event_manager.subscribe(on_model_saved)
+    return events
+
+def shown_subjects(element_factory) -> list:
+    diagram = element_factory.lookup("vehicles_diagram")
+    return sorted(item.subject.id for item in diagram.ownedPresentation if item.subject != None)
+
+def test_diagrams_are_imported_empty_and_populated_later(session, model_path, model_snapshot):
+    event_manager, element_factory, modeling_language = session
+    diagram_store = DiagramStore()
+    MDImporter(None, element_factory, event_manager, streaming=True, diagram_store=diagram_store).process_path(str(model_path))
+
+    assert shown_subjects(element_factory) == []
+    assert list(diagram_store.records) == ["vehicles_diagram"]
+    diagram_store.materialize_all(element_factory)
+
+    assert diagram_store.records == {}
+    assert shown_subjects(element_factory) == ["car", "vehicle"]
+    eager_event_manager, eager_factory, eager_language = create_session()
+    MDImporter(None, eager_factory, eager_event_manager, streaming=True).process_path(str(model_path))
+    assert model_snapshot(element_factory) == model_snapshot(eager_factory)
+    eager_factory.shutdown()
+
+def test_diagrams_that_were_never_opened_are_populated_after_loading(session, model_path, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    file_manager = FileManager()
+    plugin = MDImportPlugin(None, ToolsMenu(), element_factory, event_manager, file_manager, modeling_language)
+    MDImporter(None, element_factory, event_manager, streaming=True, diagram_store=plugin.diagram_store) \
+        .process_path(str(model_path))
+    saved = count_model_saved(event_manager)
+    file_manager.filename = tmp_path / "Fleet.gaphor"
+    with open(file_manager.filename, "w", encoding="utf-8") as out:
+        storage.save(out, element_factory)
+    event_manager.handle(ModelSaved(None, file_manager.filename))
+    plugin.shutdown()
+
+    # The saved model keeps the diagram lazy
+    assert len(saved) == 1
+    assert shown_subjects(element_factory) == []
+    assert os.path.exists(records_path(file_manager.filename))
+
+    loaded_event_manager, loaded_factory, loaded_language = create_session()
+    loaded_plugin = MDImportPlugin(None, ToolsMenu(), loaded_factory, loaded_event_manager, file_manager, loaded_language)
+    with open(file_manager.filename, encoding="utf-8") as model_file:
+        storage.load(model_file, loaded_factory, loaded_language)
+    loaded_event_manager.handle(ModelReady(file_manager))
+    assert shown_subjects(loaded_factory) == []
+    loaded_event_manager.handle(DiagramOpened(loaded_factory.lookup("vehicles_diagram")))
+    assert shown_subjects(loaded_factory) == ["car", "vehicle"]
+
+    # Once every diagram has been populated, saving removes the records
+    loaded_event_manager.handle(ModelSaved(None, file_manager.filename))
+    loaded_plugin.shutdown()
+    loaded_factory.shutdown()
+    assert not os.path.exists(records_path(file_manager.filename))
@@ -0,0 +1,29 @@
+import pytest
+
+from gaphor_mdimport_plugin.cli import create_session
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+from gaphor_mdimport_plugin.xmlbackend import BACKEND_LXML, BACKEND_STDLIB
+
+def imported_snapshot(path, model_snapshot, **options) -> dict:
+    event_manager, element_factory, modeling_language = create_session()
+    MDImporter(None, element_factory, event_manager, **options).process_path(str(path))
+    snapshot = model_snapshot(element_factory)
+    element_factory.shutdown()
+    return snapshot
+
+@pytest.mark.parametrize("xml_backend", [BACKEND_STDLIB, BACKEND_LXML])
+def test_streaming_import_equals_tree_import(model_path, model_snapshot, xml_backend):
+    if xml_backend == BACKEND_LXML:
+        pytest.importorskip("lxml")
+    tree = imported_snapshot(model_path, model_snapshot, streaming=False, xml_backend=xml_backend)
+    streamed = imported_snapshot(model_path, model_snapshot, streaming=True, xml_backend=xml_backend)
+
+    assert streamed == tree
+    assert {"vehicle", "car", "wheel", "fuel", "car_vehicle", "car_wheels", "wheel_vehicle", "vehicles_diagram"} \
+        <= set(tree["elements"])
+    assert [presentation[2] for presentation in tree["presentations"]] == ["car", "vehicle"]
+
+def test_backends_import_the_same_model(model_path, model_snapshot):
+    pytest.importorskip("lxml")
+    assert imported_snapshot(model_path, model_snapshot, streaming=True, xml_backend=BACKEND_LXML) \
+        == imported_snapshot(model_path, model_snapshot, streaming=True, xml_backend=BACKEND_STDLIB)
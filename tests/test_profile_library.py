@@ -0,0 +1,87 @@
+import re
+
+from gaphor.storage import storage
+from gaphor.UML import Extension, Profile, Stereotype
+
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+from gaphor_mdimport_plugin.profilelibrary import ProfileLibrary, default_library_dir
+
+PROFILE = """<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001">
+  <uml:Profile xmi:type="uml:Profile" xmi:id="fleet_profile" name="FleetProfile" URI="http://example.com/FleetProfile">
+    <packagedElement xmi:type="uml:Stereotype" xmi:id="fleet_asset" name="Asset">
+      <ownedAttribute xmi:type="uml:Property" xmi:id="fleet_asset_base" name="base_Class" association="fleet_asset_extension">
+        <type href="http://www.omg.org/spec/UML/20131001/UML.xmi#Class"/>
+      </ownedAttribute>
+    </packagedElement>
+  </uml:Profile>
+</xmi:XMI>
+"""
+
+MODEL = """<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001">
+  <uml:Model xmi:type="uml:Model" xmi:id="model" name="Fleet">
+    <packagedElement xmi:type="uml:Class" xmi:id="truck" name="Truck"/>
+    <xmi:Extension extender="MagicDraw UML 2021x">
+      <modelExtension>
+        <stereotypesHREFS>
+          <stereotype name="FleetProfile:Asset" stereotypeHREF="http://example.com/FleetProfile.xmi#fleet_asset"/>
+        </stereotypesHREFS>
+      </modelExtension>
+    </xmi:Extension>
+  </uml:Model>
+</xmi:XMI>
+"""
+
+def extended_metaclasses(element_factory) -> list:
+    return sorted(extension.metaclass.name for extension in element_factory.select(Extension))
+
+def test_default_library_dir_is_in_the_gaphor_cache():
+    assert default_library_dir().endswith("profiles")
+
+def test_profile_from_library_replaces_the_stub_profile(session, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    profile_path = tmp_path / "FleetProfile.xmi"
+    profile_path.write_text(PROFILE, encoding="utf-8")
+    model_path = tmp_path / "Fleet.xmi"
+    model_path.write_text(MODEL, encoding="utf-8")
+    library = ProfileLibrary(modeling_language, str(tmp_path / "library"))
+
+    assert library.add(str(profile_path)) == ["http://example.com/FleetProfile"]
+    MDImporter(None, element_factory, event_manager, streaming=True, profile_library=library).process_path(str(model_path))
+
+    assert [profile.name for profile in element_factory.select(Profile)] == ["FleetProfile"]
+    assert [stereotype.id for stereotype in element_factory.select(Stereotype)] == ["fleet_asset"]
+    assert extended_metaclasses(element_factory) == ["Class"]
+
+def test_stub_profile_without_library(session, tmp_path):
+    event_manager, element_factory, modeling_language = session
+    model_path = tmp_path / "Fleet.xmi"
+    model_path.write_text(MODEL, encoding="utf-8")
+    MDImporter(None, element_factory, event_manager, streaming=True).process_path(str(model_path))
+
+    assert [stereotype.id for stereotype in element_factory.select(Stereotype)] == ["fleet_asset"]
+    assert extended_metaclasses(element_factory) == ["Element"]
+
+def test_library_model_is_loaded_with_the_version_it_was_saved_with(session, tmp_path, monkeypatch):
+    event_manager, element_factory, modeling_language = session
+    profile_path = tmp_path / "FleetProfile.xmi"
+    profile_path.write_text(PROFILE, encoding="utf-8")
+    library = ProfileLibrary(modeling_language, str(tmp_path / "library"))
+    library.add(str(profile_path))
+    library_path = tmp_path / "library" / library.entries()["http://example.com/FleetProfile"]["file"]
+    # As if the library had been written by an older Gaphor
+    library_path.write_text(re.sub(r'gaphor-version="[^"]*"', 'gaphor-version="2.20.0"',
+        library_path.read_text(encoding="utf-8")), encoding="utf-8")
+    versions = []
+    load_elements = storage.load_elements
+
+    def recording_load_elements(elements, element_factory, modeling_language, gaphor_version="1.0.0"):
+        versions.append(gaphor_version)
+        load_elements(elements, element_factory, modeling_language, gaphor_version)
+
+    monkeypatch.setattr(storage, "load_elements", recording_load_elements)
+
+    assert library.instantiate("http://example.com/FleetProfile.xmi#fleet_asset", element_factory)
+    assert versions == ["2.20.0"]
+    assert extended_metaclasses(element_factory) == ["Class"]
@@ -0,0 +1,21 @@
+import sys
+
+import xml.etree.ElementTree as ET
+
+from gaphor_mdimport_plugin.records import compact
+from gaphor_mdimport_plugin.xmi import XMI_ID, XMI_TYPE
+
+def test_compact_record_keeps_what_the_pending_handlers_read():
+    element = ET.fromstring("""<packagedElement xmlns:xmi="http://www.omg.org/spec/XMI/20131001"
+        xmi:type="uml:UseCase" xmi:id="drive" name="Drive" visibility="public">
+      <include xmi:type="uml:Include" xmi:id="drive_refuel" addition="refuel"/>
+    </packagedElement>""")
+    record = compact(element)
+
+    assert record.tag == "packagedElement"
+    assert record.get(XMI_ID) == "drive"
+    assert record.get("name") == "Drive"
+    assert record.get("visibility") == None
+    assert record.get(XMI_TYPE) is sys.intern("uml:UseCase")
+    assert [(child.tag, child.get("addition")) for child in record] == [("include", "refuel")]
+    assert record.find("include").get(XMI_ID) == "drive_refuel"
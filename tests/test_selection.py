@@ -0,0 +1,58 @@
+from gaphor.core.modeling import Diagram
+from gaphor.UML import Association, Class, Dependency, Enumeration, Package
+
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+from gaphor_mdimport_plugin.selection import ImportSelection, ModelScan
+from gaphor_mdimport_plugin.xmlbackend import get_backend
+
+def import_selection(session, path, packages, kinds=None) -> MDImporter:
+    event_manager, element_factory, modeling_language = session
+    importer = MDImporter(None, element_factory, event_manager, streaming=True)
+    scan = importer.scan_path(str(path))
+    importer.selection = ImportSelection(scan, [scan.find_package(name) for name in packages], kinds)
+    importer.process_path(str(path))
+    return importer
+
+def ids_of(element_factory, type) -> list:
+    return sorted(element.id for element in element_factory.select(type))
+
+def test_scan_finds_packages_and_kinds(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    scan = MDImporter(None, element_factory, event_manager).scan_path(str(model_path))
+
+    assert scan.find_package("Parts") == "parts"
+    assert scan.find_package("Fleet::Vehicles") == "vehicles"
+    assert scan.find_package("Trucks") == None
+    assert scan.kinds() == ["uml:Association", "uml:Class", "uml:Comment", "uml:Dependency", "uml:Diagram",
+        "uml:Enumeration"]
+
+def test_a_package_is_imported_with_what_it_refers_to(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    import_selection(session, model_path, ["Parts"])
+
+    # The dependency refers to Vehicle, whose attribute refers to Fuel; Car is left out
+    assert ids_of(element_factory, Class) == ["vehicle", "wheel"]
+    assert ids_of(element_factory, Dependency) == ["wheel_vehicle"]
+    assert ids_of(element_factory, Enumeration) == ["fuel"]
+    assert ids_of(element_factory, Association) == []
+    assert ids_of(element_factory, Diagram) == []
+    assert sorted(package.id for package in element_factory.select(Package)) == ["model", "parts", "vehicles"]
+
+def test_only_the_chosen_kinds_are_imported(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    import_selection(session, model_path, ["Vehicles"], ["uml:Class"])
+
+    assert ids_of(element_factory, Class) == ["car", "vehicle"]
+    assert ids_of(element_factory, Enumeration) == ["fuel"]
+    assert ids_of(element_factory, Association) == []
+    assert ids_of(element_factory, Diagram) == []
+    assert element_factory.lookup("vehicle_comment") == None
+    assert element_factory.lookup("car_vehicle").general is element_factory.lookup("vehicle")
+
+def test_scan_keeps_only_the_open_branch(wide_model_path, tree_watch):
+    with open(wide_model_path, "rb") as source:
+        events = tree_watch(get_backend().iterparse(source, ("start", "end")))
+        scan = ModelScan().read(events)
+
+    assert len(scan.unit_kinds) == 5000
+    assert events.largest < 1000
@@ -0,0 +1,140 @@
+from gaphor.core import event_handler
+from gaphor.core.modeling import ModelReady
+from gaphor.services.undomanager import UndoManager
+from gaphor.transaction import Transaction
+from gaphor.UML import Class
+
+from gaphor_mdimport_plugin.cli import create_session
+from gaphor_mdimport_plugin.mdimporter import MDImporter
+
+def count_model_ready(event_manager) -> list:
+    events = []
+
+    @event_handler(ModelReady)
+    def on_model_ready(event):
+        events.append(event)
+
+    event_manager.subscribe(on_model_ready)
+    return events
+
+def test_chunked_import_commits_and_matches_single_transaction(session, model_path, model_snapshot):
+    event_manager, element_factory, modeling_language = session
+    ready = count_model_ready(event_manager)
+    MDImporter(None, element_factory, event_manager, streaming=True, chunk_steps=3).process_path(str(model_path))
+
+    assert not Transaction.in_transaction()
+    assert ready == []
+    single_event_manager, single_factory, single_language = create_session()
+    MDImporter(None, single_factory, single_event_manager, streaming=True).process_path(str(model_path))
+    assert model_snapshot(element_factory) == model_snapshot(single_factory)
+    single_factory.shutdown()
+
+def test_failed_chunked_import_removes_created_elements(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    importer = MDImporter(None, element_factory, event_manager, streaming=True, chunk_steps=2)
+
+    def failing_steps():
+        for count, progress in enumerate(importer.file_steps(str(model_path))):
+            if count == 10:
+                raise RuntimeError("import failed")
+            yield progress
+
+    try:
+        importer.complete_steps(failing_steps())
+    except RuntimeError:
+        pass
+    assert not Transaction.in_transaction()
+    assert element_factory.lselect() == []
+
+def test_sliced_transaction_is_closed_between_slices(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    importer = MDImporter(None, element_factory, event_manager, streaming=True)
+    transaction = importer.begin_transaction(sliced=True)
+    steps = importer.file_steps(str(model_path))
+    finished = False
+    while not finished:
+        transaction.resume()
+        for count in range(5):
+            if next(steps, None) == None:
+                finished = True
+                break
+            transaction.step()
+        if not finished:
+            transaction.pause()
+            assert not Transaction.in_transaction()
+    transaction.commit()
+
+    assert not Transaction.in_transaction()
+    assert sorted(uml_class.name for uml_class in element_factory.select(Class)) == ["Car", "Vehicle", "Wheel"]
+
+def test_cancelled_sliced_import_removes_created_elements(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    importer = MDImporter(None, element_factory, event_manager, streaming=True)
+    transaction = importer.begin_transaction(sliced=True)
+    steps = importer.file_steps(str(model_path))
+    transaction.resume()
+    for count in range(10):
+        next(steps)
+    transaction.pause()
+    assert element_factory.lselect() != []
+    transaction.resume()
+    steps.close()
+    transaction.rollback()
+
+    assert not Transaction.in_transaction()
+    assert element_factory.lselect() == []
+
+def import_in_slices(importer, path, slice_steps=5, cancel_after=None):
+    # Runs an import the way process_file_async does, without the main loop
+    transaction = importer.begin_transaction(sliced=True)
+    steps = importer.file_steps(path)
+    done = 0
+    while True:
+        transaction.resume()
+        for count in range(slice_steps):
+            if done == cancel_after:
+                steps.close()
+                transaction.rollback()
+                return
+            if next(steps, None) == None:
+                transaction.commit()
+                return
+            transaction.step()
+            done += 1
+        transaction.pause()
+
+def test_chunked_import_leaves_no_undo_history(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    undo_manager = UndoManager(event_manager, element_factory)
+    with Transaction(event_manager):
+        element_factory.create(Class).name = "Before"
+    assert undo_manager.can_undo()
+    MDImporter(None, element_factory, event_manager, streaming=True, chunk_steps=3, \
+        undo_manager=undo_manager).process_path(str(model_path))
+    undo_manager.undo_transaction()
+    undo_manager.shutdown()
+
+    assert not undo_manager.can_undo() and not undo_manager.can_redo()
+    assert sorted(uml_class.name for uml_class in element_factory.select(Class)) == ["Before", "Car", "Vehicle", "Wheel"]
+
+def test_sliced_import_can_not_be_undone(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    undo_manager = UndoManager(event_manager, element_factory)
+    importer = MDImporter(None, element_factory, event_manager, streaming=True, undo_manager=undo_manager)
+    import_in_slices(importer, str(model_path))
+    undo_manager.undo_transaction()
+    undo_manager.shutdown()
+
+    assert not undo_manager.can_undo()
+    assert sorted(uml_class.name for uml_class in element_factory.select(Class)) == ["Car", "Vehicle", "Wheel"]
+
+def test_cancelled_sliced_import_is_not_brought_back_by_undo(session, model_path):
+    event_manager, element_factory, modeling_language = session
+    undo_manager = UndoManager(event_manager, element_factory)
+    importer = MDImporter(None, element_factory, event_manager, streaming=True, undo_manager=undo_manager)
+    import_in_slices(importer, str(model_path), cancel_after=12)
+    undo_manager.undo_transaction()
+    undo_manager.shutdown()
+
+    assert not undo_manager.can_undo()
+    assert element_factory.lselect() == []